@@ -1790,7 +1790,10 @@ class Cursor(Structure):
     @property
     def brief_comment(self):
         """Returns the brief comment text associated with that Cursor"""
-        return conf.lib.clang_Cursor_getBriefCommentText(self)
+        if not hasattr(self, '_brief_comment'):
+            self._brief_comment = conf.lib.clang_Cursor_getBriefCommentText(self)
+
+        return self._brief_comment
 
     @property
     def raw_comment(self):
@@ -2819,8 +2822,10 @@ class TranslationUnit(ClangObject):
                 if hasattr(contents, "read"):
                     contents = contents.read()
 
+                # length is in bytes, of the encoded contents
+                contents = b(contents)
                 unsaved_array[i].name = b(fspath(name))
-                unsaved_array[i].contents = b(contents)
+                unsaved_array[i].contents = contents
                 unsaved_array[i].length = len(contents)
 
         ptr = conf.lib.clang_parseTranslationUnit(index,
@@ -2998,18 +3003,21 @@ class TranslationUnit(ClangObject):
         if len(unsaved_files):
             unsaved_files_array = (_CXUnsavedFile * len(unsaved_files))()
             for i,(name,value) in enumerate(unsaved_files):
-                if not isinstance(value, str):
+                if hasattr(value, "read"):
                     # FIXME: It would be great to support an efficient version
                     # of this, one day.
                     value = value.read()
-                    print(value)
-                if not isinstance(value, str):
+                if not isinstance(value, (str, bytes)):
                     raise TypeError('Unexpected unsaved file contents.')
-                unsaved_files_array[i].name = fspath(name)
+                # same as from_source()
+                value = b(value)
+                unsaved_files_array[i].name = b(fspath(name))
                 unsaved_files_array[i].contents = value
                 unsaved_files_array[i].length = len(value)
         ptr = conf.lib.clang_reparseTranslationUnit(self, len(unsaved_files),
                 unsaved_files_array, options)
+        if ptr:
+            raise TranslationUnitLoadError("Error reparsing translation unit.")
 
     def save(self, filename):
         """Saves the TranslationUnit to a file.
@@ -3069,8 +3077,9 @@ class TranslationUnit(ClangObject):
                     print(value)
                 if not isinstance(value, str):
                     raise TypeError('Unexpected unsaved file contents.')
+                value = b(value)
                 unsaved_files_array[i].name = b(fspath(name))
-                unsaved_files_array[i].contents = b(value)
+                unsaved_files_array[i].contents = value
                 unsaved_files_array[i].length = len(value)
         ptr = conf.lib.clang_codeCompleteAt(self, fspath(path), line, column,
                 unsaved_files_array, len(unsaved_files), options)
@@ -1,21 +1,33 @@
+import copy
 import os
-import re
 import shutil
+import sys
+import time
 from distutils.dir_util import copy_tree
-from typing import Callable, List
+from typing import Dict, List, Optional, Tuple
 
 import click
 
+try:
+    import resource
+except ImportError:  # not available on windows
+    resource = None
+
 import c2py
 from c2py.core import CxxFileParser
-from c2py.core.core_types.generator_types import GeneratorFunction, GeneratorMethod, \
-    GeneratorSymbol, GeneratorTypedef, GeneratorClass
-from c2py.core.preprocessor import PreProcessor, PreProcessorOptions
-from c2py.generator.cxxgenerator.cxxgenerator import CxxGenerator, CxxGeneratorOptions
+from c2py.core.cxxparser import CXXParseResult, CXXParser, CXXParserExtraOptions, CxxTarget, \
+    class_layout_differences, parse_targets
+from c2py.core.env import FileClassifier
+from c2py.core.generator import GeneratorResult
+from c2py.core.preprocessor import CallbackCallingPolicy, PreProcessor, PreProcessorOptions, \
+    PreProcessorResult
+from c2py.core.snapshot import Snapshot, load_snapshot, save_snapshot
+from c2py.core.symbol_rules import CALLBACK_VALUES, Patterns, SymbolRules
+from c2py.generator.cxxgenerator.cxxgenerator import CxxGenerator, CxxGeneratorOptions, \
+    LAYOUT_CHECKS_FILE, check_target_conditions, target_dispatch_config, target_layout_checks, \
+    use_dispatch_config
 from c2py.generator.pyigenerator.pyigenerator import PyiGenerator
 from c2py.generator.setupgenerator.setupgenerator import SetupGenerator, SetupGeneratorOptions
-from c2py.objects_manager import ObjectManager
-from c2py.type_manager import TypeManager
 
 my_dir = os.path.dirname(__file__)
 root_dir = os.path.abspath(os.path.join(my_dir, ".."))
@@ -30,308 +42,730 @@ def cli():
     pass
 
 
+# options shared by generate and watch
+GENERATE_OPTIONS = [
+    # about input files
+    click.argument("module-name",
+                   nargs=1
+                   ),
+    click.argument("files",
+                   type=click.Path(),
+                   nargs=-1
+                   ),
+    click.option("-e", "--encoding",
+                 help="encoding of input files, default is utf-8(use python's encoding library)",
+                 default='utf-8'
+                 ),
+    click.option("-I", "--include-path", "include_dirs",
+                 help="additional include paths",
+                 multiple=True
+                 ),
+    click.option("-D", "definitions",
+                 help="additional pre-defined definitions",
+                 multiple=True
+                 ),
+    click.option("-A", "--additional-include", "additional_includes",
+                 help="additional include files. These files will be included in output cxx file,"
+                      " but skipped by parser.",
+                 multiple=True
+                 ),
+    click.option("--parse-cache-dir",
+                 help="cache parse result in this directory."
+                      " If none of input files(including files they include) and options changed,"
+                      " cached result is used instead of parsing again.",
+                 default="",
+                 ),
+    click.option("--translation-unit-cache-dir",
+                 help="save libclang translation unit into this directory, and reload it in later runs"
+                      " if none of input files(including files they include) and options changed.",
+                 default="",
+                 ),
+    click.option("-j", "--jobs",
+                 help="parse input files in this number of processes."
+                      " Files are split into groups, each group is parsed as a separated"
+                      " translation unit.",
+                 type=click.IntRange(min=1, clamp=True),
+                 default=1,
+                 ),
+    click.option("--save-snapshot",
+                 help="save result of parsing and pre-processing into this file."
+                      " Generation can be rerun from it later with --from-snapshot.",
+                 type=click.Path(dir_okay=False),
+                 default=None,
+                 ),
+    click.option("--from-snapshot",
+                 help="generate from a snapshot saved by --save-snapshot, instead of parsing"
+                      " input files. Options about parsing and pre-processing are ignored."
+                      " FILES defaults to input files of the snapshot."
+                      " Snapshots are pickles which can run arbitrary code when loaded:"
+                      " only load snapshots you trust.",
+                 type=click.Path(exists=True, dir_okay=False),
+                 default=None,
+                 ),
+    click.option("--prune-system-headers/--no-prune-system-headers",
+                 help="record only types(without members) from system headers,"
+                      " and skip other declarations from them.",
+                 default=False,
+                 ),
+    click.option("--parse-stats",
+                 help="record count and time spent on each kind of cursor and each file while"
+                      " parsing. \"table\" to print them as tables,"
+                      " otherwise they are written into this file as json.",
+                 default="",
+                 ),
+    click.option("--target", "targets",
+                 help="parse and generate for this target, can be specified multiple times."
+                      " format: name:arch[:triple[:definitions]], arch is x86 or x64,"
+                      " definitions are separated by comma."
+                      " eg: win64:x64:x86_64-pc-windows-msvc:_WIN32"
+                      " Targets are parsed concurrently(see --jobs),"
+                      " output of each target is written into {output_dir}/{target name},"
+                      " and its sources include {output_dir}/config.h, which picks the"
+                      " configuration of the target matching current platform."
+                      " Targets of the same arch need triples of different platforms."
+                      " Not supported with --generate-setup.",
+                 multiple=True,
+                 ),
+    # about API detail
+    click.option("-ew", "--string-encoding-windows",
+                 help="encoding used to get & set string."
+                      " This value is used to construct std::locale."
+                      " use `locale -a` to show all the locates supported."
+                      " default is utf-8, which is the internal encoding used by pybind11.",
+                 default="utf-8",
+                 ),
+    click.option("-el", "--string-encoding-linux",
+                 help="encoding used to get & set string."
+                      " This value is used to construct std::locale."
+                      " use `locale -a` to show all the locates supported."
+                      " default is utf-8, which is the internal encoding used by pybind11.",
+                 default="utf-8",
+                 ),
+    # about modifier patterns
+    click.option("-i", "--ignore-pattern",
+                 help="ignore symbols matched",
+                 ),
+    click.option("--no-callback-pattern",
+                 help="disable generation of callback for functions matched"
+                      " (for some virtual method used as undocumented API)",
+                 ),
+    click.option("--no-transform-pattern",
+                 help="disable applying transforms(changing its signature) into functions matched"
+                      " (for some virtual method used as callback only)",
+                 ),
+    click.option("--inout-arg-pattern",
+                 help="make symbol(arguments only) as input_output",
+                 ),
+    click.option("--output-arg-pattern",
+                 help="make symbol(arguments only) as output only",
+                 ),
+    click.option("--no-caster-pattern",
+                 help="don't generate caster for symbol",
+                 ),
+    click.option("--rules", "rules_files",
+                 help="rules file(.json, .toml, .yaml) mapping patterns of symbols to actions:"
+                      " ignore, no_callback, no_transform, no_caster, output_arg, inout_arg,"
+                      " callback(default/sync/async) and gil(release/keep)."
+                      " Patterns from command line take precedence over rules files.",
+                 type=click.Path(exists=True, dir_okay=False),
+                 multiple=True,
+                 ),
+    click.option("--roots",
+                 help="generate only symbols reachable(by signatures, fields, base classes and"
+                      " typedefs) from symbols matching this pattern, eg: an API class."
+                      " Symbols pruned are reported.",
+                 multiple=True,
+                 ),
+    click.option("--internal-file-glob", "internal_file_globs",
+                 help="treat symbols from files matching this glob as internal(not generated),"
+                      " like symbols from system headers.",
+                 multiple=True,
+                 ),
+    click.option("--input-file-glob", "input_file_globs",
+                 help="never treat symbols from files matching this glob as internal,"
+                      " even if they are under a system include path.",
+                 multiple=True,
+                 ),
+    # about hacks
+    click.option("--m2c/--no-m2c",
+                 help="treat const macros as global variable",
+                 default=True
+                 ),
+    click.option("--ignore-underline-prefixed/--no-ignore-underline-prefixed",
+                 help="ignore global variables starts with underline",
+                 default=True,
+                 ),
+    click.option("--ignore-unsupported/--no-ignore-unsupported",
+                 help="ignore functions that has unsupported argument",
+                 default=True,
+                 ),
+    click.option("--callback-sync-copy-bytes",
+                 help="call callbacks synchronously if their arguments are estimated to copy"
+                      " more than this number of bytes when called asynchronously,"
+                      " and report estimated bytes of all callbacks."
+                      " By default only callbacks with polymorphic arguments are synchronous.",
+                 type=click.IntRange(min=0),
+                 default=None,
+                 ),
+    click.option("--callback-unknown-copy-bytes",
+                 help="calling type of callbacks whose arguments copy unknown bytes when called"
+                      " asynchronously, eg: pointers to incomplete types."
+                      " Callbacks are reported as --callback-sync-copy-bytes does.",
+                 type=click.Choice(list(CALLBACK_VALUES)),
+                 default=None,
+                 ),
+    # generated code style
+    click.option("--inject-symbol-name/--no-inject-symbol-name",
+                 help="Add comment to describe every generated symbol's name",
+                 default=True,
+                 ),
+    # about output style
+    click.option("-o", "--output-dir",
+                 help="module source output directory",
+                 type=click.Path(),
+                 nargs=1,
+                 default="generated_files",
+                 ),
+    click.option("-p", "--pyi-output-dir",
+                 help="pyi files output directory",
+                 type=click.Path(),
+                 nargs=1,
+                 default="{output_dir}/{module_name}",
+
+                 ),
+    click.option("--clear-output-dir/--no-clear-output-dir",
+                 default=True,
+                 ),
+    click.option("--clear-pyi-output-dir/--no-clear-pyi-output-dir",
+                 default=True,
+                 ),
+    click.option("--copy-c2py-includes",
+                 help="copy all c2py include files, excluding input files to specific dir.",
+                 default="",
+                 ),
+    click.option("-m", "--max-lines-per-file",
+                 type=click.IntRange(min=200, clamp=True),
+                 default=500,
+                 ),
+    # about setuo.py file
+    click.option("--generate-setup",
+                 help="if set, generate setup.py into this location",
+                 default="",
+                 ),
+    click.option("--setup-lib-dir", "setup_lib_dirs",
+                 multiple=True,
+                 ),
+    click.option("--setup-lib", "setup_libs",
+                 multiple=True,
+                 ),
+    click.option("--setup-use-patches/--setup-no-use-patches",
+                 default=False,
+                 ),
+    click.option("--enforce-version",
+                 help="Check if c2py version matches. If not match, print error and exit. "
+                      "Use this to prevent generating code from incompatible version of c2py.",
+                 default="",
+                 ),
+]
+
+
+def generate_options(f):
+    for option in reversed(GENERATE_OPTIONS):
+        f = option(f)
+    return f
+
+
+class GenerateSession:
+    """
+    parse, process and generate with options of command generate.
+    """
+
+    def __init__(
+        self,
+        module_name: str,
+        # input files
+        files: List[str],
+        encoding: str = 'utf-8',
+        include_dirs: List[str] = None,
+        definitions: List[str] = None,
+        additional_includes: List[str] = None,
+        parse_cache_dir: str = "",
+        translation_unit_cache_dir: str = "",
+        jobs: int = 1,
+        save_snapshot: Optional[str] = None,
+        from_snapshot: Optional[str] = None,
+        prune_system_headers: bool = False,
+        parse_stats: str = "",
+        targets: List[str] = None,
+        # api detail
+        string_encoding_windows: str = "utf-8",
+        string_encoding_linux: str = "utf-8",
+        # patterns
+        ignore_pattern: str = '',
+        inout_arg_pattern: str = '',
+        output_arg_pattern: str = '',
+        no_callback_pattern: str = '',
+        no_transform_pattern: str = '',
+        no_caster_pattern: str = '',
+        rules_files: List[str] = None,
+        roots: List[str] = None,
+        internal_file_globs: List[str] = None,
+        input_file_globs: List[str] = None,
+        # hacks
+        m2c: bool = True,
+        ignore_underline_prefixed: bool = True,
+        ignore_unsupported: bool = True,
+        callback_sync_copy_bytes: Optional[int] = None,
+        callback_unknown_copy_bytes: Optional[str] = None,
+        # generated code style
+        inject_symbol_name: bool = True,
+        # output style
+        output_dir: str = 'generated_files',
+        pyi_output_dir: str = '{output_dir}/{module_name}',
+        clear_output_dir: bool = True,
+        clear_pyi_output_dir: bool = False,
+        copy_c2py_includes: str = "",
+        max_lines_per_file: bool = 500,
+        # setup.py
+        generate_setup: str = '',
+        setup_lib_dirs: List[str] = None,
+        setup_libs: List[str] = None,
+        setup_use_patches: bool = False,
+        enforce_version: str = '',
+    ):
+        if include_dirs is None:
+            include_dirs = []
+        if definitions is None:
+            definitions = []
+        if additional_includes is None:
+            additional_includes = []
+        if setup_lib_dirs is None:
+            setup_lib_dirs = []
+        if setup_libs is None:
+            setup_libs = []
+        if targets is None:
+            targets = []
+        if rules_files is None:
+            rules_files = []
+        if roots is None:
+            roots = []
+        if internal_file_globs is None:
+            internal_file_globs = []
+        if input_file_globs is None:
+            input_file_globs = []
+
+        local = locals()
+        self.pyi_output_dir_pattern = pyi_output_dir
+        pyi_output_dir = pyi_output_dir.format(**local)
+
+        self.module_name = module_name
+        self.files = files
+        self.encoding = encoding
+        self.include_dirs = include_dirs
+        self.definitions = definitions
+        self.additional_includes = additional_includes
+        self.parse_cache_dir = parse_cache_dir
+        self.translation_unit_cache_dir = translation_unit_cache_dir
+        self.jobs = jobs
+        self.save_snapshot = save_snapshot
+        self.from_snapshot = from_snapshot
+        self.prune_system_headers = prune_system_headers
+        self.parse_stats = parse_stats
+        try:
+            self.targets = [CxxTarget.from_spec(i) for i in targets]
+            check_target_conditions(self.targets)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="'--target'")
+        self.string_encoding_windows = string_encoding_windows
+        self.string_encoding_linux = string_encoding_linux
+        self.ignore_pattern = ignore_pattern
+        self.inout_arg_pattern = inout_arg_pattern
+        self.output_arg_pattern = output_arg_pattern
+        self.no_callback_pattern = no_callback_pattern
+        self.no_transform_pattern = no_transform_pattern
+        self.no_caster_pattern = no_caster_pattern
+        self.rules_files = rules_files
+        self.roots = roots
+        self.internal_file_globs = internal_file_globs
+        self.input_file_globs = input_file_globs
+        self.m2c = m2c
+        self.ignore_underline_prefixed = ignore_underline_prefixed
+        self.ignore_unsupported = ignore_unsupported
+        self.callback_sync_copy_bytes = callback_sync_copy_bytes
+        self.callback_unknown_copy_bytes = callback_unknown_copy_bytes
+        self.inject_symbol_name = inject_symbol_name
+        self.output_dir = output_dir
+        self.pyi_output_dir = pyi_output_dir
+        self.clear_output_dir = clear_output_dir
+        self.clear_pyi_output_dir = clear_pyi_output_dir
+        self.copy_c2py_includes = copy_c2py_includes
+        self.max_lines_per_file = max_lines_per_file
+        self.generate_setup = generate_setup
+        self.setup_lib_dirs = setup_lib_dirs
+        self.setup_libs = setup_libs
+        self.setup_use_patches = setup_use_patches
+        self.enforce_version = enforce_version
+
+    def load_snapshot(self) -> PreProcessorResult:
+        try:
+            snapshot = load_snapshot(self.from_snapshot)
+        except ValueError as e:
+            raise click.UsageError(str(e))
+        if not self.files:
+            self.files = snapshot.files
+        return snapshot.result
+
+    def check_version(self):
+        if self.enforce_version:
+            current_version = c2py.__version__
+            if self.enforce_version != current_version:
+                print(f"version not match, required {self.enforce_version},"
+                      f" currently: {current_version}!")
+                return False
+        return True
+
+    def create_parser(self, target: CxxTarget = None):
+        parser_extra_options = CXXParserExtraOptions()
+        parser_extra_options.parse_cache_dir = self.parse_cache_dir
+        parser_extra_options.translation_unit_cache_dir = self.translation_unit_cache_dir
+        parser_extra_options.prune_system_headers = self.prune_system_headers
+        parser_extra_options.parse_stats = bool(self.parse_stats)
+        file_classifier = FileClassifier(self.internal_file_globs, self.input_file_globs)
+        if target is None:
+            return CxxFileParser(files=self.files,
+                                 encoding=self.encoding,
+                                 include_paths=self.include_dirs,
+                                 definitions=self.definitions,
+                                 extra_options=parser_extra_options,
+                                 jobs=self.jobs,
+                                 file_classifier=file_classifier,
+                                 )
+        # targets are parsed concurrently, instead of files of a target.
+        parser_extra_options.arch = target.arch
+        parser_extra_options.show_progress = False
+        return CxxFileParser(files=self.files,
+                             encoding=self.encoding,
+                             include_paths=self.include_dirs,
+                             args=target.args,
+                             definitions=[*self.definitions, *target.definitions],
+                             extra_options=parser_extra_options,
+                             file_classifier=file_classifier,
+                             )
+
+    def for_target(self, target: CxxTarget):
+        """
+        :return: a session with outputs redirected into directory of target.
+        """
+        session = copy.copy(self)
+        session.output_dir = os.path.join(self.output_dir, target.name)
+        session.pyi_output_dir = self.pyi_output_dir_pattern.format(
+            output_dir=session.output_dir, module_name=self.module_name)
+        return session
+
+    def report_parse_stats(self, parser_result: CXXParseResult):
+        stats = parser_result.stats
+        if stats is None:
+            return
+        if self.parse_stats == "table":
+            print()
+            stats.print_table()
+        else:
+            with open(self.parse_stats, "wt") as f:
+                f.write(stats.to_json())
+
+    def symbol_rules(self) -> SymbolRules:
+        rules = SymbolRules()
+        try:
+            rules.add_pattern(self.ignore_pattern, 'ignore')
+            rules.add_pattern(self.no_callback_pattern, 'no_callback')
+            rules.add_pattern(self.no_transform_pattern, 'no_transform')
+            rules.add_pattern(self.no_caster_pattern, 'no_caster')
+            rules.add_pattern(self.inout_arg_pattern, 'inout_arg')
+            rules.add_pattern(self.output_arg_pattern, 'output_arg')
+            for path in self.rules_files:
+                rules.load(path)
+        except ValueError as e:
+            raise click.UsageError(str(e))
+        return rules
+
+    def process(self, parser_result: CXXParseResult) \
+        -> Tuple[GeneratorResult, GeneratorResult, CxxGeneratorOptions]:
+        """
+        :return: cxx_result, pyi_result, options of generators
+        """
+        return self.generate_code(self.preprocess(parser_result))
+
+    def callback_calling_policy(self) -> Optional[CallbackCallingPolicy]:
+        if self.callback_sync_copy_bytes is None and self.callback_unknown_copy_bytes is None:
+            return None
+        policy = CallbackCallingPolicy(max_async_copy_bytes=self.callback_sync_copy_bytes)
+        if self.callback_unknown_copy_bytes is not None:
+            policy.unknown_copy_bytes = CALLBACK_VALUES[self.callback_unknown_copy_bytes]
+        return policy
+
+    def preprocess(self, parser_result: CXXParseResult) -> PreProcessorResult:
+        print("processing result ...")
+        rules = self.symbol_rules()
+        pre_processor_options = PreProcessorOptions(parser_result)
+        pre_processor_options.treat_const_macros_as_variable = self.m2c
+        pre_processor_options.ignore_global_variables_starts_with_underline = \
+            self.ignore_underline_prefixed
+        pre_processor_options.ignore_unsupported_functions = self.ignore_unsupported
+        pre_processor_options.inout_arg_pattern = rules.pattern('inout_arg')
+        pre_processor_options.output_arg_pattern = rules.pattern('output_arg')
+        pre_processor_options.internal_file_globs = list(self.internal_file_globs)
+        pre_processor_options.input_file_globs = list(self.input_file_globs)
+        pre_processor_options.callback_calling_policy = self.callback_calling_policy()
+        if self.roots:
+            try:
+                pre_processor_options.roots = Patterns(self.roots)
+            except ValueError as e:
+                raise click.BadParameter(str(e), param_hint="'--roots'")
+        # pre_processor_options.char_macro_to_int = char_macro_to_int
+        pre_processor_result = PreProcessor(pre_processor_options).process()
+        print("process finished.")
+        pre_processor_result.print_unsupported_functions()
+        if self.roots:
+            pre_processor_result.print_pruned_symbols()
+        if pre_processor_options.callback_calling_policy is not None:
+            pre_processor_result.print_callback_calling_types()
+
+        ignore_symbols = rules.apply(pre_processor_result.objects)
+        if rules.pattern('ignore'):
+            print(f"# of ignore: {len(ignore_symbols)}")
+            for s in ignore_symbols:
+                print(s.full_name)
+        return pre_processor_result
+
+    def generate_code(self, pre_processor_result: PreProcessorResult) \
+        -> Tuple[GeneratorResult, GeneratorResult, CxxGeneratorOptions]:
+        print()
+        print("generating cxx code ...")
+        options = CxxGeneratorOptions.from_preprocessor_result(
+            module_name=self.module_name,
+            pre_processor_result=pre_processor_result,
+            include_files=[*self.files, *self.additional_includes],
+        )
+
+        options.max_lines_per_file = self.max_lines_per_file
+        options.string_encoding_windows = self.string_encoding_windows
+        options.string_encoding_linux = self.string_encoding_linux
+        options.inject_symbol_name = self.inject_symbol_name
+        cxx_result = CxxGenerator(options=options).generate()
+        print("cxx code generated.")
+
+        print("generating pyi code ...")
+        pyi_result = PyiGenerator(options=options).generate()
+        print("pyi code generated.")
+        return cxx_result, pyi_result, options
+
+    def output(self, cxx_result: GeneratorResult, pyi_result: GeneratorResult):
+        cxx_result.print_filenames()
+        cxx_result.output(output_dir=self.output_dir, clear=self.clear_output_dir)
+        print()
+
+        pyi_result.output(output_dir=self.pyi_output_dir, clear=self.clear_pyi_output_dir)
+        pyi_result.print_filenames()
+
+    def output_changes(self,
+                       cxx_result: GeneratorResult, pyi_result: GeneratorResult,
+                       previous_cxx_result: GeneratorResult, previous_pyi_result: GeneratorResult,
+                       ):
+        changed = cxx_result.output_changes(self.output_dir, previous_cxx_result)
+        print(f"# of cxx files changed : {len(changed)}")
+        for name in changed:
+            print(name)
+        changed = pyi_result.output_changes(self.pyi_output_dir, previous_pyi_result)
+        print(f"# of pyi files changed : {len(changed)}")
+        for name in changed:
+            print(name)
+
+    def copy_includes(self):
+        if self.copy_c2py_includes:
+            copy_tree(third_party_include_dir, self.copy_c2py_includes)
+            copy_tree(c2py_include_dir, self.copy_c2py_includes)
+            gtest_dir = os.path.join(self.copy_c2py_includes, "gtest")
+            gtest_dir = os.path.abspath(gtest_dir)
+            shutil.rmtree(gtest_dir)
+
+    def output_setup(self, cxx_result: GeneratorResult):
+        if self.generate_setup:
+            setup_options = SetupGeneratorOptions(
+                output_dir=self.output_dir,
+                include_dirs=self.include_dirs,
+                module_name=self.module_name,
+                cxx_result=cxx_result,
+                lib_dirs=self.setup_lib_dirs,
+                libs=self.setup_libs,
+                use_patches=self.setup_use_patches,
+            )
+            setup_result = SetupGenerator(setup_options).generate()
+            setup_result.output(self.generate_setup)
+
+
 @cli.command(help="""
 Converts C/C++ .h files into python module source files.
 All matching is based on c++ qualified name, using regex.
 """,
              )
-# about input files
-@click.argument("module-name",
-                nargs=1
-                )
-@click.argument("files",
-                type=click.Path(),
-                nargs=-1
-                )
-@click.option("-e", "--encoding",
-              help="encoding of input files, default is utf-8(use python's encoding library)",
-              default='utf-8'
-              )
-@click.option("-I", "--include-path", "include_dirs",
-              help="additional include paths",
-              multiple=True
-              )
-@click.option("-D", "definitions",
-              help="additional pre-defined definitions",
-              multiple=True
-              )
-@click.option("-A", "--additional-include", "additional_includes",
-              help="additional include files. These files will be included in output cxx file,"
-                   " but skipped by parser.",
-              multiple=True
-              )
-# about API detail
-@click.option("-ew", "--string-encoding-windows",
-              help="encoding used to get & set string."
-                   " This value is used to construct std::locale."
-                   " use `locale -a` to show all the locates supported."
-                   " default is utf-8, which is the internal encoding used by pybind11.",
-              default="utf-8",
-              )
-@click.option("-el", "--string-encoding-linux",
-              help="encoding used to get & set string."
-                   " This value is used to construct std::locale."
-                   " use `locale -a` to show all the locates supported."
-                   " default is utf-8, which is the internal encoding used by pybind11.",
-              default="utf-8",
-              )
-# about modifier patterns
-@click.option("-i", "--ignore-pattern",
-              help="ignore symbols matched",
-              )
-@click.option("--no-callback-pattern",
-              help="disable generation of callback for functions matched"
-                   " (for some virtual method used as undocumented API)",
-              )
-@click.option("--no-transform-pattern",
-              help="disable applying transforms(changing its signature) into functions matched"
-                   " (for some virtual method used as callback only)",
-              )
-@click.option("--inout-arg-pattern",
-              help="make symbol(arguments only) as input_output",
-              )
-@click.option("--output-arg-pattern",
-              help="make symbol(arguments only) as output only",
-              )
-@click.option("--no-caster-pattern",
-              help="don't generate caster for symbol",
-              )
-# about hacks
-@click.option("--m2c/--no-m2c",
-              help="treat const macros as global variable",
-              default=True
-              )
-@click.option("--ignore-underline-prefixed/--no-ignore-underline-prefixed",
-              help="ignore global variables starts with underline",
-              default=True,
-              )
-@click.option("--ignore-unsupported/--no-ignore-unsupported",
-              help="ignore functions that has unsupported argument",
-              default=True,
-              )
-# generated code style
-@click.option("--inject-symbol-name/--no-inject-symbol-name",
-              help="Add comment to describe every generated symbol's name",
-              default=True,
-              )
-# about output style
-@click.option("-o", "--output-dir",
-              help="module source output directory",
-              type=click.Path(),
-              nargs=1,
-              default="generated_files",
-              )
-@click.option("-p", "--pyi-output-dir",
-              help="pyi files output directory",
-              type=click.Path(),
-              nargs=1,
-              default="{output_dir}/{module_name}",
-
-              )
-@click.option("--clear-output-dir/--no-clear-output-dir",
-              default=True,
-              )
-@click.option("--clear-pyi-output-dir/--no-clear-pyi-output-dir",
-              default=True,
-              )
-@click.option("--copy-c2py-includes",
-              help="copy all c2py include files, excluding input files to specific dir.",
-              default="",
-              )
-@click.option("-m", "--max-lines-per-file",
-              type=click.IntRange(min=200, clamp=True),
-              default=500,
-              )
-# about setuo.py file
-@click.option("--generate-setup",
-              help="if set, generate setup.py into this location",
-              default="",
-              )
-@click.option("--setup-lib-dir", "setup_lib_dirs",
-              multiple=True,
-              )
-@click.option("--setup-lib", "setup_libs",
-              multiple=True,
-              )
-@click.option("--setup-use-patches/--setup-no-use-patches",
-              default=False,
-              )
-@click.option("--enforce-version",
-              help="Check if c2py version matches. If not match, print error and exit. "
-                   "Use this to prevent generating code from incompatible version of c2py.",
-              default="",
-              )
-def generate(
-    module_name: str,
-    # input files
-    files: List[str],
-    encoding: str = 'utf-8',
-    include_dirs: List[str] = None,
-    definitions: List[str] = None,
-    additional_includes: List[str] = None,
-    # api detail
-    string_encoding_windows: str = "utf-8",
-    string_encoding_linux: str = "utf-8",
-    # patterns
-    ignore_pattern: str = '',
-    inout_arg_pattern: str = '',
-    output_arg_pattern: str = '',
-    no_callback_pattern: str = '',
-    no_transform_pattern: str = '',
-    no_caster_pattern: str = '',
-    # hacks
-    m2c: bool = True,
-    ignore_underline_prefixed: bool = True,
-    ignore_unsupported: bool = True,
-    # generated code style
-    inject_symbol_name: bool = True,
-    # output style
-    output_dir: str = 'generated_files',
-    pyi_output_dir: str = '{output_dir}/{module_name}',
-    clear_output_dir: bool = True,
-    clear_pyi_output_dir: bool = False,
-    copy_c2py_includes: str = "",
-    max_lines_per_file: bool = 500,
-    # setup.py
-    generate_setup: str = '',
-    setup_lib_dirs: List[str] = None,
-    setup_libs: List[str] = None,
-    setup_use_patches: bool = False,
-    enforce_version: str = '',
-):
-    if include_dirs is None:
-        include_dirs = []
-    if definitions is None:
-        definitions = []
-    if additional_includes is None:
-        additional_includes = []
-    if setup_lib_dirs is None:
-        setup_lib_dirs = []
-    if setup_libs is None:
-        setup_libs = []
+@generate_options
+def generate(**kwargs):
+    session = GenerateSession(**kwargs)
 
     print_version()
+    if not session.check_version():
+        return
+
+    if session.targets:
+        if session.from_snapshot or session.save_snapshot:
+            raise click.UsageError("snapshot is not supported with --target")
+        if session.generate_setup:
+            raise click.UsageError("--generate-setup is not supported with --target")
+        _generate_targets(session)
+        print_peak_memory()
+        return
+
+    if session.from_snapshot:
+        print(f"loading snapshot {session.from_snapshot} ...")
+        pre_processor_result = session.load_snapshot()
+        print("snapshot loaded.")
+    else:
+        print("parsing ...")
+        parser_result = session.create_parser().parse()
+        print("parse finished.")
+        session.report_parse_stats(parser_result)
+
+        print()
+        pre_processor_result = session.preprocess(parser_result)
+        if session.save_snapshot:
+            save_snapshot(session.save_snapshot, Snapshot(pre_processor_result, session.files))
+            print(f"snapshot saved into {session.save_snapshot}")
+
+    cxx_result, pyi_result, _ = session.generate_code(pre_processor_result)
+    session.output(cxx_result, pyi_result)
+
+    session.copy_includes()
+    session.output_setup(cxx_result)
+    print_peak_memory()
+
+
+def _generate_targets(session: GenerateSession):
+    targets = session.targets
+    print(f"parsing for targets: {', '.join(t.name for t in targets)} ...")
+    parser_results = parse_targets([session.create_parser(t) for t in targets], session.jobs)
+    print("parse finished.")
 
-    if enforce_version:
-        current_version = c2py.__version__
-        if enforce_version != current_version:
-            print(f"version not match, required {enforce_version}, currently: {current_version}!")
-            return
-
-    local = locals()
-    pyi_output_dir = pyi_output_dir.format(**local)
-    print("parsing ...")
+    differences = class_layout_differences(
+        {t.name: r for t, r in zip(targets, parser_results)}
+    )
 
-    parser = CxxFileParser(files=files,
-                           encoding=encoding,
-                           include_paths=include_dirs,
-                           definitions=definitions,
-                           )
-    parser_result = parser.parse()
-    print("parse finished.")
+    if not os.path.exists(session.output_dir):
+        os.makedirs(session.output_dir)
+    for target, parser_result in zip(targets, parser_results):
+        print()
+        print(f"# target {target.name}")
+        target_session = session.for_target(target)
+        target_session.additional_includes = [*session.additional_includes, LAYOUT_CHECKS_FILE]
+        cxx_result, pyi_result, _ = target_session.process(parser_result)
+        cxx_result.saved_files[LAYOUT_CHECKS_FILE] = target_layout_checks(
+            target, parser_result, differences.keys())
+        use_dispatch_config(cxx_result)
+        target_session.output(cxx_result, pyi_result)
 
     print()
-    print("processing result ...")
-    pre_processor_options = PreProcessorOptions(parser_result)
-    pre_processor_options.treat_const_macros_as_variable = m2c
-    pre_processor_options.ignore_global_variables_starts_with_underline = ignore_underline_prefixed
-    pre_processor_options.ignore_unsupported_functions = ignore_unsupported
-    pre_processor_options.inout_arg_pattern = re.compile(
-        inout_arg_pattern) if inout_arg_pattern else None
-    pre_processor_options.output_arg_pattern = re.compile(
-        output_arg_pattern) if output_arg_pattern else None
-    # pre_processor_options.char_macro_to_int = char_macro_to_int
-    pre_processor_result = PreProcessor(pre_processor_options).process()
-    print("process finished.")
-    pre_processor_result.print_unsupported_functions()
-
-    type_manager = TypeManager(pre_processor_result.g, pre_processor_result.objects)
-
-    def apply_filter(objects: ObjectManager, pattern: str,
-                     callback: Callable[["ObjectManager", "GeneratorSymbol"], None]):
-        if pattern:
-            r = re.compile(pattern)
-            for f in objects.values():  # type: GeneratorSymbol
-                m = r.match(f.full_name)
-                if m:
-                    callback(objects, f)
-
-    ignore_symbols: List[GeneratorSymbol] = []
-
-    def ignore_name(objects: ObjectManager, s: "GeneratorSymbol"):
-        ignore_symbols.append(s)
-        s.generate = False
-
-    def disable_callback(objects: ObjectManager, s: "GeneratorSymbol"):
-        if isinstance(s, GeneratorMethod):
-            s.is_final = True
-
-    def disable_transform(objects: ObjectManager, s: "GeneratorSymbol"):
-        if isinstance(s, GeneratorFunction):
-            s.wrappers.clear()
-
-    def disable_caster(objects: ObjectManager, s: "GeneratorSymbol"):
-        if isinstance(s, GeneratorTypedef):
-            s.generate = False
-        if isinstance(s, GeneratorClass):
-            s.generate_caster = False
-
-    apply_filter(pre_processor_result.objects, ignore_pattern, ignore_name)
-
-    apply_filter(pre_processor_result.objects, no_callback_pattern, disable_callback)
-    apply_filter(pre_processor_result.objects, no_transform_pattern, disable_transform)
-    apply_filter(pre_processor_result.objects, no_caster_pattern, disable_caster)
-
-    if ignore_pattern:
-        print(f"# of ignore: {len(ignore_symbols)}")
-        for s in ignore_symbols:
-            print(s.full_name)
+    print(f"# of types whose layout differs among targets: {len(differences)}")
+    for name, target_names in differences.items():
+        print(f"{name} : {', '.join(target_names)}")
+    with open(os.path.join(session.output_dir, "config.h"), "wt") as f:
+        f.write(target_dispatch_config(targets, differences))
 
-    print()
-    print("generating cxx code ...")
-    options = CxxGeneratorOptions.from_preprocessor_result(
-        module_name=module_name,
-        pre_processor_result=pre_processor_result,
-        include_files=[*files, *additional_includes],
-    )
+    session.copy_includes()
 
-    options.max_lines_per_file = max_lines_per_file
-    options.string_encoding_windows = string_encoding_windows
-    options.string_encoding_linux = string_encoding_linux
-    options.inject_symbol_name = inject_symbol_name
-    cxx_result = CxxGenerator(options=options).generate()
-    print("cxx code generated.")
 
-    cxx_result.print_filenames()
-    cxx_result.output(output_dir=output_dir, clear=clear_output_dir)
-    print()
+@cli.command(help="""
+Same as generate, then keeps watching input files and files they include.
+On changes, input files are reparsed incrementally,
+and only output files whose contents changed are rewritten.
+""",
+             )
+@generate_options
+@click.option("--interval",
+              help="seconds between two checks of file changes",
+              type=float,
+              default=1.0,
+              )
+def watch(interval: float, **kwargs):
+    session = GenerateSession(**kwargs)
 
-    print("generating pyi code ...")
-    pyi_result = PyiGenerator(options=options).generate()
-    print("pyi code generated.")
-
-    pyi_result.output(output_dir=pyi_output_dir, clear=clear_pyi_output_dir)
-    pyi_result.print_filenames()
-
-    if copy_c2py_includes:
-        copy_tree(third_party_include_dir, copy_c2py_includes)
-        copy_tree(c2py_include_dir, copy_c2py_includes)
-        gtest_dir = os.path.join(copy_c2py_includes, "gtest")
-        gtest_dir = os.path.abspath(gtest_dir)
-        shutil.rmtree(gtest_dir)
-
-    if generate_setup:
-        setup_options = SetupGeneratorOptions(
-            output_dir=output_dir,
-            include_dirs=include_dirs,
-            module_name=module_name,
-            cxx_result=cxx_result,
-            lib_dirs=setup_lib_dirs,
-            libs=setup_libs,
-            use_patches=setup_use_patches,
-        )
-        setup_result = SetupGenerator(setup_options).generate()
-        setup_result.output(generate_setup)
+    print_version()
+    if not session.check_version():
+        return
+    if session.jobs > 1:
+        print("--jobs is ignored: a single translation unit is kept alive for reparsing.")
+        session.jobs = 1
+    if session.targets:
+        print("--target is ignored: watch generates for current platform only.")
+        session.targets = []
+    if session.from_snapshot or session.save_snapshot:
+        print("snapshot options are ignored: watch always parses input files.")
+        session.from_snapshot = session.save_snapshot = None
+
+    print("parsing ...")
+    parser = session.create_parser()
+    parser_result = parser.parse()
+    print("parse finished.")
+    session.report_parse_stats(parser_result)
+
+    print()
+    cxx_result, pyi_result, _ = session.process(parser_result)
+    session.output(cxx_result, pyi_result)
+    session.copy_includes()
+    session.output_setup(cxx_result)
+
+    mtimes = _watched_files(parser, [*session.files, *session.rules_files])
+    print(f"watching {len(mtimes)} files, press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(interval)
+            changed = [file for file, mtime in mtimes.items() if _mtime(file) != mtime]
+            if not changed:
+                continue
+
+            print()
+            print(f"changed: {', '.join(changed)}")
+            print("reparsing ...")
+            parser_result = parser.reparse()
+            print("parse finished.")
+            session.report_parse_stats(parser_result)
+            new_cxx_result, new_pyi_result, _ = session.process(parser_result)
+            session.output_changes(new_cxx_result, new_pyi_result, cxx_result, pyi_result)
+            session.output_setup(new_cxx_result)
+            cxx_result, pyi_result = new_cxx_result, new_pyi_result
+
+            mtimes = _watched_files(parser, [*session.files, *session.rules_files])
+    except KeyboardInterrupt:
+        pass
+
+
+def _mtime(file: str) -> Optional[int]:
+    try:
+        return os.stat(file).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _watched_files(parser: CXXParser, files: List[str]) -> Dict[str, Optional[int]]:
+    """
+    :return: {file: mtime} of input files and non-system files included by them.
+    """
+    watched = {os.path.abspath(i) for i in files}
+    if parser.tu is not None:
+        file_classifier = parser.options.file_classifier
+        for i in parser.tu.get_includes():
+            name = i.include.name
+            if not file_classifier.is_internal_file(name):
+                watched.add(os.path.abspath(name))
+    return {file: _mtime(file) for file in sorted(watched)}
 
 
 @cli.command()
@@ -343,5 +777,14 @@ def print_version():
     print(f"c2py {c2py.__version__}")
 
 
+def print_peak_memory():
+    if resource is None:
+        return
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != 'darwin':
+        peak *= 1024  # KiB on linux
+    print(f"peak memory: {peak / 1024 / 1024:.1f} MiB")
+
+
 if __name__ == '__main__':
     cli()
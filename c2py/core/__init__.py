@@ -1 +1 @@
-from .cxxparser import CxxFileParser, CXXParseResult, CXXParser
+from .cxxparser import CxxFileParser, CXXParseResult, CXXParser, ParserSession
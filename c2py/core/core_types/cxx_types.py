@@ -4,6 +4,7 @@ type traits
 """
 import functools
 import re
+from typing import List, Optional, Tuple
 
 from c2py.core.core_types.parser_types import Function, Variable
 
@@ -189,3 +190,150 @@ def remove_const_volatile(ot: str):
             .strip()
     )
 
+
+def _split_template_args(s: str) -> List[str]:
+    args = []
+    depth = 0
+    start = 0
+    for i, ch in enumerate(s):
+        if ch in '<([':
+            depth += 1
+        elif ch in '>)]':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            args.append(s[start:i].strip())
+            start = i + 1
+    last = s[start:].strip()
+    if last:
+        args.append(last)
+    return args
+
+
+class _cached_property:
+    """
+    functools.cached_property, which requires python 3.8.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = instance.__dict__[self.func.__name__] = self.func(instance)
+        return value
+
+
+class CxxType:
+    """
+    structure of a c++ type spelling.
+
+    Don't construct it directly, use parse_type(): types are interned by spelling, so every
+    distinct spelling is parsed only once, and parts of types(pointee, element, arguments ...)
+    are shared among all the types containing them.
+    Flags are the same as the string functions above, other parts are parsed on first access.
+    """
+
+    def __init__(self, spelling: str):
+        self.spelling = spelling
+        self.is_const = is_const_type(spelling)
+        self.is_reference = is_reference_type(spelling)
+        self.is_pointer = is_pointer_type(spelling)
+        self.is_array = is_array_type(spelling)
+        self.is_c_array = is_c_array_type(spelling)
+        self.is_std_vector = is_std_vector(spelling)
+        self.is_function_pointer = bool(is_function_pointer_type(spelling))
+        self.is_function = bool(is_function_type(spelling))
+
+    def __repr__(self):
+        return f"CxxType({self.spelling!r})"
+
+    def __str__(self):
+        return self.spelling
+
+    @_cached_property
+    def unqualified(self) -> "CxxType":
+        """
+        this type without top-level const, volatile and reference.
+        """
+        return parse_type(remove_cvref(self.spelling))
+
+    @_cached_property
+    def pointee(self) -> Optional["CxxType"]:
+        if self.is_pointer:
+            return parse_type(pointer_base(self.unqualified.spelling))
+        return None
+
+    @_cached_property
+    def element(self) -> Optional["CxxType"]:
+        """
+        element type of c array or std::vector.
+        """
+        if self.is_array:
+            return parse_type(array_base(self.spelling))
+        return None
+
+    @_cached_property
+    def extent_spelling(self) -> str:
+        """
+        extent of c array as it is written, "" if not a c array or extent is not specified.
+        """
+        if self.is_c_array:
+            return array_count_str(self.spelling)
+        return ""
+
+    @_cached_property
+    def extent(self) -> int:
+        """
+        extent of c array, 0 if unknown.
+        """
+        if self.is_c_array:
+            return array_count(self.spelling)
+        return 0
+
+    @_cached_property
+    def function(self) -> Optional[Function]:
+        """
+        signature of function pointer or function type
+        """
+        if self.is_function_pointer:
+            return function_pointer_type_info(self.spelling)
+        if self.is_function:
+            return function_type_info(self.spelling)
+        return None
+
+    @_cached_property
+    def ret_type(self) -> Optional["CxxType"]:
+        f = self.function
+        return parse_type(f.ret_type) if f else None
+
+    @_cached_property
+    def arg_types(self) -> Tuple["CxxType", ...]:
+        f = self.function
+        return tuple(parse_type(a.type) for a in f.args) if f else ()
+
+    @_cached_property
+    def template_name(self) -> str:
+        """
+        eg: "std::vector" for std::vector<int>, "" if not a template specialization.
+        """
+        t = self.unqualified.spelling
+        if t.endswith('>') and '<' in t:
+            return t[:t.index('<')].strip()
+        return ""
+
+    @_cached_property
+    def template_args(self) -> Tuple["CxxType", ...]:
+        if not self.template_name:
+            return ()
+        t = self.unqualified.spelling
+        return tuple(parse_type(a) for a in _split_template_args(t[t.index('<') + 1:-1]))
+
+
+@functools.lru_cache(maxsize=None)
+def parse_type(spelling: str) -> CxxType:
+    """
+    :return: the interned CxxType of spelling.
+    """
+    return CxxType(spelling)
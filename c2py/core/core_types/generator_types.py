@@ -1,14 +1,15 @@
 # encoding: utf-8
 import functools
 from collections import defaultdict
+from copy import copy as shallow_copy
 from dataclasses import dataclass, field
 from enum import Enum as enum
-from typing import Callable, Dict, List, Optional, TYPE_CHECKING, Union
+from typing import Callable, Dict, List, Optional, TYPE_CHECKING, Tuple, Union
 
 from c2py.core.core_types.parser_types import (AnyCxxSymbol, Class, Enum, Function, Macro,
                                                Method,
                                                Namespace, Symbol, TemplateClass, Typedef,
-                                               Variable, AnonymousUnion)
+                                               Variable, AnonymousUnion, field_values)
 
 if TYPE_CHECKING:
     from c2py.objects_manager import ObjectManager
@@ -72,9 +73,14 @@ class GeneratorFunction(Function, GeneratorSymbol):
     wrappers: List["WrapperInfo"] = field(default_factory=list)
 
     calling_type: CallingType = CallingType.Default
+    release_gil: bool = True  # release GIL when calling this function from python
     args: List[GeneratorVariable] = field(default_factory=list)
     has_overload: bool = False
 
+    # memoized result of resolve_wrappers(): wrappers applied, and signature after applying them.
+    resolved: Optional[Tuple[List["WrapperInfo"], "GeneratorFunction"]] = field(
+        default=None, repr=False, compare=False)
+
     @property
     def address(self):
         if self.has_overload:
@@ -89,14 +95,51 @@ class GeneratorFunction(Function, GeneratorSymbol):
             symbol_filter=default_symbol_filter,  # don't filter arguments
         )
         self.wrappers = list(self.wrappers)  # make a copy
+        self.resolved = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['resolved'] = None  # memoized only, no need to be pickled
+        # fields of parser types are in slots, pickle and copy restore them from the 2nd item
+        slots = {name: getattr(self, name)
+                 for cls in type(self).__mro__ for name in getattr(cls, '__slots__', ())}
+        return state, slots
+
+    def shallow_copy(self) -> "GeneratorFunction":
+        """
+        copy enough of this function for a wrapper to modify: arguments are copied, but
+        nothing else is converted again as copy() does.
+        """
+        f = shallow_copy(self)
+        f.args = [shallow_copy(a) for a in self.args]
+        f.wrappers = list(self.wrappers)
+        f.resolved = None
+        return f
 
-    def _resolve_wrapper(self, wi: "WrapperInfo"):
-        return wi.wrapper.wrap(f=copy(self), index=wi.index, wrapper_info=wi)
-
-    def resolve_wrappers(self):
-        f: "GeneratorFunction" = copy(self)
-        for wi in self.wrappers:
-            f = f._resolve_wrapper(wi)
+    def resolve_wrappers(self) -> "GeneratorFunction":
+        """
+        :return: signature of this function with all wrappers applied.
+        The result is memoized: don't modify it.
+        When wrappers are appended, only the new ones are applied onto the memoized signature.
+        """
+        wrappers = self.wrappers
+        if self.resolved is not None:
+            applied, f = self.resolved
+            if (len(applied) > len(wrappers)
+                or any(a is not b for a, b in zip(applied, wrappers))):
+                self.resolved = None  # wrappers changed in other ways than appending
+        if self.resolved is None:
+            f = self.shallow_copy()
+            f.wrappers = []
+            self.resolved = ([], f)
+        applied, f = self.resolved
+        if len(applied) < len(wrappers):
+            for wi in wrappers[len(applied):]:
+                f = f.shallow_copy()
+                f.wrappers.append(wi)
+                f = wi.wrapper.wrap(f=f, index=wi.index, wrapper_info=wi)
+                applied.append(wi)
+            self.resolved = (applied, f)
         return f
 
 
@@ -206,7 +249,7 @@ def to_generator_list(l: List[AnyCxxSymbol],
 def dataclass_convert(func):
     @functools.wraps(func)
     def wrapper(v, parent, objects: "ObjectManager", symbol_filter: SymbolFilterType):
-        kwargs = v.__dict__
+        kwargs = field_values(v)
         if parent:
             kwargs['parent'] = parent
         v = func(**kwargs)
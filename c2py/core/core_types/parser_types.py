@@ -1,22 +1,69 @@
 from collections import defaultdict
-from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Union
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, NamedTuple, Optional, Union
 
 
-@dataclass(repr=0)
-class FileLocation:
+class FileLocation(NamedTuple):
     offset: int = 0
     line: int = 0
     column: int = 0
 
 
-@dataclass(repr=False)
-class Location:
+class Location(NamedTuple):
+    """
+    Every symbol has a Location, so start and end are packed into this tuple
+    instead of being two FileLocation objects.
+    file should be interned(sys.intern), as symbols from the same file share it.
+    """
     file: Optional[str] = None
-    start: Optional[FileLocation] = None
-    end: Optional[FileLocation] = None
+    start_offset: int = 0
+    start_line: int = 0
+    start_column: int = 0
+    end_offset: int = 0
+    end_line: int = 0
+    end_column: int = 0
+
+    @classmethod
+    def from_file_locations(cls, file: Optional[str], start: FileLocation, end: FileLocation):
+        return cls(file, *start, *end)
 
+    @property
+    def start(self):
+        return FileLocation(self.start_offset, self.start_line, self.start_column)
 
+    @property
+    def end(self):
+        return FileLocation(self.end_offset, self.end_line, self.end_column)
+
+
+def slotted(cls):
+    """
+    Recreate dataclass cls with __slots__ for fields it adds, so that its instances don't carry
+    a __dict__ (dataclass(slots=True) requires python 3.10).
+    Methods of cls must not use super() without arguments: it refers to the class replaced here.
+    Subclasses without @slotted have a __dict__ for their own fields, as Generator* types do.
+    """
+    inherited = set()
+    for base in cls.__mro__[1:]:
+        inherited.update(getattr(base, '__slots__', ()))
+    names = [f.name for f in fields(cls)]
+    d = dict(cls.__dict__)
+    d['__slots__'] = tuple(name for name in names if name not in inherited)
+    for name in names:
+        d.pop(name, None)  # default values are kept by dataclass, not by class attributes
+    d.pop('__dict__', None)
+    d.pop('__weakref__', None)
+    return type(cls)(cls.__name__, cls.__bases__, d)
+
+
+def field_values(s: "Symbol") -> Dict[str, Any]:
+    """
+    {name: value} of every field of s, not copied. Use this instead of s.__dict__.
+    """
+    return {f.name: getattr(s, f.name) for f in fields(s)}
+
+
+@slotted
 @dataclass(repr=False)
 class Symbol:
     name: str = ""
@@ -34,16 +81,19 @@ class Symbol:
         return f"{self.__class__.__name__}@{self.full_name}"
 
 
+@slotted
 @dataclass(repr=False)
 class Macro(Symbol):
     definition: str = ""
 
 
+@slotted
 @dataclass(repr=False)
 class Typedef(Symbol):
     target: str = ""
 
 
+@slotted
 @dataclass(repr=False)
 class Variable(Symbol):
     type: str = ""
@@ -54,6 +104,7 @@ class Variable(Symbol):
     access: str = "public"  # for class member
 
 
+@slotted
 @dataclass(repr=False)
 class Function(Symbol):
     ret_type: str = ""
@@ -93,6 +144,7 @@ class Function(Symbol):
         return hash(self.signature)
 
 
+@slotted
 @dataclass(repr=False, unsafe_hash=True)
 class Method(Function):
     ret_type: str = ""
@@ -141,7 +193,7 @@ class Method(Function):
             virtual="virtual" if self.is_virtual else "",
             static="static" if self.is_static else "",
             scope=f"{self.parent.name}::" if self.parent else "",
-            signature=super().signature,
+            signature=Function.signature.fget(self),
             pure_virtual=" = 0" if self.is_pure_virtual else "",
         )
 
@@ -149,6 +201,7 @@ class Method(Function):
         return self.signature
 
 
+@slotted
 @dataclass(repr=False)
 class Namespace(Symbol):
     parent: Optional["Namespace"] = None
@@ -181,7 +234,36 @@ class Namespace(Symbol):
                 self.namespaces[name] = n
         pass
 
+    def merge(self, other: "Namespace"):
+        """
+        Merge symbols from another tree of the same scope.
+        Unlike extend(), symbols already in self are kept, unless they are only forward declared
+        and other has their definitions. Overloads of functions are concatenated, overloads
+        already in self(by signature) are skipped. Symbols moved from other are re-parented.
+        """
+        for attr in ('enums', 'typedefs', 'classes', 'template_classes', 'variables'):
+            mine = getattr(self, attr)
+            for name, s in getattr(other, attr).items():
+                if replaces_symbol(mine.get(name, None), s):
+                    s.parent = self
+                    mine[name] = s
+        for name, fs in other.functions.items():
+            mine = self.functions.setdefault(name, [])
+            signatures = {f.signature for f in mine}
+            for f in fs:
+                if f.signature not in signatures:
+                    signatures.add(f.signature)
+                    f.parent = self
+                    mine.append(f)
+        for name, n in other.namespaces.items():
+            if name in self.namespaces:
+                self.namespaces[name].merge(n)
+            else:
+                n.parent = self
+                self.namespaces[name] = n
+
 
+@slotted
 @dataclass(repr=False)
 class Enum(Symbol):
     type: str = ""
@@ -190,6 +272,7 @@ class Enum(Symbol):
     is_strong_typed: bool = False
 
 
+@slotted
 @dataclass(repr=False)
 class Class(Namespace):
     parent: Optional["AnyCxxSymbol"] = None
@@ -201,6 +284,7 @@ class Class(Namespace):
     destructor: "Method" = None
 
     is_polymorphic: bool = False  # has virtual methods
+    size: int = -1  # sizeof this class, -1 if unknown(incomplete or dependent type)
 
     can_generate_wrapper: bool = (
         True  # generate a wrapper if it is a polymorphic class
@@ -210,6 +294,7 @@ class Class(Namespace):
         return "class " + self.name
 
 
+@slotted
 @dataclass(repr=False)
 class File(Namespace):
     directory: str = ""
@@ -230,6 +315,7 @@ class File(Namespace):
         return f"{self.directory}/{self.name}"
 
 
+@slotted
 @dataclass(repr=False)
 class AnonymousUnion(Class):
     scope_name: str = ""  # same as its variable_name in parent
@@ -242,11 +328,31 @@ class AnonymousUnion(Class):
             return self.parent.full_name
 
 
+@slotted
 @dataclass(repr=False)
 class TemplateClass(Class):
     pass
 
 
+def is_forward_declaration(s: "AnyCxxSymbol") -> bool:
+    """
+    check if s is a class or enum known only by its forward declaration, e.g. `struct A;`
+    """
+    if isinstance(s, Class):
+        return s.size < 0 and not (s.variables or s.functions or s.constructors or s.classes
+                                   or s.enums or s.typedefs or s.super)
+    if isinstance(s, Enum):
+        return not s.variables
+    return False
+
+
+def replaces_symbol(mine: Optional["AnyCxxSymbol"], other: "AnyCxxSymbol") -> bool:
+    """
+    When merging trees, check if symbol other should take the place of mine with the same name.
+    """
+    return mine is None or (is_forward_declaration(mine) and not is_forward_declaration(other))
+
+
 AnyCxxSymbol = Union[
     Symbol,
     Macro,
@@ -0,0 +1,110 @@
+"""
+bulk visitation of cursor children.
+
+visit_children() collects children of a cursor in a single clang_visitChildren pass. Only the
+kind of each child is read there, because it is stored in the cursor itself: most children,
+eg: thousands of macros from system headers under translation unit, are skipped by their kind or
+file right after the visit. Other attributes of a CursorRecord are read from libclang on first
+access, and are cached on the cursor like cursor.spelling, cursor.type and cursor.brief_comment.
+"""
+import sys
+from typing import List, NamedTuple, Optional
+
+from c2py.clang.cindex import Cursor, CursorKind, SourceLocation, SourceRange, callbacks, conf
+from c2py.core.core_types.parser_types import FileLocation, Location
+
+
+# same as CursorKind.is_preprocessing(), without calling into libclang.
+PREPROCESSING_CURSORS = {
+    CursorKind.PREPROCESSING_DIRECTIVE,
+    CursorKind.MACRO_DEFINITION,
+    CursorKind.MACRO_INSTANTIATION,
+    CursorKind.INCLUSION_DIRECTIVE,
+}
+
+
+class CursorRecord(NamedTuple):
+    cursor: Cursor
+    kind: CursorKind
+
+    @property
+    def spelling(self) -> str:
+        return self.cursor.spelling
+
+    @property
+    def location(self) -> Optional[Location]:
+        return cursor_location(self.cursor)
+
+    @property
+    def type_spelling(self) -> str:
+        """"" for preprocessing cursors"""
+        if self.kind in PREPROCESSING_CURSORS:
+            return ""
+        return self.cursor.type.spelling
+
+    @property
+    def brief_comment(self) -> Optional[str]:
+        """None for preprocessing cursors"""
+        if self.kind in PREPROCESSING_CURSORS:
+            return None
+        return self.cursor.brief_comment
+
+    @property
+    def access(self) -> str:
+        """lower case name of AccessSpecifier, "invalid" for preprocessing cursors"""
+        if self.kind in PREPROCESSING_CURSORS:
+            return "invalid"
+        return self.cursor.access_specifier.name.lower()
+
+
+def file_location_from_extend(e: SourceLocation):
+    return FileLocation(line=e.line, column=e.column, offset=e.offset)
+
+
+def location_from_extent(extent: SourceRange) -> Optional[Location]:
+    start = extent.start
+    file = start.file
+    if file:
+        return Location.from_file_locations(sys.intern(file.name),
+                                            file_location_from_extend(start),
+                                            file_location_from_extend(extent.end))
+    return None
+
+
+def cursor_location(c: Cursor) -> Optional[Location]:
+    """
+    :return: Location of cursor, cached on the cursor.
+    """
+    try:
+        return c._location_record
+    except AttributeError:
+        c._location_record = location = location_from_extent(c.extent)
+        return location
+
+
+def cursor_file(c: Cursor) -> Optional[str]:
+    """
+    :return: file of cursor, without reading its whole extent if Location is not cached yet.
+    """
+    try:
+        location = c._location_record
+    except AttributeError:
+        file = c.location.file
+        return sys.intern(file.name) if file else None
+    return location.file if location is not None else None
+
+
+def visit_children(c: Cursor) -> List[CursorRecord]:
+    tu = c._tu
+    records: List[CursorRecord] = []
+    append = records.append
+    from_id = CursorKind.from_id
+
+    def visitor(child: Cursor, parent, _):
+        # Create reference to TU so it isn't GC'd before Cursor.
+        child._tu = tu
+        append(CursorRecord(child, from_id(child._kind_id)))
+        return 1  # continue
+
+    conf.lib.clang_visitChildren(c, callbacks['cursor_visit'](visitor), None)
+    return records
@@ -1,15 +1,25 @@
 import logging
 import os
-from dataclasses import dataclass, field
+import re
+import sys
+from bisect import bisect_left
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
 from enum import Enum as enum
-from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union, Iterable
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
-from c2py.clang.cindex import (Config, Cursor, CursorKind, Diagnostic, Index, SourceLocation,
-                               Token, TokenKind, TranslationUnit, Type, set_cindex_encoding)
+from c2py.clang.cindex import (Config, Cursor, CursorKind, Diagnostic, Index, Token, TokenKind,
+                               TranslationUnit, TranslationUnitLoadError, Type,
+                               set_cindex_encoding)
 from c2py.core.core_types.cxx_types import is_const_type
-from c2py.core.core_types.parser_types import AnyCxxSymbol, Class, Enum, FileLocation, \
-    Function, \
-    Location, Macro, Method, Namespace, TemplateClass, Typedef, Variable, AnonymousUnion
+from c2py.core.cursor_visitor import cursor_file, cursor_location, visit_children
+from c2py.core.env import FileClassifier
+from c2py.core.core_types.parser_types import AnyCxxSymbol, Class, Enum, Function, Macro, \
+    Method, Namespace, TemplateClass, Typedef, Variable, AnonymousUnion, field_values, \
+    replaces_symbol
+from c2py.core.parse_cache import PICKLE_RECURSION_LIMIT, ParseCache, TranslationUnitCache
+from c2py.core.parse_stats import ParseStats, record_stats
 from c2py.core.utils import _try_parse_cpp_digit_literal
 
 logger = logging.getLogger(__file__)
@@ -82,6 +92,21 @@ CLASS_UNSUPPORTED_CURSORS = {
     CursorKind.UNEXPOSED_EXPR,
 }
 
+# extern "C" {...}: reported as LINKAGE_SPEC since libclang 18, as UNEXPOSED_DECL before.
+EXTERN_C_CURSORS = {
+    CursorKind.UNEXPOSED_DECL,
+    CursorKind.LINKAGE_SPEC,
+}
+
+# cursors from system headers that are processed as usual, their children are checked one by one.
+STUB_TRANSPARENT_CURSORS = {
+    CursorKind.NAMESPACE,
+    *EXTERN_C_CURSORS,
+}
+
+# prefixes stripped from a type name to get its qualified name, eg: "::struct A" -> "A"
+QUALIFIER_PREFIX_PATTERN = re.compile(r'^(?:::|(?:enum|class|union|struct) )*')
+
 LITERAL_KINDS = {
     CursorKind.INTEGER_LITERAL,
     CursorKind.STRING_LITERAL,
@@ -115,10 +140,21 @@ TYPEDEF_UNSUPPORTED_CURSORS = {
     # don't known what these is
     CursorKind.PARM_DECL,
     CursorKind.TYPE_REF,
+    CursorKind.TEMPLATE_REF,
     CursorKind.INTEGER_LITERAL,
 }
 
 
+# sizes of these types in the target parsed for are recorded in CXXParseResult.type_sizes
+SIZED_TYPES = (
+    "bool", "char", "signed char", "unsigned char", "char8_t", "char16_t", "char32_t", "wchar_t",
+    "short", "signed short", "unsigned short", "int", "signed int", "unsigned int",
+    "long", "signed long", "unsigned long", "long long", "signed long long", "unsigned long long",
+    "float", "double", "long double", "void *",
+)
+TYPE_SIZES_FILE = "c2py_type_sizes.cpp"
+
+
 class CxxStandard(enum):
     Cpp11 = '-std=c++11'
     Cpp14 = '-std=c++14'
@@ -132,11 +168,57 @@ class Arch(enum):
     X64 = "-m64"
 
 
+@dataclass()
+class CxxTarget:
+    """
+    A platform to parse for. Types(size of long, pointers, ...) and so layouts depend on it.
+    """
+    name: str
+    arch: Arch = Arch.X64
+    triple: str = ""  # target triple passed to clang, eg: x86_64-pc-windows-msvc
+    definitions: List[str] = field(default_factory=list)
+
+    @property
+    def args(self):
+        if self.triple:
+            return [f'--target={self.triple}']
+        return []
+
+    @staticmethod
+    def from_spec(spec: str):
+        """
+        :param spec: name:arch[:triple[:definitions]], arch is x86 or x64,
+        definitions are separated by comma, eg: win64:x64:x86_64-pc-windows-msvc:_WIN32,WIN64
+        """
+        parts = spec.split(':')
+        if len(parts) < 2 or len(parts) > 4:
+            raise ValueError(f"invalid target spec: {spec}, expected name:arch[:triple[:definitions]]")
+        name, arch = parts[0], parts[1]
+        try:
+            arch = Arch[arch.upper()]
+        except KeyError:
+            raise ValueError(f"invalid arch in target spec: {spec}, expected x86 or x64")
+        triple = parts[2] if len(parts) > 2 else ""
+        definitions = [i for i in parts[3].split(',') if i] if len(parts) > 3 else []
+        return CxxTarget(name=name, arch=arch, triple=triple, definitions=definitions)
+
+
 @dataclass()
 class CXXParserExtraOptions:
     show_progress = True
     standard: CxxStandard = CxxStandard.Cpp17
     arch: Arch = Arch.X64
+    parse_cache_dir: Optional[str] = None  # if set, parse result is cached in this directory
+    # if set, translation unit is saved as an AST file in this directory and reused in later runs
+    translation_unit_cache_dir: Optional[str] = None
+    # if set, only types declared in system headers are recorded, as stubs without any member.
+    # other declarations(functions, variables, ...) in system headers are skipped.
+    prune_system_headers: bool = False
+    # if set, count and time of processing each kind of cursor and each file is recorded.
+    parse_stats: bool = False
+    # if set, members of a template class are processed only if it is referenced by a typedef or
+    # a field, otherwise only its name and location are recorded.
+    lazy_template_classes: bool = True
 
 
 @dataclass()
@@ -147,6 +229,8 @@ class CXXParserOptions:
     args: Iterable[str] = field(default_factory=list)
     extra_options: CXXParserExtraOptions = field(default_factory=CXXParserExtraOptions)
     encoding: str = 'utf8'
+    # decides which files are input files, see CXXParser._is_input_file
+    file_classifier: FileClassifier = field(default_factory=FileClassifier)
 
 
 @dataclass()
@@ -155,44 +239,216 @@ class CXXParseResult:
     g: Namespace  # global namespace, cpp type tree starts from here
     macros: Dict[str, Macro] = field(default_factory=dict)
     objects: Dict[str, AnyCxxSymbol] = field(default_factory=dict)
-
-
-def file_location_from_extend(e: SourceLocation):
-    return FileLocation(line=e.line, column=e.column, offset=e.offset)
+    stats: Optional[ParseStats] = None  # if enabled in CXXParserExtraOptions
+    # type -> size in bytes in the target parsed for, of types in SIZED_TYPES supported by it
+    type_sizes: Dict[str, int] = field(default_factory=dict)
 
 
 def location_from_cursor(c: Cursor):
-    file = c.extent.start.file
-    if file:
-        return Location(file.name,
-                        file_location_from_extend(c.extent.start),
-                        file_location_from_extend(c.extent.end))
-    return None
+    return cursor_location(c)
 
 
 on_progress_type = Optional[Callable[[int, int], Any]]
 
 
+class ParserSession:
+    """
+    libclang state shared by parsers used one after another in a process,
+    eg: generating several modules in one build script.
+
+    A session owns a long-lived Index, the on-disk caches and the classification of files
+    (input file or system header). Everything cached per cursor is bound to a TranslationUnit,
+    so it stays in each parser.
+    No Thread Safe!
+    """
+
+    def __init__(self,
+                 encoding: str = 'utf-8',
+                 parse_cache_dir: str = None,
+                 translation_unit_cache_dir: str = None,
+                 ):
+        """
+        :param parse_cache_dir: if set, overrides CXXParserExtraOptions.parse_cache_dir of parsers.
+        :param translation_unit_cache_dir: if set, overrides
+        CXXParserExtraOptions.translation_unit_cache_dir of parsers.
+        """
+        set_cindex_encoding(encoding)
+        self.encoding = encoding
+        self.index = Index.create()
+        self.parse_cache = ParseCache(parse_cache_dir) if parse_cache_dir else None
+        self.translation_unit_cache = TranslationUnitCache(translation_unit_cache_dir) \
+            if translation_unit_cache_dir else None
+        # FileClassifier.key -> file name -> is input file
+        self.input_files: Dict[Tuple, Dict[str, bool]] = {}
+
+    def get_index(self, encoding: str) -> Index:
+        if encoding != self.encoding:
+            set_cindex_encoding(encoding)
+            self.encoding = encoding
+        return self.index
+
+
 class CXXParser:
 
     def __init__(
-        self, options: CXXParserOptions
+        self, options: CXXParserOptions, session: ParserSession = None
     ):
+        """
+        :param session: if set, libclang Index and caches are shared with other parsers using it.
+        """
         self.options = options
+        self.session = session
         self.objects: Dict[str, AnyCxxSymbol] = {}
+        self.macros: Dict[str, Macro] = {}
+        self.result: Optional[CXXParseResult] = None
+        self.tu: Optional[TranslationUnit] = None  # TranslationUnit of the last parse, if any
+        self.stats: Optional[ParseStats] = ParseStats() if options.extra_options.parse_stats \
+            else None
+
+        # file name -> is input file
+        self._input_files: Dict[str, bool] = \
+            session.input_files.setdefault(options.file_classifier.key, {}) if session else {}
+        self._qualified_names: Dict[int, Tuple[Cursor, str]] = {}  # cursor hash -> (cursor, name)
+        # file name -> (positions, tokens), see _tokenize_file
+        self._file_tokens: Dict[str, Optional[Tuple[List[int], List[Token]]]] = {}
+        # canonical cursor hash -> (canonical cursor, TemplateClass, members processed or not)
+        # of template classes, see _process_template_class
+        self._lazy_templates: Dict[int, Tuple[Cursor, TemplateClass, bool]] = {}
+        self._type_sizes_of_target: Optional[Dict[str, int]] = None  # see _type_sizes
+        # cursor hash -> (cursor, result of _field_names_by_type)
+        self._class_fields: Dict[int, Tuple[Cursor, Dict[str, str]]] = {}
 
     def parse(self) -> CXXParseResult:
         """No Thread Safe!"""
-        set_cindex_encoding(self.options.encoding)
-        idx = Index.create()
-        args = [*self.options.args,
+        cache = self.session.parse_cache if self.session else None
+        if cache is None and self.options.extra_options.parse_cache_dir:
+            cache = ParseCache(self.options.extra_options.parse_cache_dir)
+        if cache:
+            result = cache.load(self.options)
+            if result is not None:
+                self.objects = result.objects
+                self.macros = result.macros
+                result.stats = self.stats  # nothing parsed
+                self.result = result
+                return result
+
+        tu = self._parse_translation_unit()
+        for _ in self.iter_symbols(tu):
+            pass
+        result = self.result
+
+        if cache:
+            cache.store(self.options, result, [i.include.name for i in tu.get_includes()])
+        return result
+
+    def reparse(self) -> CXXParseResult:
+        """
+        Parse again after files changed.
+        TranslationUnit of the last parse is kept alive and reparsed by libclang, which is much
+        faster than parsing from scratch. Contents of unsaved files are taken from self.options.
+        If there is no TranslationUnit to reuse, or reparse failed, a full parse is performed.
+        No Thread Safe!
+        """
+        tu = self.tu
+        self._reset()
+        if tu is None:
+            return self.parse()
+        try:
+            tu.reparse(unsaved_files=self.options.unsaved_files)
+        except TranslationUnitLoadError as e:
+            logger.warning("failed to reparse translation unit, parsing from scratch: %s", e)
+            return self.parse()
+        self._log_diagnostics(tu)
+        self.tu = tu
+        for _ in self.iter_symbols(tu):
+            pass
+        return self.result
+
+    def _reset(self):
+        """drop everything parsed, caches about cursors are invalid after TranslationUnit changed"""
+        self.objects = {}
+        self.macros = {}
+        self.result = None
+        if self.stats is not None:
+            self.stats = ParseStats()
+        self.tu = None
+        self._qualified_names.clear()
+        self._file_tokens.clear()
+        self._class_fields.clear()
+        self._lazy_templates.clear()
+
+    def _clang_args(self) -> List[str]:
+        return [*self.options.args,
                 self.options.extra_options.standard.value,
                 self.options.extra_options.arch.value,
                 *[f'-D{i}' for i in self.options.definitions]
                 ]
-        rs = idx.parse(
+
+    def _type_sizes(self, idx: Index) -> Dict[str, int]:
+        """
+        :return: sizes of SIZED_TYPES for the same target as self.options, got from libclang by
+        parsing a variable of each type.
+        """
+        code = "".join(f"{t} c2py_size_{i};\n" for i, t in enumerate(SIZED_TYPES))
+        tu = idx.parse(TYPE_SIZES_FILE, args=self._clang_args(),
+                       unsaved_files=[(TYPE_SIZES_FILE, code)])
+        # types unsupported by the target(eg: char8_t before c++20) are skipped
+        invalid_lines = {d.location.line for d in tu.diagnostics
+                         if d.severity >= Diagnostic.Error}
+        res = {}
+        for c in tu.cursor.get_children():
+            if c.kind == CursorKind.VAR_DECL and c.spelling.startswith("c2py_size_"):
+                i = int(c.spelling[10:])
+                size = c.type.get_size()
+                if size >= 0 and i + 1 not in invalid_lines:
+                    res[SIZED_TYPES[i]] = size
+        return res
+
+    def iter_symbols(self, tu: TranslationUnit = None) -> Iterator[AnyCxxSymbol]:
+        """
+        Parse and yield symbols one by one, each right after its top-level cursor is processed.
+        Symbols in a namespace are yielded as a whole namespace. Macros are yielded too.
+        Iteration can be stopped at any time, symbols processed so far are kept in self.result.
+        No Thread Safe!
+        """
+        if tu is None:
+            tu = self._parse_translation_unit()
+        self.tu = tu
+        if self._type_sizes_of_target is None:
+            self._type_sizes_of_target = self._type_sizes(tu.index)
+        ns = Namespace(
+            name='',
+            parent=None,
+            location=location_from_cursor(tu.cursor),
+        )
+        self.result = CXXParseResult(parser_options=self.options,
+                                     g=ns,
+                                     macros=self.macros,
+                                     objects=self.objects,
+                                     stats=self.stats,
+                                     type_sizes=self._type_sizes_of_target,
+                                     )
+        yield from self._iter_namespace(tu.cursor, ns, store_global=True,
+                                        on_progress=self.on_progress)
+
+    def _parse_translation_unit(self, idx: Index = None) -> TranslationUnit:
+        if idx is None:
+            if self.session:
+                idx = self.session.get_index(self.options.encoding)
+            else:
+                set_cindex_encoding(self.options.encoding)
+                idx = Index.create()
+        tu_cache = self.session.translation_unit_cache if self.session else None
+        if tu_cache is None and self.options.extra_options.translation_unit_cache_dir:
+            tu_cache = TranslationUnitCache(self.options.extra_options.translation_unit_cache_dir)
+        if tu_cache:
+            tu = tu_cache.load(self.options, idx)
+            if tu is not None:
+                return tu
+
+        tu = idx.parse(
             self.options.file_path,
-            args=args,
+            args=self._clang_args(),
             unsaved_files=self.options.unsaved_files,
             options=(
                 TranslationUnit.PARSE_DETAILED_PROCESSING_RECORD |
@@ -200,24 +456,16 @@ class CXXParser:
                 TranslationUnit.PARSE_INCLUDE_BRIEF_COMMENTS_IN_CODE_COMPLETION
             ),
         )
-        for i in rs.diagnostics:
+        self._log_diagnostics(tu)
+        if tu_cache:
+            tu_cache.store(self.options, tu)
+        return tu
+
+    @staticmethod
+    def _log_diagnostics(tu: TranslationUnit):
+        for i in tu.diagnostics:
             if i.severity >= Diagnostic.Warning:
                 logger.warning("%s", i)
-        ns = Namespace(
-            name='',
-            parent=None,
-            location=location_from_cursor(rs.cursor),
-        )
-        self._process_namespace(rs.cursor, ns, store_global=True, on_progress=self.on_progress)
-        result = CXXParseResult(parser_options=self.options, g=ns)
-
-        for ac in rs.cursor.walk_preorder():
-            # parse macros
-            if ac.kind == CursorKind.MACRO_DEFINITION:
-                m = CXXParser._process_macro_definition(ac)
-                result.macros[m.name] = m
-        result.objects = self.objects
-        return result
 
     def on_progress(self, cur, total):
         if self.options.extra_options.show_progress:
@@ -233,58 +481,101 @@ class CXXParser:
                            on_progress: on_progress_type = None,
                            ):
         """All result will append in parameter n"""
-        n.location = location_from_cursor(c)
+        for _ in self._iter_namespace(c, n, store_global, on_progress):
+            pass
+        return n
+
+    def _iter_namespace(self,
+                        c: Cursor,
+                        n: Namespace,
+                        store_global: bool,
+                        on_progress: on_progress_type = None,
+                        ) -> Iterator[AnyCxxSymbol]:
+        """All result will append in parameter n, and every direct child is yielded"""
         self.objects[n.full_name] = n
         if c.kind == CursorKind.NAMESPACE and c.spelling:
             n.name = c.spelling
-        children = list(c.get_children())
+        children = visit_children(c)
         count = len(children)
 
-        passed = False
-
-        for i, ac in enumerate(children):
+        for i, r in enumerate(children):
+            ac = r.cursor
             # log cursor kind
-            if ac.kind != CursorKind.MACRO_DEFINITION:
-                logger.debug("%s", ac.kind)
-            if passed or ac.spelling == 'A':
-                passed = True
-                print(ac.kind)
-
-            # skip macros
-            if ac.kind == CursorKind.MACRO_DEFINITION:
-                continue
+            if r.kind != CursorKind.MACRO_DEFINITION:
+                logger.debug("%s", r.kind)
+
+            # macros: they are always a direct child of translation unit
+            if r.kind == CursorKind.MACRO_DEFINITION:
+                s = None
+                if self._is_input_file(ac):
+                    s = self._process_macro_definition(ac)
+                    self.macros[s.name] = s
+            # extern "C" {...}: its children belongs to n
+            elif r.kind in EXTERN_C_CURSORS:
+                s = None
+                yield from self._iter_namespace(ac, n, store_global)
+            else:
+                s = self._process_namespace_child(ac, n, store_global=store_global)
 
-            self._process_namespace_child(ac, n, store_global=store_global)
             if on_progress:
                 on_progress(i + 1, count)
-        return n
+            if s is not None:
+                yield s
 
-    def _process_namespace_child(self, ac: Cursor, n: Namespace, store_global: bool):
+    def _is_input_file(self, c: Cursor):
+        """
+        check if cursor comes from input files, rather than system headers.
+        result is cached per file.
+        """
+        name = cursor_file(c)
+        if name is None:
+            return False  # built-in macros
+        try:
+            return self._input_files[name]
+        except KeyError:
+            res = not self.options.file_classifier.is_internal_file(name)
+            self._input_files[name] = res
+            return res
+
+    @record_stats('namespace')
+    def _process_namespace_child(self, ac: Cursor, n: Namespace, store_global: bool) \
+        -> Optional[AnyCxxSymbol]:
+        """
+        :return: symbol processed, None if nothing is recorded.
+        """
+        if (self.options.extra_options.prune_system_headers
+            and ac.kind not in STUB_TRANSPARENT_CURSORS
+            and not self._is_input_file(ac)
+        ):
+            return self._process_stub(ac, n, store_global=store_global)
         # extern "C" {...}
-        if ac.kind == CursorKind.UNEXPOSED_DECL:
+        elif ac.kind in EXTERN_C_CURSORS:
             self._process_namespace(ac, n, store_global)
         # sub namespace
         elif ac.kind == CursorKind.NAMESPACE:
-            sub_ns = Namespace(
-                name=ac.spelling,
-                parent=n,
-                location=location_from_cursor(ac),
-                brief_comment=ac.brief_comment,
-            )
-            self._process_namespace(ac, sub_ns, store_global)
-            if sub_ns.name not in n.namespaces:
+            # a reopened namespace is processed into the node created by its first block
+            sub_ns = n.namespaces.get(ac.spelling, None)
+            if sub_ns is None:
+                sub_ns = Namespace(
+                    name=ac.spelling,
+                    parent=n,
+                    location=location_from_cursor(ac),
+                    brief_comment=ac.brief_comment,
+                )
                 n.namespaces[sub_ns.name] = sub_ns
-            else:
-                n.namespaces[sub_ns.name].extend(sub_ns)
+            self._process_namespace(ac, sub_ns, store_global)
+            return sub_ns
         # function
         elif ac.kind == CursorKind.FUNCTION_DECL:
             func = self._process_function(ac, n, store_global=store_global)
             n.functions[func.name].append(func)
+            return func
         # enum
         elif ac.kind == CursorKind.ENUM_DECL:
             e = self._process_enum(ac, n, store_global=store_global)
             e.parent = n
             n.enums[e.name] = e
+            return e
         # class
         elif (
             ac.kind == CursorKind.CLASS_DECL
@@ -294,6 +585,7 @@ class CXXParser:
             class_ = self._process_class(ac, n, store_global=store_global)
             class_.parent = n
             n.classes[class_.name] = class_
+            return class_
         # class template
         # is just parsed as a class, no template variables will parsed
         elif (
@@ -303,10 +595,12 @@ class CXXParser:
             class_ = self._process_template_class(ac, n, store_global=store_global)
             class_.parent = n
             n.template_classes[class_.name] = class_
+            return class_
         # variable
         elif ac.kind == CursorKind.VAR_DECL:
             value = self._process_variable(ac, n, store_global=store_global)
             n.variables[value.name] = value
+            return value
         elif (ac.kind == CursorKind.TYPEDEF_DECL
               or ac.kind == CursorKind.TYPE_ALIAS_DECL
         ):
@@ -315,9 +609,11 @@ class CXXParser:
                 n.typedefs[tp.name] = tp
             if isinstance(tp, Class):
                 n.classes[tp.name] = tp
+            return tp
         elif ac.kind == CursorKind.TYPE_ALIAS_TEMPLATE_DECL:
             tp = self._process_template_alias(ac, n, store_global=store_global)
             n.typedefs[tp.name] = tp
+            return tp
         elif (ac.kind in NAMESPACE_UNSUPPORTED_CURSORS
               or self._is_literal_cursor(ac)):
             pass
@@ -330,6 +626,54 @@ class CXXParser:
                     ac.spelling,
                     ac.extent,
                 )
+        return None
+
+    def _process_stub(self, ac: Cursor, n: Namespace, store_global: bool):
+        """
+        process a cursor from system headers: types are recorded without any members,
+        so that typedefs can still be resolved. Anything else is skipped.
+        """
+        if (
+            ac.kind == CursorKind.CLASS_DECL
+            or ac.kind == CursorKind.STRUCT_DECL
+            or ac.kind == CursorKind.UNION_DECL
+        ):
+            class_ = self._process_class(ac, n, store_global=store_global, stub=True)
+            n.classes[class_.name] = class_
+            return class_
+        elif (
+            ac.kind == CursorKind.CLASS_TEMPLATE
+            or ac.kind == CursorKind.CLASS_TEMPLATE_PARTIAL_SPECIALIZATION
+        ):
+            class_ = TemplateClass(name=ac.spelling,
+                                   parent=n,
+                                   location=location_from_cursor(ac),
+                                   )
+            if store_global:
+                self.objects[class_.full_name] = class_
+            n.template_classes[class_.name] = class_
+            return class_
+        elif ac.kind == CursorKind.ENUM_DECL:
+            e = Enum(name=ac.spelling,
+                     parent=n,
+                     location=location_from_cursor(ac),
+                     type=ac.enum_type.spelling,
+                     is_strong_typed=ac.is_scoped_enum(),
+                     )
+            if store_global:
+                self.objects[e.full_name] = e
+            n.enums[e.name] = e
+            return e
+        elif (ac.kind == CursorKind.TYPEDEF_DECL
+              or ac.kind == CursorKind.TYPE_ALIAS_DECL
+        ):
+            tp = self._process_typedef(ac, n, store_global=store_global, stub=True)
+            if isinstance(tp, Class):
+                n.classes[tp.name] = tp
+            return tp
+        elif ac.kind == CursorKind.TYPE_ALIAS_TEMPLATE_DECL:
+            return self._process_template_alias(ac, n, store_global=store_global)
+        return None
 
     def _process_function(self, c: Cursor, parent: Namespace, store_global: bool):
         func = Function(
@@ -338,8 +682,8 @@ class CXXParser:
             location=location_from_cursor(c),
             ret_type=c.result_type.spelling,
             args=[
-                Variable(name=ac.spelling, type=ac.type.spelling)
-                for ac in c.get_arguments()
+                Variable(name=r.spelling, type=r.type_spelling)
+                for r in visit_children(c) if r.kind == CursorKind.PARM_DECL
             ],
             brief_comment=c.brief_comment,
         )
@@ -347,6 +691,7 @@ class CXXParser:
             self.objects[func.full_name] = func
         return func
 
+    @record_stats('method')
     def _process_method(self, c: Cursor, class_, store_global: bool):
         func = Method(
             parent=class_,
@@ -359,13 +704,15 @@ class CXXParser:
             is_static=c.is_static_method(),
             brief_comment=c.brief_comment,
         )
-        for ac in c.get_arguments():
-            arg = self._process_variable(ac, class_, warn_failed=False, store_global=store_global)
-            func.args.append(arg)
-        for ac in c.get_children():
-            if ac.kind == CursorKind.CXX_FINAL_ATTR:
+        for r in visit_children(c):
+            ac = r.cursor
+            if r.kind == CursorKind.PARM_DECL:
+                arg = self._process_variable(ac, class_, warn_failed=False,
+                                             store_global=store_global)
+                func.args.append(arg)
+            elif r.kind == CursorKind.CXX_FINAL_ATTR:
                 func.is_final = True
-            elif ac.kind in METHOD_UNSUPPORTED_CURSORS or ac.kind in IGNORED_CURSORS:
+            elif r.kind in METHOD_UNSUPPORTED_CURSORS or r.kind in IGNORED_CURSORS:
                 pass
             else:
                 logger.warning(
@@ -377,9 +724,11 @@ class CXXParser:
             self.objects[func.full_name] = func
         return func
 
-    def _process_class(self, c: Cursor, parent: AnyCxxSymbol, store_global: bool, name: str = ''):
+    def _process_class(self, c: Cursor, parent: AnyCxxSymbol, store_global: bool, name: str = '',
+                       stub: bool = False):
         """
         :param name: name it with specific name.
+        :param stub: if set, members are not processed.
         """
         # noinspection PyArgumentList
         if not name:
@@ -388,9 +737,11 @@ class CXXParser:
                        parent=parent,
                        location=location_from_cursor(c),
                        brief_comment=c.brief_comment,
+                       size=max(c.type.get_size(), -1),
                        )
-        for ac in c.get_children():
-            self._process_class_child(ac, class_, store_global=store_global)
+        if not stub:
+            for r in visit_children(c):
+                self._process_class_child(r.cursor, class_, store_global=store_global)
 
         if store_global:
             self.objects[class_.full_name] = class_
@@ -407,23 +758,65 @@ class CXXParser:
             )
         else:
             union_type = self._process_class(c, parent=class_, store_global=store_global)
-        for ac in c.get_children():
-            self._process_class_child(ac, union_type, store_global=store_global)
+        for r in visit_children(c):
+            self._process_class_child(r.cursor, union_type, store_global=store_global)
         if store_global:
             self.objects[union_type.full_name] = union_type
         return union_type
 
     def _process_template_class(self, c: Cursor, parent: AnyCxxSymbol, store_global: bool):
-        class_ = self._process_class(c, parent, False)
-        class_ = TemplateClass(**class_.__dict__)
-        class_.location = location_from_cursor(c)
+        if self.options.extra_options.lazy_template_classes:
+            # template classes are not generated, members are processed only when referenced.
+            canonical = c.canonical
+            entry = self._lazy_templates.get(canonical.hash, None)
+            if entry is not None and entry[0] == canonical:
+                # forward declarations and the definition of a template share one TemplateClass,
+                # its members may be processed already.
+                class_ = entry[1]
+                if c.is_definition():
+                    class_.location = location_from_cursor(c)
+                    class_.brief_comment = c.brief_comment
+            else:
+                class_ = TemplateClass(name=c.spelling,
+                                       parent=parent,
+                                       location=location_from_cursor(c),
+                                       brief_comment=c.brief_comment,
+                                       )
+                self._lazy_templates[canonical.hash] = (canonical, class_, False)
+        else:
+            class_ = self._process_class(c, parent, False)
+            class_ = TemplateClass(**field_values(class_))
+            class_.location = location_from_cursor(c)
 
         if store_global:
             self.objects[class_.full_name] = class_
         return class_
 
-    @staticmethod
-    def _union_scope_name(union_cursor: Cursor):
+    def _expand_referenced_templates(self, c: Cursor):
+        """
+        If c references template classes not processed yet, process their members now.
+        Templates are resolved through TEMPLATE_REF children of c.
+        """
+        if not self._lazy_templates:
+            return
+        for ac in c.get_children():
+            kind = ac.kind
+            if kind == CursorKind.TEMPLATE_REF:
+                ref = ac.referenced.canonical
+                entry = self._lazy_templates.get(ref.hash)
+                if entry is not None and entry[0] == ref and not entry[2]:
+                    class_ = entry[1]
+                    self._lazy_templates[ref.hash] = (ref, class_, True)
+                    # canonical cursor is the first declaration, which may have no members
+                    definition = ref.get_definition()
+                    if definition is not None:
+                        for r in visit_children(definition):
+                            self._process_class_child(r.cursor, class_, store_global=False)
+            elif kind == CursorKind.TYPE_ALIAS_DECL:
+                # children of alias template
+                self._expand_referenced_templates(ac)
+
+    def _union_scope_name(self, union_cursor: Cursor):
         """
         If this (anonymous) union type is scoped, return its scope name. Or return None.
 
@@ -431,13 +824,25 @@ class CXXParser:
         checking method: a scoped anonymous type must be reference by a FIELD_DECL in its parent.
         :return: scope_name
         """
-        pc = union_cursor.semantic_parent
-        for ac in pc.get_children():
-            if ac.kind == CursorKind.FIELD_DECL:
-                if ac.type.get_named_type().spelling == union_cursor.type.spelling:
-                    return ac.spelling
-        return None
+        return self._field_names_by_type(union_cursor.semantic_parent).get(
+            union_cursor.type.spelling, None)
 
+    def _field_names_by_type(self, c: Cursor) -> Dict[str, str]:
+        """
+        :return: {type spelling of field: name of the first field of that type} of a class.
+        built once per class.
+        """
+        cached = self._class_fields.get(c.hash, None)
+        if cached is not None and cached[0] == c:
+            return cached[1]
+        fields: Dict[str, str] = {}
+        for r in visit_children(c):
+            if r.kind == CursorKind.FIELD_DECL:
+                fields.setdefault(r.cursor.type.get_named_type().spelling, r.spelling)
+        self._class_fields[c.hash] = (c, fields)
+        return fields
+
+    @record_stats('class')
     def _process_class_child(self, ac: Cursor, class_: Class, store_global: bool):
         if ac.kind == CursorKind.CXX_BASE_SPECIFIER:
             super_name = self._qualified_name(ac)
@@ -524,11 +929,12 @@ class CXXParser:
                  is_strong_typed=c.is_scoped_enum(),
                  brief_comment=c.brief_comment,
                  )
-        for i in list(c.get_children()):
-            e.variables[i.spelling] = Variable(
+        for r in visit_children(c):
+            i = r.cursor
+            e.variables[r.spelling] = Variable(
                 parent=e,
-                name=i.spelling,
-                location=location_from_cursor(i),
+                name=r.spelling,
+                location=r.location,
                 type=e.name,
                 value=i.enum_value,
                 brief_comment=c.brief_comment,
@@ -545,6 +951,8 @@ class CXXParser:
         type = c.type.get_named_type().spelling  # todo: use self.qualified_name or replace it .
         if not type:
             type = c.type.spelling
+        if c.kind == CursorKind.FIELD_DECL and '<' in type:
+            self._expand_referenced_templates(c)
 
         var = Variable(
             name=c.spelling,
@@ -555,14 +963,17 @@ class CXXParser:
             brief_comment=c.brief_comment,
             access=c.access_specifier.name.lower(),
         )
-        literal, value = self._parse_literal_cursor(c, warn_failed)
-        var.literal = literal
-        var.value = value
+        # only values of constants(not fields, arguments or mutable variables) are used,
+        # and tokenizing is expensive.
+        if c.kind == CursorKind.VAR_DECL and c.type.is_const_qualified():
+            literal, value = self._parse_literal_cursor(c, warn_failed)
+            var.literal = literal
+            var.value = value
         if store_global:
             self.objects[var.full_name] = var
         return var
 
-    def _process_typedef(self, c: Cursor, ns: Namespace, store_global: bool):
+    def _process_typedef(self, c: Cursor, ns: Namespace, store_global: bool, stub: bool = False):
         name = c.spelling
         target_cursor = c.underlying_typedef_type
         target_name: str = self._qualified_name(target_cursor)
@@ -570,7 +981,7 @@ class CXXParser:
         for ac in c.get_children():
             kind = ac.kind
             if kind == CursorKind.STRUCT_DECL:
-                class_ = self._process_class(ac, ns, store_global, name=name)
+                class_ = self._process_class(ac, ns, store_global, name=name, stub=stub)
                 return class_
                 # ns.classes[class_.name] = class_
             elif kind in TYPEDEF_UNSUPPORTED_CURSORS:
@@ -590,6 +1001,7 @@ class CXXParser:
             return self.save_typedef(c, ns, name, target_name, store_global=store_global)
 
     def save_typedef(self, c: Cursor, ns: Namespace, name: str, target_name: str, store_global: bool):
+        self._expand_referenced_templates(c)
         tp = Typedef(name=name,
                      target=target_name,
                      parent=ns,
@@ -601,10 +1013,10 @@ class CXXParser:
         ns.typedefs[tp.name] = tp
         return tp
 
-    @staticmethod
-    def _process_macro_definition(c: Cursor):
+    @record_stats('macro')
+    def _process_macro_definition(self, c: Cursor):
         name = c.spelling
-        tokens = list(c.get_tokens())
+        tokens = self._macro_tokens(c)
         length = len(tokens)
         m = Macro(name=name,
                   parent=None,  # macro has no parent
@@ -617,21 +1029,65 @@ class CXXParser:
         m.definition = " ".join([i.spelling for i in tokens[1:]])
         return m
 
+    def _macro_tokens(self, c: Cursor) -> List[Token]:
+        """
+        tokens of a macro definition, sliced from tokens of the whole file.
+        every file is tokenized only once.
+        """
+        file = cursor_location(c).file
+        try:
+            file_tokens = self._file_tokens[file]
+        except KeyError:
+            file_tokens = self._file_tokens[file] = self._tokenize_file(c, file)
+        if file_tokens is None:
+            return list(c.get_tokens())
+        positions, tokens = file_tokens
+        extent = c.extent
+        begin = bisect_left(positions, extent.begin_int_data)
+        end = bisect_left(positions, extent.end_int_data, begin)
+        return tokens[begin:end]
+
+    def _tokenize_file(self, c: Cursor, file: str) \
+        -> Optional[Tuple[List[int], List[Token]]]:
+        """
+        tokenize the whole file containing macro c.
+        :return: (positions, tokens), or None if tokens can't be sliced by position.
+
+        position of a token is the raw encoding of its SourceLocation, which is what ranges
+        returned by libclang are made of, so slicing takes no call into libclang.
+        the first macro is checked against its own tokens before trusting this.
+        """
+        size = self._file_size(file)
+        if size is None:
+            return None
+        tu = c.translation_unit
+        tokens = list(tu.get_tokens(extent=tu.get_extent(file, (0, size))))
+        positions = [t.int_data[1] for t in tokens]
+        file_tokens = positions, tokens
+
+        self._file_tokens[file] = file_tokens
+        expected = [t.spelling for t in c.get_tokens()]
+        if [t.spelling for t in self._macro_tokens(c)] != expected:
+            logger.debug("can't slice macros from tokens of file %s", file)
+            return None
+        return file_tokens
+
+    def _file_size(self, file: str) -> Optional[int]:
+        for name, content in (self.options.unsaved_files or []):
+            if os.path.abspath(name) == os.path.abspath(file):
+                # libclang measures files in bytes
+                if isinstance(content, str):
+                    content = content.encode(self.options.encoding)
+                return len(content)
+        try:
+            return os.path.getsize(file)
+        except OSError:
+            return None
+
     def _qualified_name(self, c: Union[str, Type, Cursor]):
         # if c.kind == CursorKind.
         if isinstance(c, str):
-            name = c
-            if name.startswith('::'):
-                return self._qualified_name(name[2:])
-            if name.startswith('enum '):
-                return self._qualified_name(name[5:])
-            if name.startswith('class '):
-                return self._qualified_name(name[6:])
-            if name.startswith('union '):
-                return self._qualified_name(name[6:])
-            if name.startswith('struct '):
-                return self._qualified_name(name[7:])
-            return name
+            return QUALIFIER_PREFIX_PATTERN.sub('', c, count=1)
         if isinstance(c, Cursor):
             return self._qualified_cursor_name(c)
         elif isinstance(c, Type):
@@ -641,12 +1097,22 @@ class CXXParser:
         return self._qualified_name(c.spelling)
 
     def _qualified_cursor_name(self, c: Cursor):
-        if c.semantic_parent:
-            if (c.semantic_parent.kind == CursorKind.NAMESPACE
-                or c.semantic_parent.kind == CursorKind.CLASS_DECL
-            ):
-                return self._qualified_name(f'{self._qualified_name(c.semantic_parent)}::{c.spelling}')
-        return self._qualified_name(f'::{c.spelling}')
+        """
+        result is cached per cursor, and is built from the cached name of its semantic parent.
+        """
+        cached = self._qualified_names.get(c.hash, None)
+        if cached is not None and cached[0] == c:
+            return cached[1]
+
+        parent = c.semantic_parent
+        if parent and (parent.kind == CursorKind.NAMESPACE
+                       or parent.kind == CursorKind.CLASS_DECL
+        ):
+            name = self._qualified_name(f'{self._qualified_cursor_name(parent)}::{c.spelling}')
+        else:
+            name = self._qualified_name(c.spelling)
+        self._qualified_names[c.hash] = (c, name)
+        return name
 
     def _get_template_alias_target(self, c: Cursor):
         children = list(c.get_children())
@@ -707,6 +1173,7 @@ class CXXParser:
                         return t.spelling, self._try_parse_literal(child.kind, t.spelling)
         return None, None
 
+    @record_stats('literal')
     def _parse_literal_cursor(self, c: Cursor, warn_failed: bool = False) \
         -> Tuple[Optional[str], Optional[Union[str, float, int]]]:
         """
@@ -757,6 +1224,79 @@ def seek_file(file: str, paths: Iterable[str], allow_dir: bool = False):
                 return final_path
 
 
+def merge_parse_results(options: CXXParserOptions, results: Sequence[CXXParseResult]):
+    """
+    Merge results parsed from different translation units.
+    If a symbol(or macro) appears in more than one result, the one comes first is kept,
+    unless it is only a forward declaration. Overloads of a function are concatenated.
+    """
+    g = results[0].g
+    macros = dict(results[0].macros)
+    objects = dict(results[0].objects)
+    stats = ParseStats() if results[0].stats is not None else None
+    for r in results[1:]:
+        g.merge(r.g)
+        for k, v in r.macros.items():
+            macros.setdefault(k, v)
+        # Namespace.merge() keeps symbols of the former tree and moves the others into it,
+        # objects follows the same rule to point at symbols in merged tree.
+        for k, v in r.objects.items():
+            if replaces_symbol(objects.get(k, None), v):
+                objects[k] = v
+    if stats is not None:
+        for r in results:
+            stats.merge(r.stats)
+    # every translation unit is parsed for the same target
+    return CXXParseResult(parser_options=options, g=g, macros=macros, objects=objects,
+                          stats=stats, type_sizes=results[0].type_sizes)
+
+
+def parse_targets(parsers: Sequence["CXXParser"], jobs: int = 1) -> List[CXXParseResult]:
+    """
+    Parse with parsers for different targets, at most `jobs` of them concurrently in processes.
+    """
+    if jobs <= 1 or len(parsers) <= 1:
+        return [parser.parse() for parser in parsers]
+    with ProcessPoolExecutor(max_workers=min(jobs, len(parsers))) as executor:
+        return list(executor.map(_parse_in_process, parsers))
+
+
+def class_layout_differences(results: Dict[str, CXXParseResult]) -> Dict[str, List[str]]:
+    """
+    Compare fields of every class among results parsed for different targets.
+    :param results: {target name: result}
+    :return: {full name of class: [names of targets]} for classes whose layout(size, type and
+    order of fields) is not the same in all of targets, or appear in some of targets only.
+    """
+    layouts: Dict[str, Dict[str, Tuple]] = defaultdict(dict)
+    for target, result in results.items():
+        for name, o in result.objects.items():
+            if isinstance(o, Class):
+                layouts[name][target] = (
+                    o.size,
+                    tuple((v.name, v.type) for v in o.variables.values()),
+                )
+    differences = {}
+    for name, by_target in layouts.items():
+        if (len(by_target) != len(results)
+            or len(set(by_target.values())) != 1
+        ):
+            differences[name] = list(by_target.keys())
+    return differences
+
+
+def _parse_in_process(parser: "CXXParser"):
+    # result is pickled to be sent back to main process
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), PICKLE_RECURSION_LIMIT))
+    return parser.parse()
+
+
+def _parse_files_in_process(kwargs: Dict[str, Any]):
+    # result is pickled to be sent back to main process
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), PICKLE_RECURSION_LIMIT))
+    return CxxFileParser(**kwargs).parse()
+
+
 class CxxFileParser(CXXParser):
 
     def __init__(
@@ -766,17 +1306,38 @@ class CxxFileParser(CXXParser):
         include_paths: Sequence[str] = None,
         args: List[str] = None,
         definitions: List[str] = None,
-        extra_options: CXXParserExtraOptions = None
+        extra_options: CXXParserExtraOptions = None,
+        jobs: int = 1,
+        session: ParserSession = None,
+        file_classifier: FileClassifier = None,
     ):
+        """
+        :param jobs: if greater than 1, files are split into (at most) this number of groups,
+        each group is parsed in a separated process as a translation unit, and results are merged.
+        :param session: see CXXParser. Not used by processes parsing groups of files.
+        :param file_classifier: see CXXParserOptions.file_classifier.
+        """
         if definitions is None:
             definitions = []
         unsaved_files = []
         if args is None:
             args = []
+        self.files = list(files)
+        self.jobs = jobs
+        self._group_kwargs = dict(
+            encoding=encoding,
+            include_paths=include_paths,
+            args=list(args),
+            definitions=definitions,
+        )
+        args = list(args)
         if include_paths:
             args.extend([f'-I{i}' for i in include_paths])
         if extra_options is None:
             extra_options = CXXParserExtraOptions()
+        if file_classifier is None:
+            file_classifier = FileClassifier()
+        self._group_kwargs['file_classifier'] = file_classifier
 
         dummy_code = ""
         for file in files:
@@ -793,8 +1354,35 @@ class CxxFileParser(CXXParser):
             args=args,
             extra_options=extra_options,
             encoding=encoding,
+            file_classifier=file_classifier,
         )
-        super().__init__(options=options)
+        super().__init__(options=options, session=session)
+
+    def parse(self) -> CXXParseResult:
+        if self.jobs > 1 and len(self.files) > 1:
+            return self._parse_parallel()
+        return super().parse()
+
+    def _parse_parallel(self):
+        extra_options = replace(self.options.extra_options)
+        extra_options.show_progress = False
+        n = min(self.jobs, len(self.files))
+        size, remain = divmod(len(self.files), n)
+        groups = []
+        start = 0
+        for i in range(n):
+            end = start + size + (1 if i < remain else 0)
+            groups.append(self.files[start:end])
+            start = end
+
+        tasks = [{**self._group_kwargs, 'files': group, 'extra_options': extra_options}
+                 for group in groups]
+        with ProcessPoolExecutor(max_workers=n) as executor:
+            results = list(executor.map(_parse_files_in_process, tasks))
+        result = merge_parse_results(self.options, results)
+        self.objects = result.objects
+        self.stats = result.stats
+        return result
 
 
 mydir = os.path.split(os.path.abspath(__file__))[0]
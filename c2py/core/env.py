@@ -1,6 +1,62 @@
+import fnmatch
 import os
+from typing import Dict, Iterable, Tuple
 
 DEFAULT_INCLUDE_PATHS = []
 
 if 'INCLUDE' in os.environ:
     DEFAULT_INCLUDE_PATHS.extend(os.environ['INCLUDE'].split(os.path.pathsep))
+
+INTERNAL_PATH_FLAG = {
+    "Microsoft Visual Studio",
+    "Windows Kits",
+    "/usr"
+}
+
+
+def is_internal_file(file_path: str):
+    """
+    check if file is a system/compiler header.
+    """
+    for path in DEFAULT_INCLUDE_PATHS:
+        if file_path.startswith(path):
+            return True
+    for flag in INTERNAL_PATH_FLAG:
+        if flag in file_path:
+            return True
+    return False
+
+
+class FileClassifier:
+    """
+    memoized is_internal_file(), extended with globs matched against file path:
+    files matching any of input_globs are never internal,
+    otherwise files matching any of internal_globs are always internal.
+    """
+
+    def __init__(self, internal_globs: Iterable[str] = (), input_globs: Iterable[str] = ()):
+        self.internal_globs = list(internal_globs)
+        self.input_globs = list(input_globs)
+        self._internal: Dict[str, bool] = {}
+
+    @property
+    def key(self) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        """
+        classifiers with the same key classify every file the same way.
+        """
+        return tuple(self.internal_globs), tuple(self.input_globs)
+
+    def is_internal_file(self, file_path: str) -> bool:
+        try:
+            return self._internal[file_path]
+        except KeyError:
+            self._internal[file_path] = res = self._classify(file_path)
+            return res
+
+    def _classify(self, file_path: str) -> bool:
+        path = file_path.replace('\\', '/')
+        if any(fnmatch.fnmatch(path, g) for g in self.input_globs):
+            return False
+        if any(fnmatch.fnmatch(path, g) for g in self.internal_globs):
+            return True
+        return is_internal_file(file_path)
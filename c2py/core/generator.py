@@ -2,7 +2,7 @@ import logging
 import os
 from abc import abstractmethod
 from dataclasses import dataclass, field
-from typing import Dict, Sequence
+from typing import Dict, List, Sequence
 
 from c2py.core.core_types.generator_types import GeneratorNamespace, GeneratorSymbol, filter_symbols
 from c2py.core.preprocessor import PreProcessorResult
@@ -92,6 +92,23 @@ class GeneratorResult:
             with open(output_filepath, "wt") as f:
                 f.write(data)
 
+    def output_changes(self, output_dir: str, previous: "GeneratorResult") -> List[str]:
+        """
+        Write only files differ from previous result(which is assumed to be already written into
+        output_dir), and remove files no longer generated.
+        Unchanged files are untouched, so build tools won't rebuild them.
+        :return: names of files written or removed.
+        """
+        changed = [name for name, data in self.saved_files.items()
+                   if previous.saved_files.get(name, None) != data]
+        removed = [name for name in previous.saved_files if name not in self.saved_files]
+        GeneratorResult({name: self.saved_files[name] for name in changed}).output(output_dir)
+        for name in removed:
+            output_filepath = f"{output_dir}/{name}"
+            if os.path.exists(output_filepath):
+                os.unlink(output_filepath)
+        return changed + removed
+
     def print_filenames(self):
         print(f"# of files generated : {len(self.saved_files)}")
         for name in self.saved_files:
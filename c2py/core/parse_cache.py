@@ -0,0 +1,200 @@
+"""
+on-disk caches of parser.
+
+ParseCache: caches CXXParseResult.
+TranslationUnitCache: caches libclang TranslationUnit as an AST file.
+
+A cache entry is addressed by a digest of everything passed to libclang(args, definitions,
+standard, arch, encoding and unsaved files). Every entry also records each file included by the
+translation unit, an entry is used only if all of them are unchanged.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sys
+from dataclasses import fields
+from typing import Iterable, List, Optional, TYPE_CHECKING, Tuple
+
+import c2py
+from c2py.clang.cindex import Index, TranslationUnit, TranslationUnitLoadError, \
+    TranslationUnitSaveError
+
+logger = logging.getLogger(__file__)
+
+if TYPE_CHECKING:
+    from c2py.core.cxxparser import CXXParseResult, CXXParserOptions
+
+# fields of CXXParserExtraOptions which don't affect parse result
+NON_RESULT_OPTIONS = {'parse_cache_dir', 'translation_unit_cache_dir', 'parse_stats'}
+
+# symbol tree is linked both downward(children) and upward(parent),
+# default recursion limit is not enough for pickling a large tree.
+PICKLE_RECURSION_LIMIT = 100000
+
+
+def file_digest(path: str) -> Optional[str]:
+    """
+    :return: sha1 of file content, None if file is not readable.
+    """
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def options_digest(options: "CXXParserOptions") -> str:
+    """
+    digest of everything that affects parse result, excluding content of included files.
+    """
+    h = hashlib.sha1()
+
+    def update(s: str):
+        h.update(s.encode('utf-8'))
+        h.update(b'\0')
+
+    extra_options = options.extra_options
+    update(c2py.__version__)
+    update(options.file_path)
+    update(options.encoding)
+    for f in fields(extra_options):
+        if f.name not in NON_RESULT_OPTIONS:
+            update(repr(getattr(extra_options, f.name)))
+    update(repr(options.file_classifier.key))
+    for i in options.args:
+        update(i)
+    update('')
+    for i in options.definitions:
+        update(i)
+    update('')
+    for name, content in (options.unsaved_files or []):
+        update(name)
+        update(content)
+    return h.hexdigest()
+
+
+def save_object(path: str, obj, compress: bool = False):
+    dir_path = os.path.dirname(path)
+    if dir_path and not os.path.exists(dir_path):
+        os.makedirs(dir_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, PICKLE_RECURSION_LIMIT))
+    try:
+        with (gzip.open(tmp_path, "wb", compresslevel=6) if compress
+              else open(tmp_path, "wb")) as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        sys.setrecursionlimit(limit)
+    os.replace(tmp_path, path)
+
+
+def load_object(path: str, compress: bool = False):
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, PICKLE_RECURSION_LIMIT))
+    try:
+        with gzip.open(path, "rb") if compress else open(path, "rb") as f:
+            return pickle.load(f)
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+class ParseCache:
+    """
+    Note: only content of files actually included are checked.
+    Adding a new file which shadows an included one in include paths will not invalidate the cache.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def entry_path(self, options: "CXXParserOptions"):
+        return os.path.join(self.cache_dir, f"{options_digest(options)}.pickle")
+
+    def load(self, options: "CXXParserOptions") -> Optional["CXXParseResult"]:
+        path = self.entry_path(options)
+        if not os.path.exists(path):
+            return None
+        try:
+            manifest, result = load_object(path)
+        except Exception:  # broken or incompatible cache entry, just re-parse.
+            return None
+        for file, digest in manifest:
+            if file_digest(file) != digest:
+                return None
+        return result
+
+    def store(self, options: "CXXParserOptions", result: "CXXParseResult",
+              included_files: Iterable[str]):
+        unsaved_names = {name for name, _ in (options.unsaved_files or [])}
+        manifest: List[Tuple[str, str]] = []
+        for file in sorted(set(included_files)):
+            if file in unsaved_names:
+                continue  # content of unsaved files is already a part of the key
+            digest = file_digest(file)
+            if digest is None:
+                return  # can't verify this file later, don't cache it.
+            manifest.append((file, digest))
+        save_object(self.entry_path(options), (manifest, result))
+
+
+class TranslationUnitCache:
+    """
+    Saves TranslationUnit into an AST file and reloads it in later runs.
+    libclang refuses to load an AST file if mtime or size of any file included is changed,
+    even if its content is unchanged. So these are recorded and checked before loading.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def _paths(self, options: "CXXParserOptions"):
+        base = os.path.join(self.cache_dir, options_digest(options))
+        return f"{base}.ast", f"{base}.json"
+
+    def load(self, options: "CXXParserOptions", index: Index) -> Optional[TranslationUnit]:
+        ast_path, manifest_path = self._paths(options)
+        if not os.path.exists(ast_path) or not os.path.exists(manifest_path):
+            return None
+        try:
+            with open(manifest_path, "rt") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        for file, mtime, size in manifest:
+            try:
+                st = os.stat(file)
+            except OSError:
+                return None
+            if st.st_mtime_ns != mtime or st.st_size != size:
+                return None
+        try:
+            return index.read(ast_path)
+        except TranslationUnitLoadError:
+            return None
+
+    def store(self, options: "CXXParserOptions", tu: TranslationUnit):
+        unsaved_names = {name for name, _ in (options.unsaved_files or [])}
+        manifest = []
+        for file in sorted({i.include.name for i in tu.get_includes()}):
+            if file in unsaved_names:
+                continue
+            try:
+                st = os.stat(file)
+            except OSError:
+                return
+            manifest.append((file, st.st_mtime_ns, st.st_size))
+
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        ast_path, manifest_path = self._paths(options)
+        try:
+            tu.save(ast_path)
+        except TranslationUnitSaveError as e:
+            logger.warning("failed to save translation unit into %s: %s", ast_path, e)
+            return
+        with open(manifest_path, "wt") as f:
+            json.dump(manifest, f)
@@ -0,0 +1,111 @@
+"""
+instrumentation of parser: count and time spent on each kind of cursor and each source file.
+"""
+import functools
+import json
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+from c2py.clang.cindex import Cursor
+from c2py.core.cursor_visitor import cursor_location
+
+
+@dataclass()
+class StatsItem:
+    count: int = 0
+    total_time: float = 0  # seconds, including time spent on children recorded
+    self_time: float = 0  # seconds, excluding time spent on children recorded
+
+    def merge(self, other: "StatsItem"):
+        self.count += other.count
+        self.total_time += other.total_time
+        self.self_time += other.self_time
+
+
+class ParseStats:
+    """
+    key of kinds is "{category}:{cursor kind}", eg: "class:CXX_METHOD", "literal:VAR_DECL"
+    only self time is recorded in files, so time of all files sums up to time of whole parse.
+    """
+
+    def __init__(self):
+        self.kinds: Dict[str, StatsItem] = {}
+        self.files: Dict[str, StatsItem] = {}
+        self._children_time: List[float] = [0.0]  # stack, time of children of current records
+
+    def start(self) -> float:
+        self._children_time.append(0.0)
+        return time.perf_counter()
+
+    def stop(self, start: float, category: str, c: Cursor):
+        elapsed = time.perf_counter() - start
+        children_time = self._children_time.pop()
+        self._children_time[-1] += elapsed
+        self_time = elapsed - children_time
+
+        item = self.kinds.get(f"{category}:{c.kind.name}", None)
+        if item is None:
+            item = self.kinds[f"{category}:{c.kind.name}"] = StatsItem()
+        item.count += 1
+        item.total_time += elapsed
+        item.self_time += self_time
+
+        location = cursor_location(c)
+        file = location.file if location else "<built-in>"
+        item = self.files.get(file, None)
+        if item is None:
+            item = self.files[file] = StatsItem()
+        item.count += 1
+        item.total_time += self_time
+        item.self_time += self_time
+
+    def merge(self, other: "ParseStats"):
+        for mine, theirs in ((self.kinds, other.kinds), (self.files, other.files)):
+            for k, v in theirs.items():
+                mine.setdefault(k, StatsItem()).merge(v)
+
+    def __getstate__(self):
+        return {'kinds': self.kinds, 'files': self.files}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.__dict__.update(state)
+
+    def to_json(self) -> str:
+        return json.dumps({
+            'kinds': {k: asdict(v) for k, v in self.kinds.items()},
+            'files': {k: asdict(v) for k, v in self.files.items()},
+        }, indent=2)
+
+    def print_table(self, limit: Optional[int] = None):
+        for title, items in (("cursor kind", self.kinds), ("file", self.files)):
+            rows = sorted(items.items(), key=lambda i: i[1].self_time, reverse=True)[:limit]
+            width = max([len(title), *(len(k) for k, _ in rows)])
+            print(f"{title:<{width}} {'count':>8} {'total(s)':>10} {'self(s)':>10}")
+            for k, v in rows:
+                print(f"{k:<{width}} {v.count:>8} {v.total_time:>10.3f} {v.self_time:>10.3f}")
+            print()
+
+
+def record_stats(category: str):
+    """
+    record count and time of a CXXParser method taking a cursor as its first argument,
+    if stats of parser is enabled.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, c: Cursor, *args, **kwargs):
+            stats: Optional[ParseStats] = self.stats
+            if stats is None:
+                return func(self, c, *args, **kwargs)
+            start = stats.start()
+            try:
+                return func(self, c, *args, **kwargs)
+            finally:
+                stats.stop(start, category, c)
+
+        return wrapper
+
+    return decorator
@@ -2,10 +2,9 @@
 
 from collections import defaultdict
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Pattern, Set, Type
+from typing import Dict, List, Optional, Pattern, Set, Tuple, Type
 
-from c2py.core.core_types.cxx_types import array_base, is_array_type, is_pointer_type, \
-    pointer_base
+from c2py.core.core_types.cxx_types import parse_type
 from c2py.core.core_types.generator_types import AnyGeneratorSymbol, CallingType, \
     GeneratorClass, GeneratorEnum, GeneratorFunction, GeneratorMethod, GeneratorNamespace, \
     GeneratorSymbol, GeneratorVariable, GeneratorVariableFromMacro, to_generator_type
@@ -13,35 +12,47 @@ from c2py.core.core_types.parser_types import (Class, Enum, Function, Method, Na
                                                     Symbol,
                                                     Variable)
 from c2py.core.cxxparser import CXXParseResult
-from c2py.core.env import DEFAULT_INCLUDE_PATHS
+from c2py.core.env import FileClassifier, is_internal_file
+from c2py.core.reachability import ReachabilityPruner
 from c2py.core.utils import _try_parse_cpp_char_literal, _try_parse_cpp_digit_literal, \
     _try_parse_cpp_string_literal, CppLiteral
-from c2py.core.wrappers import BaseFunctionWrapper, CFunctionCallbackWrapper, \
-    InoutArgumentWrapper, OutputArgumentWrapper, StringArrayWrapper, WrapperInfo
+from c2py.core.wrappers import ArgumentClassifier, BaseFunctionWrapper, \
+    CFunctionCallbackWrapper, InoutArgumentWrapper, OutputArgumentWrapper, StringArrayWrapper, \
+    WrapperInfo
 from c2py.objects_manager import ObjectManager
-from c2py.type_manager import TypeManager
+from c2py.type_manager import TypeManager, is_string_type
+
+@dataclass()
+class CallbackCallingPolicy:
+    """
+    decides calling types of callbacks(virtual methods) from bytes their async calls would copy.
+    An async call copies everything arguments point to(see arg_helper::save),
+    while a sync call passes arguments to python without copying them.
+    Override calling_type() for other policies.
+    """
+    # callbacks estimated to copy more than this number of bytes are called synchronously.
+    # None for no limit.
+    max_async_copy_bytes: Optional[int] = None
+    # calling type of callbacks copying unknown bytes, eg: pointers to incomplete types.
+    unknown_copy_bytes: CallingType = CallingType.Default
+
+    def calling_type(self, m: GeneratorMethod, copy_bytes: Optional[int]) -> CallingType:
+        """
+        :param copy_bytes: bytes copied by an async call of m, None if unknown.
+        """
+        if copy_bytes is None:
+            return self.unknown_copy_bytes
+        if self.max_async_copy_bytes is not None and copy_bytes > self.max_async_copy_bytes:
+            return CallingType.Sync
+        return CallingType.Default
 
 
 def is_built_in_symbol(f: Symbol):
     return f.location is None
 
 
-INTERNAL_PATH_FLAG = {
-    "Microsoft Visual Studio",
-    "Windows Kits",
-    "/usr"
-}
-
-
 def is_internal_symbol(symbol: Symbol):
-    file_path = symbol.location.file
-    for path in DEFAULT_INCLUDE_PATHS:
-        if file_path.startswith(path):
-            return True
-    for flag in INTERNAL_PATH_FLAG:
-        if flag in file_path:
-            return True
-    return False
+    return is_internal_file(symbol.location.file)
 
 
 @dataclass()
@@ -52,6 +63,14 @@ class PreProcessorOptions:
     ignore_unsupported_functions: bool = True
     inout_arg_pattern: Optional[Pattern] = None
     output_arg_pattern: Optional[Pattern] = None
+    # symbols from files matching any of these globs are treated as internal(not generated)
+    internal_file_globs: List[str] = field(default_factory=list)
+    # symbols from files matching any of these globs are never treated as internal
+    input_file_globs: List[str] = field(default_factory=list)
+    # if set, generate only symbols reachable from symbols matching this pattern
+    roots: Optional[Pattern] = None
+    # if set, calling types of callbacks still using CallingType.Default are decided by it.
+    callback_calling_policy: Optional[CallbackCallingPolicy] = None
     # char_macro_to_int: bool = False
 
 
@@ -65,6 +84,10 @@ class PreProcessorResult:
 
     objects: ObjectManager = field(default_factory=dict)
     parser_result: CXXParseResult = None
+    pruned_symbols: List[GeneratorSymbol] = field(default_factory=list)
+    # callbacks and estimated bytes copied(None if unknown) for an async call of them
+    callback_copy_bytes: List[Tuple[GeneratorMethod, Optional[int]]] = field(
+        default_factory=list)
 
     def print_unsupported_functions(self):
         print(f"# of unsupported functions: {len(self.unsupported_functions)}")
@@ -72,6 +95,22 @@ class PreProcessorResult:
             for m in ms:
                 print(m.signature)
 
+    def print_callback_calling_types(self):
+        print(f"# of callbacks: {len(self.callback_copy_bytes)}")
+        for m, n in self.callback_copy_bytes:
+            size = "unknown" if n is None else n
+            print(f"{m.full_name} : {m.calling_type.name}, {size} bytes copied if async")
+
+    def print_pruned_symbols(self):
+        kinds = defaultdict(int)
+        for s in self.pruned_symbols:
+            kinds[s.__class__.__name__] += 1
+        print(f"# of unreachable symbols pruned: {len(self.pruned_symbols)}")
+        for kind, n in sorted(kinds.items()):
+            print(f"{kind}: {n}")
+        for s in self.pruned_symbols:
+            print(s.full_name)
+
 
 class PreProcessor:
     type_map = {
@@ -86,6 +125,9 @@ class PreProcessor:
     def __init__(self, options: PreProcessorOptions):
         self.options = options
         self.parser_result = options.parse_result
+        # shared by every _should_output_symbol() call: classification depends only on file
+        self.file_classifier = FileClassifier(options.internal_file_globs,
+                                              options.input_file_globs)
 
         # noinspection PyTypeChecker
         self.type_manager: TypeManager = None
@@ -96,6 +138,7 @@ class PreProcessor:
         result = PreProcessorResult(to_generator_type(self.parser_result.g, None, objects))
         result.objects = objects
         self.type_manager = TypeManager(result.g, objects)
+        self.argument_classifier = ArgumentClassifier(self.type_manager)
 
         # classes
         self._process_namespace(result.g)
@@ -128,6 +171,9 @@ class PreProcessor:
             }
 
         self._process_functions(result.objects)
+        if options.callback_calling_policy is not None:
+            result.callback_copy_bytes = self._process_callback_calling_types(
+                result.objects, options.callback_calling_policy)
 
         # seeks unsupported functions
         for s in result.objects.values():
@@ -141,26 +187,39 @@ class PreProcessor:
                     if self.options.ignore_unsupported_functions:
                         s.generate = False
 
+        if options.roots:
+            pruner = ReachabilityPruner(result.g, result.objects)
+            result.pruned_symbols = pruner.prune(options.roots)
+
         result.parser_result = self.parser_result
         return result
 
-    def _try_wrapper(self, f: GeneratorFunction, wrapper: BaseFunctionWrapper):
-        for i, a in enumerate(f.args):
-            if wrapper.can_wrap_arg(f, i):
-                return WrapperInfo(wrapper=wrapper, index=i)
+    def _apply_wrappers(self, of: GeneratorFunction, wrappers: List[BaseFunctionWrapper]):
+        """
+        keep applying wrappers until no wrapper can be applied.
 
-    def _apply_wrappers_one_round(self, of: GeneratorFunction, wrappers: List[BaseFunctionWrapper]):
-        wrapped = False
+        match() of a wrapper is called only for arguments in its categories.
+        A wrapper changes only the argument it wraps and arguments after it, so after applying one,
+        only arguments from the one before it(some wrappers match a pair of arguments) are scanned
+        again.
+        """
+        categories = self.argument_classifier.categories
         wf = of.resolve_wrappers()
-        for w in wrappers:
-            res = True
-            while res:
-                res = self._try_wrapper(wf, w)
-                if res:
-                    of.wrappers.append(res)
-                    wf = of.resolve_wrappers()
-                    wrapped = True
-        return wrapped
+        start = 0  # arguments before this can't be wrapped by any wrapper
+        while start is not None:
+            changed_from = None
+            for w in wrappers:
+                i = start
+                while i < len(wf.args):
+                    if ((w.categories is None or categories(wf.args[i].type) & w.categories)
+                        and w.can_wrap_arg(wf, i)):
+                        of.wrappers.append(WrapperInfo(wrapper=w, index=i))
+                        wf = of.resolve_wrappers()
+                        i = max(i - 1, 0)
+                        changed_from = i if changed_from is None else min(changed_from, i)
+                        continue
+                    i += 1
+            start = changed_from
 
     def _process_functions(self, objects: ObjectManager):
         wrapper_classes = [CFunctionCallbackWrapper, StringArrayWrapper, InoutArgumentWrapper]
@@ -185,10 +244,7 @@ class PreProcessor:
                 InoutArgumentWrapper)
 
         for of in fs:
-            # keep apply wrapper until no wrapper can be applied
-            wrapped = True
-            while wrapped:
-                wrapped = self._apply_wrappers_one_round(of, wrappers)
+            self._apply_wrappers(of, wrappers)
 
         self._process_functions_with_virtual_arguments_(objects)
 
@@ -224,13 +280,9 @@ class PreProcessor:
         """
 
         def is_virtual_type(obj: GeneratorVariable):
-            t = self.type_manager.remove_decorations(obj.type)
-            try:
-                obj = objects.resolve_all_typedef(t)
-                if isinstance(obj, GeneratorClass):
-                    return obj.is_polymorphic
-            except KeyError:
-                pass
+            obj = self.type_manager.declaration(obj.type)
+            if isinstance(obj, GeneratorClass):
+                return obj.is_polymorphic
             return False
 
         for f in objects.values():
@@ -238,6 +290,76 @@ class PreProcessor:
                 if any(map(is_virtual_type, f.args)):
                     f.calling_type = CallingType.Sync
 
+    def _process_callback_calling_types(self, objects: ObjectManager,
+                                        policy: CallbackCallingPolicy) \
+        -> List[Tuple[GeneratorMethod, Optional[int]]]:
+        """
+        an async callback copies everything its arguments point to(see arg_helper::save),
+        decide calling types of callbacks from bytes they copy with policy.
+        """
+        res = []
+        for c in objects.values():
+            if not isinstance(c, GeneratorClass):
+                continue
+            for ms in c.functions.values():
+                for m in ms:
+                    if not m.is_virtual or m.is_final:
+                        continue
+                    copy_bytes = 0
+                    for arg in m.args:
+                        n = self._estimate_copy_bytes(arg.type)
+                        if n is None:
+                            copy_bytes = None
+                            break
+                        copy_bytes += n
+                    if m.calling_type == CallingType.Default:
+                        m.calling_type = policy.calling_type(m, copy_bytes)
+                    res.append((m, copy_bytes))
+        return res
+
+    def _estimate_copy_bytes(self, ot: str) -> Optional[int]:
+        """
+        :return: bytes copied for an argument of type ot in an async callback, None if unknown.
+        strings are counted as a pointer, their length is unknown.
+        """
+        t = parse_type(self.type_manager.resolve_to_basic_type_remove_const(ot))
+        if is_string_type(t.spelling):
+            return self._type_size("void *")
+        if t.is_pointer:
+            t = t.pointee  # pointed value is copied
+        return self._type_size(t.spelling)
+
+    def _type_size(self, t: str) -> Optional[int]:
+        """
+        sizes of basic types and pointers are of the target parsed for, see
+        CXXParseResult.type_sizes.
+        """
+        type_sizes = self.parser_result.type_sizes
+        if t in type_sizes:
+            return type_sizes[t]
+        if t == "void":
+            return 0
+        ct = parse_type(t)
+        if ct.is_pointer:
+            return type_sizes.get("void *", None)
+        if ct.is_array:
+            base = self._type_size(ct.element.spelling)
+            if base is None or not ct.extent:
+                return None
+            return base * ct.extent
+        for prefix in ("struct ", "class ", "union ", "enum "):
+            if t.startswith(prefix):
+                t = t[len(prefix):]
+        try:
+            obj = self.type_manager.objects.resolve_all_typedef(t)
+        except KeyError:
+            return None
+        if isinstance(obj, GeneratorEnum):
+            return self._type_size(obj.type or "int")
+        if isinstance(obj, GeneratorClass) and obj.size >= 0:
+            return obj.size
+        return None
+
     def _process_namespace(self, ns: GeneratorNamespace):
         # remove internal and built-in classes, enums, functions
         ns.classes = self._filter_dict(ns.classes)
@@ -284,18 +406,18 @@ class PreProcessor:
         return fs
 
     def _is_type_supported(self, t: str):
-        t = self.type_manager.resolve_to_basic_type_remove_const(t)
-        if is_pointer_type(t):
-            b = pointer_base(t)
-            if is_pointer_type(b):
+        t = parse_type(self.type_manager.resolve_to_basic_type_remove_const(t))
+        if t.is_pointer:
+            b = t.pointee
+            if b.is_pointer:
                 return False  # level 2+ pointers
-            if is_array_type(b):
+            if b.is_array:
                 return False
-        if is_array_type(t):
-            b = array_base(t)
-            if is_pointer_type(b):
+        if t.is_array:
+            b = t.element
+            if b.is_pointer:
                 return False  # level 2+ pointers
-            if is_array_type(b):
+            if b.is_array:
                 return False
         return True
 
@@ -341,13 +463,12 @@ class PreProcessor:
                     )
         return None
 
-    @staticmethod
-    def _should_output_symbol(symbol: Symbol):
+    def _should_output_symbol(self, symbol: Symbol):
         if hasattr(symbol, 'access'):
             if symbol.access != 'public':
                 return False
 
         return (symbol.name
                 and not is_built_in_symbol(symbol)
-                and not is_internal_symbol(symbol)
+                and not self.file_classifier.is_internal_file(symbol.location.file)
                 )
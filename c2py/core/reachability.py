@@ -0,0 +1,130 @@
+"""
+prune symbols not reachable from a set of root symbols.
+
+dependencies of a symbol are:
+ * class: its members and base classes
+ * namespace: its members, only if it is a root. Otherwise it is kept just as a scope.
+ * function: types of return value and arguments
+ * variable: its type
+ * typedef: its target
+and parents of a reachable symbol are always kept.
+"""
+import re
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Pattern, Set, Tuple
+
+from c2py.core.core_types.generator_types import GeneratorClass, GeneratorFunction, \
+    GeneratorNamespace, GeneratorSymbol, GeneratorTypedef, GeneratorVariable
+from c2py.objects_manager import ObjectManager
+
+NAME_PATTERN = re.compile(r'(?:::)?[A-Za-z_]\w*(?:::[A-Za-z_]\w*)*')
+
+
+def iter_members(ns: GeneratorNamespace) -> Iterable[GeneratorSymbol]:
+    yield from ns.enums.values()
+    yield from ns.typedefs.values()
+    yield from ns.classes.values()
+    yield from ns.template_classes.values()
+    yield from ns.variables.values()
+    for fs in ns.functions.values():
+        yield from fs
+    yield from ns.namespaces.values()
+
+
+def iter_all_symbols(ns: GeneratorNamespace) -> Iterable[GeneratorSymbol]:
+    for s in iter_members(ns):
+        yield s
+        if isinstance(s, GeneratorNamespace):
+            yield from iter_all_symbols(s)
+
+
+class ReachabilityPruner:
+
+    def __init__(self, g: GeneratorNamespace, objects: ObjectManager):
+        self.g = g
+        self.objects = objects
+        self._lookups: Dict[Tuple[str, str], Optional[GeneratorSymbol]] = {}
+
+    def prune(self, roots: Pattern) -> List[GeneratorSymbol]:
+        """
+        set generate of symbols not reachable from symbols matching roots to False.
+        :return: symbols pruned
+        """
+        symbols = [s for s in iter_all_symbols(self.g) if s.generate]
+        reachable = self.reachable([s for s in symbols if roots.match(s.full_name)])
+        pruned = []
+        for s in symbols:
+            if id(s) not in reachable:
+                s.generate = False
+                pruned.append(s)
+        return pruned
+
+    def reachable(self, roots: List[GeneratorSymbol]) -> Set[int]:
+        """
+        :return: ids of symbols reachable from roots
+        """
+        reachable: Set[int] = set()
+        expanded: Set[int] = set()
+        queue: Deque[Tuple[GeneratorSymbol, bool]] = deque((s, True) for s in roots)
+        while queue:
+            s, expand = queue.popleft()
+            reachable.add(id(s))
+            if not expand or id(s) in expanded:
+                continue
+            expanded.add(id(s))
+
+            parent = s.parent
+            while parent is not None and id(parent) not in reachable:
+                # a reachable class is generated with all its members, namespaces are scope only.
+                queue.append((parent, isinstance(parent, GeneratorClass)))
+                parent = parent.parent
+
+            for d in self._dependencies(s, is_root=expand):
+                if d.generate and id(d) not in expanded:
+                    queue.append((d, True))
+        return reachable
+
+    def _dependencies(self, s: GeneratorSymbol, is_root: bool) -> Iterable[GeneratorSymbol]:
+        if isinstance(s, GeneratorClass):
+            yield from iter_members(s)
+            for sup in s.super:
+                yield from self._lookup_types(sup.full_name, s)
+        elif isinstance(s, GeneratorNamespace):
+            if is_root:
+                yield from iter_members(s)
+        elif isinstance(s, GeneratorFunction):
+            yield from self._lookup_types(s.ret_type, s)
+            for arg in s.args:
+                yield from self._lookup_types(arg.type, s)
+        elif isinstance(s, GeneratorVariable):
+            yield from self._lookup_types(s.type, s)
+        elif isinstance(s, GeneratorTypedef):
+            yield from self._lookup_types(s.target, s)
+
+    def _lookup_types(self, t: str, s: GeneratorSymbol) -> Iterable[GeneratorSymbol]:
+        """
+        find symbols of all names used in type t, relative to scopes of s.
+        """
+        scope = s.parent.full_name if s.parent is not None else ""
+        for name in NAME_PATTERN.findall(t):
+            key = (scope, name)
+            try:
+                symbol = self._lookups[key]
+            except KeyError:
+                symbol = self._lookups[key] = self._lookup(name, s.parent)
+            if symbol is not None:
+                yield symbol
+
+    def _lookup(self, name: str, scope: Optional[GeneratorSymbol]) -> Optional[GeneratorSymbol]:
+        objects = self.objects
+        if not name.startswith('::'):
+            while scope is not None and scope.full_name:
+                full_name = f"{scope.full_name}::{name}"
+                if full_name in objects:
+                    return objects[full_name]
+                scope = scope.parent
+        else:
+            name = name[2:]  # full names in objects have no leading ::
+        if name in objects:
+            return objects[name]
+        return None
@@ -0,0 +1,39 @@
+"""
+snapshots of PreProcessorResult.
+
+A snapshot holds everything generators need, so parsing and pre-processing can run once(eg: on a
+build server), and generation can be rerun later from the snapshot without libclang.
+
+Snapshots are pickles: loading one can run arbitrary code, so load only snapshots from a trusted
+source, eg: saved by yourself or by your own build.
+"""
+from dataclasses import dataclass, field
+from typing import List
+
+import c2py
+from c2py.core.parse_cache import load_object, save_object
+from c2py.core.preprocessor import PreProcessorResult
+
+
+@dataclass()
+class Snapshot:
+    result: PreProcessorResult
+    files: List[str] = field(default_factory=list)  # input files, included by generated code
+    version: str = c2py.__version__
+
+
+def save_snapshot(path: str, snapshot: Snapshot):
+    save_object(path, snapshot, compress=True)
+
+
+def load_snapshot(path: str) -> Snapshot:
+    """
+    :param path: a snapshot from a trusted source only, it is unpickled.
+    """
+    snapshot = load_object(path, compress=True)
+    if not isinstance(snapshot, Snapshot):
+        raise ValueError(f"{path} is not a snapshot of c2py")
+    if snapshot.version != c2py.__version__:
+        raise ValueError(f"{path} is saved by c2py {snapshot.version}, "
+                         f"but current version is {c2py.__version__}")
+    return snapshot
@@ -0,0 +1,246 @@
+"""
+per-symbol configuration: rules mapping patterns of symbols' full names to actions.
+
+a rules file is a json, toml or yaml file like this(in toml):
+
+[[rules]]
+pattern = "Api::.*Callback$"
+callback = "sync"
+
+[[rules]]
+pattern = "Api::internal_.*"
+ignore = true
+
+patterns are matched against full names of symbols with re.match(), same as patterns from
+command line. Boolean actions apply if any rule matches. For other actions, the first rule
+matched wins.
+"""
+import json
+import os
+import re
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterable, List, Optional, Pattern
+
+from c2py.core.core_types.generator_types import CallingType, GeneratorClass, GeneratorFunction, \
+    GeneratorMethod, GeneratorSymbol, GeneratorTypedef
+
+BOOLEAN_ACTIONS = ('ignore', 'no_callback', 'no_transform', 'no_caster', 'output_arg', 'inout_arg')
+CALLBACK_VALUES = {
+    'default': CallingType.Default,
+    'sync': CallingType.Sync,
+    'async': CallingType.Async,
+}
+GIL_VALUES = {
+    'release': True,
+    'keep': False,
+}
+
+
+@dataclass()
+class SymbolRule:
+    pattern: str
+    ignore: bool = False  # don't generate symbol
+    no_callback: bool = False  # don't generate callback for method
+    no_transform: bool = False  # don't apply wrappers(changing its signature) to function
+    no_caster: bool = False  # don't generate caster for class or typedef
+    output_arg: bool = False  # treat argument as output only
+    inout_arg: bool = False  # treat argument as input and output
+    callback: Optional[str] = None  # calling type of callback: "default", "sync" or "async"
+    gil: Optional[str] = None  # whether to release GIL when calling function: "release" or "keep"
+
+    def __post_init__(self):
+        compile_pattern(self.pattern)
+        if self.callback is not None and self.callback not in CALLBACK_VALUES:
+            raise ValueError(f"callback of rule {self.pattern} should be one of "
+                             f"{', '.join(CALLBACK_VALUES)}, got: {self.callback}")
+        if self.gil is not None and self.gil not in GIL_VALUES:
+            raise ValueError(f"gil of rule {self.pattern} should be one of "
+                             f"{', '.join(GIL_VALUES)}, got: {self.gil}")
+
+
+def compile_pattern(pattern: str) -> Pattern:
+    try:
+        return re.compile(pattern)
+    except re.error as e:
+        raise ValueError(f"invalid pattern {pattern}: {e}")
+
+
+def _can_combine(compiled: List[Pattern]) -> bool:
+    """
+    check if patterns can be joined into a single alternation, matching as each of them does.
+    Groups could be redefined or referred by a backreference of another pattern,
+    and global flags(eg: (?i)) would apply to every pattern.
+    """
+    default_flags = re.compile('').flags
+    return all(c.groups == 0 and c.flags == default_flags for c in compiled)
+
+
+class Patterns:
+    """
+    match() matches if any of patterns matches, like re.match() with all of patterns joined by |.
+    Patterns are combined into a single regex if possible, otherwise they are matched in order.
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.compiled = [compile_pattern(p) for p in patterns]
+        self.regex = None
+        if _can_combine(self.compiled):
+            self.regex = re.compile("|".join(f"(?:{p})" for p in patterns))
+
+    def match(self, name: str):
+        if self.regex is not None:
+            return self.regex.match(name)
+        for c in self.compiled:
+            m = c.match(name)
+            if m:
+                return m
+        return None
+
+
+class _FirstMatch:
+    """
+    match() returns value of the first pattern matched.
+    Patterns are combined into a single regex if possible, otherwise they are matched in order.
+    """
+
+    def __init__(self, patterns: List[str], values: List[Any]):
+        self.values = values
+        self.compiled = [compile_pattern(p) for p in patterns]
+        self.regex = None
+        if _can_combine(self.compiled):
+            self.regex = re.compile("|".join(f"(?P<_{i}>{p})" for i, p in enumerate(patterns)))
+
+    def match(self, name: str):
+        if self.regex is not None:
+            m = self.regex.match(name)
+            if m:
+                return self.values[int(m.lastgroup[1:])]
+            return None
+        for c, value in zip(self.compiled, self.values):
+            if c.match(name):
+                return value
+        return None
+
+
+def _combine(patterns: List[str]) -> Optional[Patterns]:
+    if patterns:
+        return Patterns(patterns)
+    return None
+
+
+def _read_rules_file(path: str) -> Dict:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.json':
+        with open(path, "rt", encoding='utf-8') as f:
+            return json.load(f)
+    if ext == '.toml':
+        try:
+            import tomllib
+        except ImportError:  # python < 3.11
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ValueError(f"reading {path} requires python 3.11+ or package tomli")
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    if ext in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError(f"reading {path} requires package PyYAML")
+        with open(path, "rt", encoding='utf-8') as f:
+            return yaml.safe_load(f) or {}
+    raise ValueError(f"unsupported rules file: {path}, use .json, .toml, .yaml or .yml")
+
+
+class SymbolRules:
+
+    def __init__(self, rules: Iterable[SymbolRule] = ()):
+        self.rules: List[SymbolRule] = list(rules)
+        self._compiled = None
+
+    def add(self, rule: SymbolRule):
+        self.rules.append(rule)
+        self._compiled = None
+
+    def add_pattern(self, pattern: str, action: str):
+        """
+        add a rule for a boolean action, if pattern is not empty.
+        """
+        if pattern:
+            self.add(SymbolRule(pattern=pattern, **{action: True}))
+
+    def load(self, path: str):
+        data = _read_rules_file(path)
+        names = {f.name for f in fields(SymbolRule)}
+        for item in data.get('rules', []):
+            unknown = set(item) - names
+            if unknown:
+                raise ValueError(f"unknown keys in rule {item} of {path}: {', '.join(unknown)}")
+            self.add(SymbolRule(**item))
+
+    def __len__(self):
+        return len(self.rules)
+
+    def pattern(self, action: str) -> Optional[Patterns]:
+        """
+        :return: patterns of all the rules with boolean action set, None if no rule.
+        """
+        return self._compile()[action]
+
+    def _compile(self):
+        if self._compiled is None:
+            compiled: Dict[str, Any] = {
+                action: _combine([r.pattern for r in self.rules if getattr(r, action)])
+                for action in BOOLEAN_ACTIONS
+            }
+            for action, values in (('callback', CALLBACK_VALUES), ('gil', GIL_VALUES)):
+                rules = [r for r in self.rules if getattr(r, action) is not None]
+                compiled[action] = _FirstMatch(
+                    [r.pattern for r in rules],
+                    [values[getattr(r, action)] for r in rules],
+                ) if rules else None
+            self._compiled = compiled
+        return self._compiled
+
+    def apply(self, objects: Dict[str, GeneratorSymbol]) -> List[GeneratorSymbol]:
+        """
+        apply actions of rules onto symbols, in a single pass over objects.
+        output_arg and inout_arg are not applied here, they are handled by PreProcessor.
+        :return: symbols ignored.
+        """
+        compiled = self._compile()
+        ignore = compiled['ignore']
+        no_callback = compiled['no_callback']
+        no_transform = compiled['no_transform']
+        no_caster = compiled['no_caster']
+        callback = compiled['callback']
+        gil = compiled['gil']
+
+        ignored: List[GeneratorSymbol] = []
+        for s in objects.values():
+            name = s.full_name
+            if ignore and ignore.match(name):
+                ignored.append(s)
+                s.generate = False
+            if isinstance(s, GeneratorFunction):
+                if no_transform and no_transform.match(name):
+                    s.wrappers.clear()
+                if gil:
+                    release_gil = gil.match(name)
+                    if release_gil is not None:
+                        s.release_gil = release_gil
+                if isinstance(s, GeneratorMethod):
+                    if no_callback and no_callback.match(name):
+                        s.is_final = True
+                    if callback:
+                        calling_type = callback.match(name)
+                        if calling_type is not None:
+                            s.calling_type = calling_type
+            elif no_caster and isinstance(s, (GeneratorTypedef, GeneratorClass)) \
+                and no_caster.match(name):
+                if isinstance(s, GeneratorTypedef):
+                    s.generate = False
+                else:
+                    s.generate_caster = False
+        return ignored
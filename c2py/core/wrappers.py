@@ -1,11 +1,11 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from enum import Flag
+from typing import Dict, Optional
 
 from c2py.type_manager import TypeManager, is_integer_type, is_string_type, \
     is_string_array_type, is_tuple_type, tuple_type_add, make_tuple_type
-from c2py.core.core_types.cxx_types import function_pointer_type_info, is_function_pointer_type, \
-    is_reference_type, pointer_base, is_const_type, \
-    is_pointer_type
+from c2py.core.core_types.cxx_types import parse_type, pointer_base, is_const_type
 from c2py.core.core_types.generator_types import GeneratorFunction, GeneratorVariable
 
 
@@ -15,6 +15,50 @@ class WrapperInfo:
     index: int
 
 
+class ArgumentCategory(Flag):
+    """
+    kinds of argument types a wrapper might be interested in.
+    """
+    NONE = 0
+    FUNCTION_POINTER = 1
+    STRING_ARRAY = 2
+    NON_CONST_REFERENCE = 4
+    POINTER_TO_INTEGER_OR_STRING = 8
+
+
+class ArgumentClassifier:
+    """
+    classify type of arguments into ArgumentCategory, memoized by type.
+    """
+
+    def __init__(self, type_manager: TypeManager):
+        self.type_manager = type_manager
+        self._categories: Dict[str, ArgumentCategory] = {}
+
+    def categories(self, t: str) -> ArgumentCategory:
+        try:
+            return self._categories[t]
+        except KeyError:
+            self._categories[t] = res = self._classify(t)
+            return res
+
+    def _classify(self, ot: str) -> ArgumentCategory:
+        res = ArgumentCategory.NONE
+        ct = parse_type(ot)
+        if ct.is_reference and not ct.is_const:
+            res |= ArgumentCategory.NON_CONST_REFERENCE
+        t = parse_type(self.type_manager.resolve_to_basic_type_remove_const(ot))
+        if t.is_function_pointer:
+            res |= ArgumentCategory.FUNCTION_POINTER
+        if is_string_array_type(t.spelling):
+            res |= ArgumentCategory.STRING_ARRAY
+        if t.is_pointer and not is_string_type(t.spelling):
+            base = t.pointee.spelling
+            if is_integer_type(base) or is_string_type(base):
+                res |= ArgumentCategory.POINTER_TO_INTEGER_OR_STRING
+        return res
+
+
 def append_as_tuple(t: str, append_type: str):
     if is_tuple_type(t):
         return tuple_type_add(t, append_type)
@@ -25,6 +69,8 @@ def append_as_tuple(t: str, append_type: str):
 class BaseFunctionWrapper(ABC):
     name = "default_function_wrapper"
     compatible_wrapper_classes = []
+    # match() is called only for arguments in any of these categories. None for all arguments.
+    categories: Optional[ArgumentCategory] = None
 
     def __init__(self, type_manager: TypeManager):
         self.type_manager = type_manager
@@ -38,7 +84,7 @@ class BaseFunctionWrapper(ABC):
         return f
 
     def is_arg_wrapped(self, f: GeneratorFunction, index: int):
-        return index in {wi.index for wi in f.wrappers}  # todo: optimize speed
+        return any(wi.index == index for wi in f.wrappers)
 
     def is_compatible_with_wrapped_arg(self, f: GeneratorFunction, index: int):
         if not self.compatible_wrapper_classes:
@@ -55,14 +101,14 @@ class BaseFunctionWrapper(ABC):
 
 class CFunctionCallbackWrapper(BaseFunctionWrapper):
     name = "c_function_callback_transform"
+    categories = ArgumentCategory.FUNCTION_POINTER
 
     def match(self, f: GeneratorFunction, i: int, a: GeneratorVariable):
         length = len(f.args)
         if i + 1 < length:
-            t = self.type_manager.resolve_to_basic_type_remove_const(a.type)
-            if is_function_pointer_type(t):
-                fi = function_pointer_type_info(t)
-                callback_last_param_type = fi.args[-1].type
+            t = parse_type(self.type_manager.resolve_to_basic_type_remove_const(a.type))
+            if t.is_function_pointer:
+                callback_last_param_type = t.arg_types[-1].spelling
                 callback_last_param_type = self.type_manager.resolve_to_basic_type_remove_const(callback_last_param_type)
                 if callback_last_param_type == "void *":
                     next_param_type = f.args[i + 1].type
@@ -79,6 +125,7 @@ class CFunctionCallbackWrapper(BaseFunctionWrapper):
 
 class StringArrayWrapper(BaseFunctionWrapper):
     name = "string_array_transform"
+    categories = ArgumentCategory.STRING_ARRAY
 
     def match(self, f: GeneratorFunction, i: int, a: GeneratorVariable):
         length = len(f.args)
@@ -98,20 +145,23 @@ class StringArrayWrapper(BaseFunctionWrapper):
 
 class InoutArgumentWrapper(BaseFunctionWrapper):
     name = "inout_argument_transform"
+    categories = (ArgumentCategory.NON_CONST_REFERENCE
+                  | ArgumentCategory.POINTER_TO_INTEGER_OR_STRING)
 
     def match(self, f: GeneratorFunction, i: int, a: GeneratorVariable):
-        if is_reference_type(a.type):
-            if not is_const_type(a.type):
+        at = parse_type(a.type)
+        if at.is_reference:
+            if not at.is_const:
                 return True
-        t = self.type_manager.resolve_to_basic_type_remove_const(a.type)
-        if is_string_type(t):
+        t = parse_type(self.type_manager.resolve_to_basic_type_remove_const(a.type))
+        if is_string_type(t.spelling):
             return False  # in most of the case char * is a input string
 
-        if is_pointer_type(t):
+        if t.is_pointer:
             cbase = pointer_base(a.type)
             if is_const_type(cbase):
                 return False  # const pointer is input argument only
-            base = pointer_base(t)
+            base = t.pointee.spelling
             if is_integer_type(base):
                 return True
             if is_string_type(base):
@@ -124,17 +174,20 @@ class InoutArgumentWrapper(BaseFunctionWrapper):
 
 class OutputArgumentWrapper(BaseFunctionWrapper):
     name = "output_argument_transform"
+    categories = (ArgumentCategory.NON_CONST_REFERENCE
+                  | ArgumentCategory.POINTER_TO_INTEGER_OR_STRING)
 
     def match(self, f: GeneratorFunction, i: int, a: GeneratorVariable):
-        if is_reference_type(a.type):
-            if not is_const_type(a.type):
+        at = parse_type(a.type)
+        if at.is_reference:
+            if not at.is_const:
                 return True
-        t = self.type_manager.resolve_to_basic_type_remove_const(a.type)
-        if is_string_type(t):
+        t = parse_type(self.type_manager.resolve_to_basic_type_remove_const(a.type))
+        if is_string_type(t.spelling):
             return False  # in most of the case char * is a input string
 
-        if is_pointer_type(t):
-            base = pointer_base(t)
+        if t.is_pointer:
+            base = t.pointee.spelling
             if is_integer_type(base):
                 return True
             if is_string_type(base):
@@ -1,9 +1,13 @@
 import logging
+import re
 from dataclasses import dataclass
-from typing import List, Callable
+from typing import Callable, Dict, Iterable, List, Sequence
 
-from c2py.core.generator import GeneratorBase, GeneratorOptions
-from c2py.core.core_types.cxx_types import array_base, array_count_str, is_c_array_type
+from c2py.core.core_types.parser_types import AnonymousUnion, Class
+from c2py.core.cxxparser import Arch, CXXParseResult, CxxTarget
+from c2py.core.env import FileClassifier
+from c2py.core.generator import GeneratorBase, GeneratorOptions, GeneratorResult
+from c2py.core.core_types.cxx_types import parse_type
 from c2py.core.core_types.generator_types import CallingType, GeneratorClass, GeneratorEnum, \
     GeneratorFunction, GeneratorMethod, GeneratorNamespace, GeneratorVariable
 from c2py.generator.cxxgenerator.utils import slugify
@@ -11,6 +15,12 @@ from c2py.textholder import Indent, IndentLater, TextHolder
 
 logger = logging.getLogger(__file__)
 
+# file included by generated files of a target, asserting layouts of types which differ among targets
+LAYOUT_CHECKS_FILE = "layout_checks.h"
+# config.h generated for a target, included by the dispatching config.h in output directory
+TARGET_CONFIG_FILE = "target_config.h"
+QUALIFIED_NAME_PATTERN = re.compile(r'^[A-Za-z_]\w*(?:::[A-Za-z_]\w*)*$')
+
 
 @dataclass()
 class GeneratedFunction:
@@ -295,14 +305,21 @@ class CxxGenerator(GeneratorBase):
                         f"""{my_variable}.def("{m.alias}",""" + Indent()
                     )
                 body += self._generate_calling_wrapper(m, has_overload, append=',')
-                body += f"pybind11::return_value_policy::reference,"
-                body += f"pybind11::call_guard<pybind11::gil_scoped_release>()"
+                self._append_call_policies(body, m)
                 body += f""");\n""" - Indent()
 
         for super in c.super:
             body += f'// virtual methods for {super.full_name}'
             self._process_class_functions(super, body, my_variable, only_virtual=True)
 
+    @staticmethod
+    def _append_call_policies(body: TextHolder, f: GeneratorFunction):
+        if f.release_gil:
+            body += f"pybind11::return_value_policy::reference,"
+            body += f"pybind11::call_guard<pybind11::gil_scoped_release>()"
+        else:
+            body += f"pybind11::return_value_policy::reference"
+
     def _process_namespace_functions(self, ns: GeneratorNamespace, cpp_scope_variable: str,
                                      body: TextHolder, pfm: FunctionManager):
         namespace_name = ns.name
@@ -325,8 +342,7 @@ class CxxGenerator(GeneratorBase):
                             f"""{cpp_scope_variable}.def("{m.alias}",""" + Indent()
                         )
                         sub_body += self._generate_calling_wrapper(f, has_overload, append=',')
-                        sub_body += f"pybind11::return_value_policy::reference,"
-                        sub_body += f"pybind11::call_guard<pybind11::gil_scoped_release>()"
+                        self._append_call_policies(sub_body, f)
                         sub_body += f""");\n""" - Indent()
                         n += 1
                         if n == max_calls_per_function:
@@ -534,10 +550,9 @@ class CxxGenerator(GeneratorBase):
         return code
 
     def _to_cpp_variable(self, v: GeneratorVariable):
-        t = v.type
-        if is_c_array_type(t):
-            ab = array_base(t)
-            return f'{ab} {v.name}[{array_count_str(t)}]'
+        t = parse_type(v.type)
+        if t.is_c_array:
+            return f'{t.element} {v.name}[{t.extent_spelling}]'
         return f'{t} {v.name}'
 
     def _generate_callback_wrapper(
@@ -587,3 +602,109 @@ class CxxGenerator(GeneratorBase):
                     if not m.is_final:
                         return True
         return False
+
+
+def target_condition(target: CxxTarget) -> str:
+    """
+    :return: preprocessor condition which is true when compiling for target.
+    """
+    conditions = []
+    triple = target.triple.lower()
+    if 'windows' in triple or 'win32' in triple:
+        conditions.append('defined(_WIN32)')
+    elif 'linux' in triple:
+        conditions.append('defined(__linux__)')
+    elif 'darwin' in triple or 'apple' in triple or 'macos' in triple:
+        conditions.append('defined(__APPLE__)')
+    if target.arch == Arch.X64:
+        conditions.append('(defined(_M_X64) || defined(__x86_64__))')
+    else:
+        conditions.append('(defined(_M_IX86) || defined(__i386__))')
+    return ' && '.join(conditions)
+
+
+def check_target_conditions(targets: Sequence[CxxTarget]):
+    """
+    raise ValueError if conditions of two targets are the same, so that the dispatching config.h
+    can't tell them apart. eg: targets of the same arch without a triple.
+    """
+    names = {}
+    for target in targets:
+        condition = target_condition(target)
+        if condition in names:
+            raise ValueError(f"targets {names[condition]} and {target.name} can't be told apart"
+                             f" when compiling({condition}), give them triples of different"
+                             " platforms")
+        names[condition] = target.name
+
+
+def use_dispatch_config(cxx_result: GeneratorResult):
+    """
+    Generated sources of a target include config.h in their own directory.
+    Move it into TARGET_CONFIG_FILE, and make config.h include the dispatching config.h
+    in parent directory, which includes TARGET_CONFIG_FILE of the target matching current compiler.
+    """
+    files = cxx_result.saved_files
+    files[TARGET_CONFIG_FILE] = files.pop('config.h')
+    files['config.h'] = '#pragma once\n#include "../config.h"\n'
+
+
+def target_dispatch_config(targets: Sequence[CxxTarget],
+                           layout_differences: Dict[str, List[str]]) -> str:
+    """
+    config.h which includes TARGET_CONFIG_FILE of the target matching current compiler.
+    """
+    code = TextHolder()
+    code += '#pragma once'
+    if layout_differences:
+        code += '// layouts of these types differ among targets,'
+        code += f'// their sizes are asserted by {LAYOUT_CHECKS_FILE} of each target:'
+        for name, target_names in layout_differences.items():
+            code += f'// {name} : {", ".join(target_names)}'
+    for i, target in enumerate(targets):
+        directive = '#if' if i == 0 else '#elif'
+        code += f'{directive} {target_condition(target)}'
+        code += f'#include "{target.name}/{TARGET_CONFIG_FILE}"'
+    code += '#else'
+    code += f'#error "none of targets({", ".join(t.name for t in targets)}) matches current platform"'
+    code += '#endif'
+    return str(code)
+
+
+def target_layout_checks(target: CxxTarget, parser_result: CXXParseResult,
+                         class_names: Iterable[str]) -> str:
+    """
+    layout_checks.h of a target: static_asserts on sizes of classes parsed for this target.
+    If config.h picks this target while the compiler sees another layout(eg: different definitions
+    or packing), building fails instead of binding with a wrong layout.
+    """
+    code = TextHolder()
+    code += '#pragma once'
+    file_classifier = parser_result.parser_options.file_classifier
+    for name in class_names:
+        c = parser_result.objects.get(name, None)
+        if _can_check_layout(name, c, file_classifier):
+            code += (f'static_assert(sizeof(::{name}) == {c.size}, '
+                     f'"layout of {name} differs from target {target.name}");')
+    return str(code)
+
+
+def _can_check_layout(name: str, c, file_classifier: FileClassifier) -> bool:
+    """
+    only complete classes from input files, which can be named outside of any class, are checked.
+    """
+    if (not isinstance(c, Class)
+        or isinstance(c, AnonymousUnion)
+        or c.size < 0
+        or not QUALIFIED_NAME_PATTERN.match(name)
+        or c.location is None
+        or c.location.file is None
+        or file_classifier.is_internal_file(c.location.file)
+    ):
+        return False
+    parent = c.parent
+    while parent is not None:
+        if isinstance(parent, Class):
+            return False  # nested class may be inaccessible
+        parent = parent.parent
+    return True
@@ -61,8 +61,9 @@ class PyiGenerator(GeneratorBase):
     def _return_description_for_function(self, of: GeneratorFunction):
         code = TextHolder()
         return_elements = ['"retv"', ]
-        wf = of
-        for wi in wf.wrappers:
+        wf = of.shallow_copy()
+        # a wrapper may remove itself from wf.wrappers
+        for wi in list(of.wrappers):
             arg = wf.args[wi.index]
             return_elements.append(f'"{arg.name}"')
             wf = wi.wrapper.wrap(f=wf, index=wi.index, wrapper_info=wi)
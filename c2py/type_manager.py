@@ -2,14 +2,11 @@
 type conversion between cpp, python and binding(currently pybind11)
 """
 import logging
-from typing import Any
+from typing import Any, Dict, Optional
 
-from c2py.core.core_types.cxx_types import (array_base, array_count_str, function_pointer_type_info,
-                                            is_array_type, is_function_pointer_type,
-                                            is_pointer_type, is_std_vector, pointer_base,
-                                            remove_cvref, is_const_type, is_function_type, function_type_info)
+from c2py.core.core_types.cxx_types import CxxType, parse_type, remove_cvref
 from c2py.core.core_types.generator_types import GeneratorClass, GeneratorEnum, GeneratorNamespace, \
-    GeneratorTypedef
+    GeneratorSymbol, GeneratorTypedef
 from c2py.objects_manager import ObjectManager
 
 logger = logging.getLogger(__file__)
@@ -97,33 +94,26 @@ def python_value_to_cpp_literal(val: Any):
 
 
 def is_integer_type(ot: str):
-    t = remove_cvref(ot)
-    try:
-        return cpp_base_type_to_python(t) == 'int'
-    except KeyError:
-        return False
+    t = parse_type(ot).unqualified
+    return CPP_BASE_TYPE_TO_PYTHON.get(t.spelling, None) == 'int'
 
 
 def is_string_type(ot: str):
-    t = remove_cvref(ot)
-    if is_array_type(t):
-        b = array_base(t)
-        return b in ARRAY_BASES and ARRAY_BASES[b] == 'str'  # special case: string array
-    try:
-        return t in STRING_BASE_TYPES
-    except KeyError:
-        return False
+    t = parse_type(ot).unqualified
+    if t.is_array:
+        return ARRAY_BASES.get(t.element.spelling, None) == 'str'  # special case: string array
+    return t.spelling in STRING_BASE_TYPES
 
 
 def is_string_array_type(ot: str):
-    t = remove_cvref(ot)
-    if is_array_type(t):
-        base = array_base(t)
-    elif is_pointer_type(t):
-        base = pointer_base(t)
+    t = parse_type(ot).unqualified
+    if t.is_array:
+        base = t.element
+    elif t.is_pointer:
+        base = t.pointee
     else:
         return False
-    return is_string_type(remove_cvref(base))
+    return is_string_type(base.unqualified.spelling)
 
 
 def is_tuple_type(ot: str):
@@ -149,48 +139,78 @@ def make_tuple_type(*args):
 
 
 class TypeManager:
+    """
+    types are parsed into interned CxxType, and results of queries are memoized per type spelling:
+    objects are expected not to change after a TypeManager is created.
+    """
 
     def __init__(self, g: GeneratorNamespace, objects: ObjectManager):
         self.g: GeneratorNamespace = g
         self.objects = objects
+        self._basic_types: Dict[str, str] = {}
+        self._python_types: Dict[str, str] = {}
+        self._declarations: Dict[str, Optional[GeneratorSymbol]] = {}
 
     def remove_decorations(self, ot: str):
         """
         remove pointers, array, cvref
         """
-        t = remove_cvref(ot)
-        if is_pointer_type(t):
-            return self.remove_decorations(pointer_base(t))
-        if is_array_type(t):
-            return self.remove_decorations(array_base(t))
-        return t
+        t = parse_type(ot)
+        while True:
+            if t.unqualified.is_pointer:
+                t = t.unqualified.pointee
+            elif t.unqualified.is_array:
+                t = t.unqualified.element
+            else:
+                return t.unqualified.spelling
+
+    def declaration(self, ot: str) -> Optional[GeneratorSymbol]:
+        """
+        :return: declaration of type after removing decorations and resolving typedefs,
+        None if not found.
+        """
+        try:
+            return self._declarations[ot]
+        except KeyError:
+            try:
+                res = self.objects.resolve_all_typedef(self.remove_decorations(ot))
+            except KeyError:
+                res = None
+            self._declarations[ot] = res
+            return res
 
     def resolve_to_basic_type_remove_const(self, ot: str):
-        t = remove_cvref(ot)
-        if is_pointer_type(t):
-            return self.resolve_to_basic_type_remove_const(pointer_base(t)) + " *"
-        if is_array_type(t):
-            base = self.resolve_to_basic_type_remove_const(array_base(t))
-            if is_std_vector(t):
+        try:
+            return self._basic_types[ot]
+        except KeyError:
+            res = self._basic_types[ot] = self._resolve_to_basic_type(parse_type(ot).unqualified)
+            return res
+
+    def _resolve_to_basic_type(self, t: CxxType):
+        if t.is_pointer:
+            return self.resolve_to_basic_type_remove_const(t.pointee.spelling) + " *"
+        if t.is_array:
+            base = self.resolve_to_basic_type_remove_const(t.element.spelling)
+            if t.is_std_vector:
                 return f'std::vector<{self.resolve_to_basic_type_remove_const(base)}>'
-            return f'{base} [{array_count_str(t)}]'
+            return f'{base} [{t.extent_spelling}]'
         try:
-            obj = self.objects[t]
+            obj = self.objects[t.spelling]
             if isinstance(obj, GeneratorTypedef) and obj.full_name != obj.target:
                 return self.resolve_to_basic_type_remove_const(obj.target)
         except KeyError:
             pass
-        return t
+        return t.spelling
 
     def is_pointer_type(self):
         pass
 
     def is_basic_type(self, t: str):
-        t = self.resolve_to_basic_type_remove_const(t)
+        t = parse_type(self.resolve_to_basic_type_remove_const(t))
 
         if (
-            is_array_type(t) and
-            array_base(t) in CPP_BASE_TYPE_TO_PYTHON
+            t.is_array and
+            t.element.spelling in CPP_BASE_TYPE_TO_PYTHON
         ):
             return True
         return False
@@ -215,6 +235,13 @@ class TypeManager:
         :param t: full name of type
         :return:
         """
+        try:
+            return self._python_types[ot]
+        except KeyError:
+            res = self._python_types[ot] = self._cpp_type_to_python(ot)
+            return res
+
+    def _cpp_type_to_python(self, ot: str):
         t = ot
         t = remove_cvref(t)
         t = self._remove_variable_type_prefix(t)
@@ -222,25 +249,20 @@ class TypeManager:
             return cpp_base_type_to_python(t)
         except KeyError:
             pass
-        if is_function_pointer_type(t):
-            func = function_pointer_type_info(t)
-            args = ",".join([self.cpp_type_to_python(arg.type) for arg in func.args])
-            return f'Callable[[{args}], {self.cpp_type_to_python(func.ret_type)}]'
-
-        if is_function_type(t):
-            func = function_type_info(t)
-            args = ",".join([self.cpp_type_to_python(arg.type) for arg in func.args])
-            return f'Callable[[{args}], {self.cpp_type_to_python(func.ret_type)}]'
-
-        if is_pointer_type(t):
-            cpp_base = self.resolve_to_basic_type_remove_const(pointer_base(t))
-            if is_pointer_type(cpp_base) or is_array_type(cpp_base):
+        ct = parse_type(t)
+        if ct.function is not None:  # function pointer or function
+            args = ",".join([self.cpp_type_to_python(arg.spelling) for arg in ct.arg_types])
+            return f'Callable[[{args}], {self.cpp_type_to_python(ct.ret_type.spelling)}]'
+
+        if ct.is_pointer:
+            cpp_base = parse_type(self.resolve_to_basic_type_remove_const(ct.pointee.spelling))
+            if cpp_base.is_pointer or cpp_base.is_array:
                 return f'"level 2 pointer:{t}"'  # un-convertible: level 2 pointer
-            if cpp_base in ARRAY_BASES:
-                return ARRAY_BASES[cpp_base]
-            return self.cpp_type_to_python(cpp_base)
-        if is_array_type(t):
-            b = array_base(t)
+            if cpp_base.spelling in ARRAY_BASES:
+                return ARRAY_BASES[cpp_base.spelling]
+            return self.cpp_type_to_python(cpp_base.spelling)
+        if ct.is_array:
+            b = ct.element.spelling
             if b in ARRAY_BASES:  # special case: string array
                 return ARRAY_BASES[b]
             base = self.cpp_type_to_python(b)
@@ -12,3 +12,23 @@ for f in `ls *.py`; do
     python $f
 done
 
+popd
+
+pushd $tests_dir/python_side/cli
+for f in `ls *.py`; do
+    python $f
+done
+
+popd
+
+pushd $tests_dir/python_side/generator
+for f in `ls *.py`; do
+    python $f
+done
+
+popd
+
+pushd $tests_dir/python_side/preprocessor
+for f in `ls *.py`; do
+    python $f
+done
@@ -0,0 +1,55 @@
+import os
+import tempfile
+from unittest import TestCase, main
+
+from click.testing import CliRunner
+
+from c2py.cli import cli
+
+
+class CallbackCallingTypes(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.header = os.path.join(self.dir.name, "test.h")
+        with open(self.header, "wt") as f:
+            f.write("""
+            struct Big{ char data[1024]; };
+            struct Incomplete;
+            class Spi{
+            public:
+                virtual void OnBig(Big *b);
+                virtual void OnIncomplete(Incomplete *p);
+                virtual void OnInt(int a);
+            };
+            """)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _generate(self, *args: str):
+        result = CliRunner().invoke(cli, [
+            'generate', 'vntest', self.header, *args,
+            '--output-dir', os.path.join(self.dir.name, "out"),
+        ])
+        self.assertEqual(0, result.exit_code, result.output)
+        return result.output
+
+    def test_report(self):
+        output = self._generate('--callback-sync-copy-bytes', '100',
+                                '--callback-unknown-copy-bytes', 'sync')
+        self.assertIn("Spi::OnBig : Sync, 1024 bytes copied if async", output)
+        self.assertIn("Spi::OnIncomplete : Sync, unknown bytes copied if async", output)
+        self.assertIn("Spi::OnInt : Default, 4 bytes copied if async", output)
+
+    def test_unknown_only(self):
+        output = self._generate('--callback-unknown-copy-bytes', 'async')
+        self.assertIn("Spi::OnBig : Default, 1024 bytes copied if async", output)
+        self.assertIn("Spi::OnIncomplete : Async, unknown bytes copied if async", output)
+
+    def test_without_policy(self):
+        self.assertNotIn("bytes copied if async", self._generate())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+from unittest import TestCase, main
+
+from click.testing import CliRunner
+
+from c2py.cli import cli
+
+
+class Patterns(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.header = os.path.join(self.dir.name, "test.h")
+        with open(self.header, "wt") as f:
+            f.write("""
+            namespace api{ int f(int a); int g(int a); }
+            namespace other{ int h(int a); }
+            """)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _generate(self, *args: str):
+        return CliRunner().invoke(cli, [
+            'generate', 'vntest', self.header, *args,
+            '--output-dir', os.path.join(self.dir.name, "out"),
+        ])
+
+    def _section(self, output: str, title: str):
+        start = output.index(title)
+        return output[start:output.index('\n\n', start)]
+
+    def test_global_flags(self):
+        result = self._generate('--ignore-pattern', '(?i)API::F')
+        self.assertEqual(0, result.exit_code, result.output)
+        ignored = self._section(result.output, '# of ignore')
+        self.assertIn('api::f', ignored.splitlines())
+        self.assertNotIn('api::g', ignored)
+
+    def test_roots_with_groups(self):
+        # both patterns define group n
+        result = self._generate('--roots', '(?P<n>api)::g', '--roots', '(?P<n>other)::h')
+        self.assertEqual(0, result.exit_code, result.output)
+        pruned = self._section(result.output, '# of unreachable symbols pruned')
+        self.assertIn('api::f', pruned)
+        self.assertNotIn('api::g', pruned)
+        self.assertNotIn('other::h', pruned)
+
+    def test_invalid_pattern(self):
+        for args in (('--ignore-pattern', 'a('), ('--roots', 'a(')):
+            with self.subTest(args=args):
+                result = self._generate(*args)
+                self.assertEqual(2, result.exit_code, result.output)
+                self.assertIn('invalid pattern a(', result.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+from unittest import TestCase, main
+
+from click.testing import CliRunner
+
+from c2py.cli import cli
+
+
+class Snapshot(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.header = os.path.join(self.dir.name, "test.h")
+        with open(self.header, "wt") as f:
+            f.write("struct A{ int a; };\nint f(int x);\n")
+        self.runner = CliRunner()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _generate(self, name: str, *args: str):
+        output_dir = os.path.join(self.dir.name, name)
+        result = self.runner.invoke(cli, [
+            'generate', 'vntest', *args,
+            '--output-dir', output_dir,
+        ])
+        self.assertEqual(0, result.exit_code, result.output)
+        return output_dir
+
+    def _read(self, output_dir: str):
+        contents = {}
+        for root, _, names in os.walk(output_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                with open(path, "rt") as f:
+                    contents[os.path.relpath(path, output_dir)] = f.read()
+        return contents
+
+    def test_without_snapshot(self):
+        output_dir = self._generate("out", self.header)
+        self.assertIn("module.cpp", os.listdir(output_dir))
+        self.assertIn("vntest.pyi", os.listdir(os.path.join(output_dir, "vntest")))
+
+    def test_from_snapshot(self):
+        snapshot = os.path.join(self.dir.name, "snapshot.bin")
+        parsed = self._generate("parsed", self.header, '--save-snapshot', snapshot)
+        self.assertTrue(os.path.isfile(snapshot))
+
+        # input files default to the ones saved in snapshot
+        from_snapshot = self._generate("from_snapshot", '--from-snapshot', snapshot)
+        self.assertEqual(self._read(parsed), self._read(from_snapshot))
+
+    def test_missing_snapshot(self):
+        result = self.runner.invoke(cli, [
+            'generate', 'vntest', '--from-snapshot', os.path.join(self.dir.name, "missing.bin"),
+        ])
+        self.assertNotEqual(0, result.exit_code)
+        self.assertIn("does not exist", result.output)
+
+
+if __name__ == '__main__':
+    main()
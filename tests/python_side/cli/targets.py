@@ -0,0 +1,84 @@
+import os
+import tempfile
+from unittest import TestCase, main
+
+from click.testing import CliRunner
+
+from c2py.cli import cli
+
+
+class Targets(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.header = os.path.join(self.dir.name, "test.h")
+        with open(self.header, "wt") as f:
+            f.write("struct Same{ int a; };\nstruct WithPointer{ int a; void *p; };\n")
+        self.output_dir = os.path.join(self.dir.name, "out")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _read(self, *path: str):
+        with open(os.path.join(self.output_dir, *path), "rt") as f:
+            return f.read()
+
+    def _generate(self, *args: str):
+        return CliRunner().invoke(cli, [
+            'generate', 'vntest', self.header,
+            '--output-dir', self.output_dir,
+            *args,
+        ])
+
+    def test_generate_targets(self):
+        result = self._generate('--target', 'x86:x86', '--target', 'x64:x64')
+        self.assertEqual(0, result.exit_code, result.output)
+
+        config = self._read("config.h")
+        self.assertIn('#include "x86/target_config.h"', config)
+        self.assertIn('#include "x64/target_config.h"', config)
+        self.assertIn('#error', config)
+        self.assertIn('// WithPointer : x86, x64', config)
+
+        for target, size in (('x86', 8), ('x64', 16)):
+            checks = self._read(target, "layout_checks.h")
+            self.assertIn(f'static_assert(sizeof(::WithPointer) == {size}, ', checks)
+            self.assertNotIn('Same', checks)
+            # included after input files
+            module = self._read(target, "module.cpp")
+            self.assertLess(module.index(self.header), module.index('#include "layout_checks.h"'))
+            # sources include config.h of their own directory, which includes the dispatching one
+            self.assertIn('#include "config.h"', module)
+            self.assertIn('#include "../config.h"', self._read(target, "config.h"))
+            self.assertIn('AUTOCXXPY_ENCODING_UTF8', self._read(target, "target_config.h"))
+
+    def test_invalid_targets(self):
+        for args, message in (
+            (['--target', 'x86'], "invalid target spec"),
+            (['--target', 'a:arm'], "invalid arch"),
+            # conditions of both targets are the same
+            (['--target', 'a:x64', '--target', 'b:x64'], "a and b can't be told apart"),
+            (['--target', 'a:x64:x86_64-pc-linux-gnu', '--target', 'b:x64:x86_64-unknown-linux'],
+             "a and b can't be told apart"),
+            (['--target', 'x86:x86', '--generate-setup', self.dir.name],
+             "--generate-setup is not supported with --target"),
+        ):
+            with self.subTest(args=args):
+                result = self._generate(*args)
+                # a usage error of click, instead of an uncaught exception
+                self.assertEqual(2, result.exit_code, result.output)
+                self.assertIsInstance(result.exception, SystemExit)
+                self.assertIn(message, result.output)
+        self.assertFalse(os.path.exists(self.output_dir))
+
+    def test_targets_of_platforms(self):
+        result = self._generate('--target', 'win64:x64:x86_64-pc-windows-msvc',
+                                '--target', 'linux64:x64:x86_64-pc-linux-gnu')
+        self.assertEqual(0, result.exit_code, result.output)
+        config = self._read("config.h")
+        self.assertIn('#if defined(_WIN32) && ', config)
+        self.assertIn('#elif defined(__linux__) && ', config)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from c2py.cli import GenerateSession, _watched_files, cli
+
+
+class Watch(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.output_dir = os.path.join(self.dir.name, "out")
+        self.a = os.path.join(self.dir.name, "a.h")
+        self.b = os.path.join(self.dir.name, "b.h")
+        self._write(self.a, "struct A{ int a; };\nint f(int x);\n")
+        self._write(self.b, "struct B{ int b; };\n")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    @staticmethod
+    def _write(path: str, content: str):
+        with open(path, "wt") as f:
+            f.write(content)
+
+    def _output_files(self):
+        for root, _, names in os.walk(self.output_dir):
+            for name in names:
+                yield os.path.join(root, name)
+
+    def _outputs(self):
+        outputs = {}
+        for path in self._output_files():
+            with open(path, "rt") as f:
+                outputs[os.path.relpath(path, self.output_dir)] = (os.stat(path).st_mtime_ns,
+                                                                   f.read())
+        return outputs
+
+    def _watch(self, change):
+        """
+        run watch, call change() after the first generation, and stop after the reparse.
+        :return: outputs before and after the change, as {name: (mtime, content)}
+        """
+        before = {}
+
+        def sleep(_):
+            if before:
+                raise KeyboardInterrupt()
+            # so that any file rewritten later has a different mtime
+            for path in self._output_files():
+                os.utime(path, ns=(0, 0))
+            before.update(self._outputs())
+            change()
+
+        with patch('c2py.cli.time.sleep', side_effect=sleep):
+            result = CliRunner().invoke(cli, [
+                'watch', 'vntest', self.a, self.b,
+                '--output-dir', self.output_dir,
+            ])
+        self.assertEqual(0, result.exit_code, result.output)
+        return before, self._outputs()
+
+    def _touch(self, path: str):
+        mtime = os.stat(path).st_mtime_ns
+        os.utime(path, ns=(mtime + 10 ** 9, mtime + 10 ** 9))
+
+    def test_rewrites_changed_outputs_only(self):
+        def change():
+            self._write(self.b, "struct B{ int b; int b2; };\n")
+            self._touch(self.b)
+
+        before, after = self._watch(change)
+        self.assertEqual(set(before), set(after))
+        changed = {name for name in after if after[name][1] != before[name][1]}
+        rewritten = {name for name in after if after[name][0] != before[name][0]}
+        self.assertTrue(changed)
+        self.assertLess(len(changed), len(after))
+        self.assertEqual(changed, rewritten)
+
+    def test_touched_without_changes(self):
+        before, after = self._watch(lambda: self._touch(self.a))
+        self.assertEqual(before, after)
+
+    def test_watched_files_classified_by_globs(self):
+        self._write(self.a, '#include "b.h"\nstruct A{ int a; };\n')
+        session = GenerateSession('vntest', [self.a], output_dir=self.output_dir,
+                                  internal_file_globs=['*/b.h'])
+        parser = session.create_parser()
+        parser.options.extra_options.show_progress = False
+        parser.parse()
+        self.assertEqual([os.path.abspath(self.a)], list(_watched_files(parser, [self.a])))
+
+
+if __name__ == '__main__':
+    main()
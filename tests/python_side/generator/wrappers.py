@@ -0,0 +1,99 @@
+import os
+import pickle
+import re
+import tempfile
+from unittest import TestCase, main
+
+from c2py.core import CxxFileParser
+from c2py.core.cxxparser import CXXParserExtraOptions
+from c2py.core.preprocessor import PreProcessor, PreProcessorOptions
+from c2py.core.wrappers import BaseFunctionWrapper, WrapperInfo
+from c2py.generator.pyigenerator.pyigenerator import PyiGenerator, PyiGeneratorOptions
+
+
+class CountingWrapper(BaseFunctionWrapper):
+    name = "counting_wrapper"
+
+    def __init__(self):
+        super().__init__(None)
+        self.count = 0
+
+    def match(self, f, i, a):
+        return False
+
+    def wrap(self, f, index, wrapper_info):
+        self.count += 1
+        f.ret_type += '*'
+        return f
+
+
+class Wrappers(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.header = os.path.join(self.dir.name, "test.h")
+        with open(self.header, "wt") as f:
+            f.write("int f(int &a, int &b, int &c);\n")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _preprocess(self):
+        extra_options = CXXParserExtraOptions()
+        extra_options.show_progress = False
+        parse_result = CxxFileParser(files=[self.header], extra_options=extra_options).parse()
+        options = PreProcessorOptions(parse_result)
+        options.output_arg_pattern = re.compile(r'f::.*')
+        return PreProcessor(options).process()
+
+    def test_return_description(self):
+        result = self._preprocess()
+        f = result.g.functions['f'][0]
+        # every output wrapper removes itself from wrappers of the function it wraps
+        self.assertEqual(3, len(f.wrappers))
+        generator = PyiGenerator(PyiGeneratorOptions.from_preprocessor_result('m', result))
+        self.assertEqual('return "retv","a","b","c"',
+                         str(generator._return_description_for_function(f)).strip())
+        self.assertEqual(3, len(f.wrappers))
+
+    def test_resolve_wrappers_memoized(self):
+        f = self._preprocess().g.functions['f'][0]
+        wf = f.resolve_wrappers()
+        self.assertIs(wf, f.resolve_wrappers())
+        self.assertEqual('std::tuple<int,int &,int &,int &>', wf.ret_type)
+        self.assertEqual([], wf.args)
+
+        # appended wrappers are applied onto the memoized signature
+        counting = CountingWrapper()
+        f.wrappers.append(WrapperInfo(wrapper=counting, index=0))
+        wf = f.resolve_wrappers()
+        self.assertEqual(1, counting.count)
+        self.assertEqual('std::tuple<int,int &,int &,int &>*', wf.ret_type)
+        self.assertIs(wf, f.resolve_wrappers())
+        self.assertEqual(1, counting.count)
+
+        # wrappers changed in other ways: every wrapper is applied again
+        f.wrappers[-1] = WrapperInfo(wrapper=counting, index=0)
+        wf = f.resolve_wrappers()
+        self.assertEqual(2, counting.count)
+        self.assertEqual('std::tuple<int,int &,int &,int &>*', wf.ret_type)
+
+        del f.wrappers[-1]
+        self.assertEqual('std::tuple<int,int &,int &,int &>', f.resolve_wrappers().ret_type)
+        self.assertEqual(2, counting.count)
+
+    def test_resolved_not_pickled(self):
+        f = self._preprocess().g.functions['f'][0]
+        wf = f.resolve_wrappers()
+        state, slots = f.__getstate__()
+        self.assertIsNone(state['resolved'])
+        self.assertEqual('f', slots['name'])  # fields of parser types are in slots
+        self.assertIs(wf, f.resolved[1])  # the function itself keeps its memo
+
+        loaded = pickle.loads(pickle.dumps(f))
+        self.assertIsNone(loaded.resolved)
+        self.assertEqual(wf.ret_type, loaded.resolve_wrappers().ret_type)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import os
+import tempfile
+from unittest import TestCase, main
+
+from c2py.clang.cindex import CursorKind
+from c2py.core import CxxFileParser
+from c2py.core.cursor_visitor import cursor_file, visit_children
+from c2py.core.cxxparser import CXXParserExtraOptions
+
+
+class VisitChildren(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.header = os.path.join(self.dir.name, "test.h")
+        with open(self.header, "wt") as f:
+            f.write("""
+            #define M 1
+            /// comment of S
+            struct S{ int a; };
+            """)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_lazy(self):
+        extra_options = CXXParserExtraOptions()
+        extra_options.show_progress = False
+        parser = CxxFileParser(files=[self.header], extra_options=extra_options)
+        tu = parser._parse_translation_unit()
+        records = visit_children(tu.cursor)
+
+        # only kind is read while visiting
+        for r in records:
+            self.assertFalse(hasattr(r.cursor, '_spelling'))
+            self.assertFalse(hasattr(r.cursor, '_location_record'))
+
+        macro = next(r for r in records if r.kind == CursorKind.MACRO_DEFINITION
+                     and r.spelling == 'M')
+        self.assertEqual("", macro.type_spelling)
+        self.assertIsNone(macro.brief_comment)
+        self.assertEqual("invalid", macro.access)
+        self.assertEqual(self.header, cursor_file(macro.cursor))
+        self.assertFalse(hasattr(macro.cursor, '_location_record'))
+        self.assertEqual(self.header, macro.location.file)
+
+        s = next(r for r in records if r.kind == CursorKind.STRUCT_DECL)
+        self.assertEqual('S', s.spelling)
+        self.assertEqual('S', s.type_spelling)
+        self.assertEqual('comment of S', s.brief_comment)
+        self.assertIs(s.location, s.cursor._location_record)
+
+
+class VisitChildrenBenchmark(TestCase):
+    count = 20000
+
+    def test_skipped_system_cursors(self):
+        with tempfile.TemporaryDirectory() as d:
+            # a path containing one of INTERNAL_PATH_FLAG is a system header
+            system_dir = os.path.join(d, "Windows Kits")
+            os.mkdir(system_dir)
+            with open(os.path.join(system_dir, "system.h"), "wt") as f:
+                for i in range(self.count):
+                    f.write(f"#define SYSTEM_M{i} {i}\nvoid system_f{i}(int a);\n")
+            header = os.path.join(d, "test.h")
+            with open(header, "wt") as f:
+                f.write('#include "Windows Kits/system.h"\n#define M 1\nstruct S{ int a; };\n')
+            extra_options = CXXParserExtraOptions()
+            extra_options.show_progress = False
+            extra_options.prune_system_headers = True
+            parser = CxxFileParser(files=[header], extra_options=extra_options)
+            tu = parser._parse_translation_unit()
+
+            for _ in parser.iter_symbols(tu):
+                pass
+
+            result = parser.result
+            self.assertIn('S', result.g.classes)
+            self.assertIn('M', result.macros)
+            self.assertNotIn('SYSTEM_M0', result.macros)
+            self.assertNotIn('system_f0', result.g.functions)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+from unittest import TestCase, main
+
+from c2py.core import CxxFileParser
+from c2py.core.cxxparser import CXXParserExtraOptions, ParserSession
+from c2py.core.env import FileClassifier
+
+
+class FileClassifierOfParser(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        # a path containing one of INTERNAL_PATH_FLAG is a system header
+        system_dir = os.path.join(self.dir.name, "Windows Kits")
+        os.mkdir(system_dir)
+        self.system_header = os.path.join(system_dir, "system.h")
+        with open(self.system_header, "wt") as f:
+            f.write("#define SYSTEM_M 1\nvoid system_f(int a);\n")
+        self.vendor_header = os.path.join(self.dir.name, "vendor.h")
+        with open(self.vendor_header, "wt") as f:
+            f.write("#define VENDOR_M 1\nvoid vendor_f(int a);\n")
+        self.header = os.path.join(self.dir.name, "test.h")
+        with open(self.header, "wt") as f:
+            f.write('#include "Windows Kits/system.h"\n'
+                    '#include "vendor.h"\n'
+                    '#define M 1\n'
+                    'void f(int a);\n')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _parser(self, file_classifier: FileClassifier = None, session: ParserSession = None,
+                jobs: int = 1):
+        extra_options = CXXParserExtraOptions()
+        extra_options.show_progress = False
+        extra_options.prune_system_headers = True
+        return CxxFileParser(files=[self.header, self.vendor_header],
+                             extra_options=extra_options,
+                             file_classifier=file_classifier,
+                             session=session,
+                             jobs=jobs)
+
+    def test_default(self):
+        result = self._parser().parse()
+        self.assertEqual({'M', 'VENDOR_M'}, set(result.macros) & {'M', 'VENDOR_M', 'SYSTEM_M'})
+        self.assertEqual({'f', 'vendor_f'}, set(result.g.functions))
+
+    def test_globs(self):
+        file_classifier = FileClassifier(internal_globs=['*/vendor.h'],
+                                         input_globs=['*/Windows Kits/*'])
+        for jobs in (1, 2):
+            result = self._parser(file_classifier, jobs=jobs).parse()
+            self.assertEqual({'M', 'SYSTEM_M'},
+                             set(result.macros) & {'M', 'VENDOR_M', 'SYSTEM_M'})
+            self.assertEqual({'f', 'system_f'}, set(result.g.functions))
+
+    def test_session_cache_per_classifier(self):
+        session = ParserSession()
+        default = self._parser(session=session)
+        self.assertEqual({'f', 'vendor_f'}, set(default.parse().g.functions))
+
+        file_classifier = FileClassifier(internal_globs=['*/vendor.h'])
+        classified = self._parser(file_classifier, session=session)
+        self.assertIsNot(default._input_files, classified._input_files)
+        self.assertEqual({'f'}, set(classified.parse().g.functions))
+
+
+if __name__ == '__main__':
+    main()
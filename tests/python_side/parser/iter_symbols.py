@@ -0,0 +1,61 @@
+import os
+import tempfile
+from unittest import TestCase, main
+
+from c2py.core import CxxFileParser
+from c2py.core.cxxparser import CXXParserExtraOptions
+from c2py.core.core_types.parser_types import Class, Function, Macro, Namespace, Variable
+
+
+class IterSymbolsTest(TestCase):
+    src = """
+    #define M 1
+    namespace n{ struct A{ int a; }; }
+    extern "C" {
+        int c_function(int);
+    }
+    struct S{ int s; };
+    const int v = 1;
+    """
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.header = os.path.join(self.dir.name, "test.h")
+        with open(self.header, "wt") as f:
+            f.write(self.src)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _parser(self):
+        extra_options = CXXParserExtraOptions()
+        extra_options.show_progress = False
+        return CxxFileParser(files=[self.header], extra_options=extra_options)
+
+    def test_iter_symbols(self):
+        parser = self._parser()
+        symbols = {s.name: s for s in parser.iter_symbols()}
+        self.assertIsInstance(symbols['M'], Macro)
+        self.assertIsInstance(symbols['n'], Namespace)
+        self.assertIn('A', symbols['n'].classes)
+        self.assertIsInstance(symbols['c_function'], Function)
+        self.assertIsInstance(symbols['S'], Class)
+        self.assertIsInstance(symbols['v'], Variable)
+
+        result = parser.result
+        self.assertIs(symbols['S'], result.g.classes['S'])
+        self.assertIs(symbols['S'], result.objects['S'])
+        self.assertIn('M', result.macros)
+
+    def test_stop_early(self):
+        parser = self._parser()
+        for s in parser.iter_symbols():
+            if s.name == 'n':
+                break
+        result = parser.result
+        self.assertIn('n', result.g.namespaces)
+        self.assertNotIn('S', result.g.classes)
+
+
+if __name__ == '__main__':
+    main()
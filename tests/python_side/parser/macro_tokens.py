@@ -0,0 +1,65 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from c2py.core import CXXParser
+from c2py.core.cxxparser import CXXParserExtraOptions, CXXParserOptions
+
+
+class MacroTokens(TestCase):
+    file = "./test.cpp"
+    # non-ascii characters make lengths in bytes and in characters differ
+    src = """
+    // 注释
+    #define A 1
+    #define B (A + 2) // "注释"
+    #define STR "字符串"
+    #define F(x, y) ((x) * (y))
+    #define EMPTY
+    struct S{ int a; };
+    #define LAST 0x10
+    """
+    expected = {
+        'A': '1',
+        'B': '( A + 2 )',
+        'STR': '"字符串"',
+        'F': '( x , y ) ( ( x ) * ( y ) )',
+        'EMPTY': '',
+        'LAST': '0x10',
+    }
+
+    def _parser(self):
+        extra_options = CXXParserExtraOptions()
+        extra_options.show_progress = False
+        return CXXParser(CXXParserOptions(
+            file_path=self.file,
+            unsaved_files=[(self.file, self.src)],
+            extra_options=extra_options,
+        ))
+
+    def _definitions(self, result):
+        return {name: m.definition for name, m in result.macros.items() if name in self.expected}
+
+    def test_sliced(self):
+        parser = self._parser()
+        result = parser.parse()
+        self.assertEqual(self.expected, self._definitions(result))
+        # every macro is sliced from tokens of the whole file
+        (file_tokens,) = parser._file_tokens.values()
+        self.assertIsNotNone(file_tokens)
+
+    def test_fallback(self):
+        parser = self._parser()
+        with patch.object(parser, '_file_size', return_value=None):
+            result = parser.parse()
+        self.assertEqual(self.expected, self._definitions(result))
+        # every macro is tokenized on its own
+        (file_tokens,) = parser._file_tokens.values()
+        self.assertIsNone(file_tokens)
+
+    def test_file_size_in_bytes(self):
+        parser = self._parser()
+        self.assertEqual(len(self.src.encode('utf-8')), parser._file_size(self.file))
+
+
+if __name__ == '__main__':
+    main()
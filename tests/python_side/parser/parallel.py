@@ -0,0 +1,83 @@
+import os
+import tempfile
+from unittest import TestCase, main
+
+from c2py.core import CxxFileParser
+
+
+class ParallelParse(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        sources = {
+            "shared.h": """
+            #pragma once
+            #define SHARED 1
+            namespace n{ struct Shared{ int a; }; }
+            """,
+            "a.h": """
+            #include "shared.h"
+            namespace n{ struct A{ Shared s; }; }
+            namespace n{ struct D; void f(int a); void g(); }
+            """,
+            "b.h": """
+            #include "shared.h"
+            namespace n{ struct B{ Shared s; }; }
+            namespace n{ struct D{ int d; }; void f(double a); void g(); }
+            """,
+        }
+        for name, src in sources.items():
+            with open(os.path.join(self.dir.name, name), "wt") as f:
+                f.write(src)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_parallel(self):
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                self._check(self._parse(jobs))
+
+    def _parse(self, jobs: int):
+        files = [os.path.join(self.dir.name, i) for i in ("a.h", "b.h")]
+        return CxxFileParser(files=files, jobs=jobs).parse()
+
+    def _check(self, result):
+        n = result.g.namespaces['n']
+        self.assertIn('A', n.classes)
+        self.assertIn('B', n.classes)
+        self.assertIn('Shared', n.classes)
+        self.assertIn('SHARED', result.macros)
+
+        # every symbol in tree is the one in objects, namespace n is reopened in every file
+        self.assertIs(n, result.objects['n'])
+        for name in ('A', 'B', 'Shared'):
+            self.assertIs(n.classes[name], result.objects[f'n::{name}'])
+            self.assertIs(n, n.classes[name].parent)
+
+    def test_parallel_declarations(self):
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                n = self._parse(jobs).g.namespaces['n']
+                # overloads from every file
+                self.assertEqual(['n::f (int a)', 'n::f (double a)'],
+                                 [f.signature for f in n.functions['f']])
+                for f in n.functions['f']:
+                    self.assertIs(n, f.parent)
+        # declarations of the same function in different groups are merged into one
+        n = self._parse(2).g.namespaces['n']
+        self.assertEqual(1, len(n.functions['g']))
+
+    def test_parallel_forward_declaration(self):
+        result = self._parse(2)
+        n = result.g.namespaces['n']
+        # definition in a later file replaces the forward declaration
+        D = n.classes['D']
+        self.assertIn('d', D.variables)
+        self.assertIs(D, result.objects['n::D'])
+        self.assertIs(n, D.parent)
+        self.assertIs(D.variables['d'], result.objects['n::D::d'])
+
+
+if __name__ == '__main__':
+    main()
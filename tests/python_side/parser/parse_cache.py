@@ -0,0 +1,74 @@
+import os
+import tempfile
+from unittest import TestCase, main
+
+from c2py.core import CxxFileParser
+from c2py.core.cxxparser import CXXParserExtraOptions, CXXParserOptions
+from c2py.core.parse_cache import options_digest
+
+
+class ParseCache(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.dir.name, "cache")
+        self.header = os.path.join(self.dir.name, "test.h")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _write_header(self, src: str):
+        with open(self.header, "wt") as f:
+            f.write(src)
+
+    def _parse(self):
+        extra_options = CXXParserExtraOptions()
+        extra_options.parse_cache_dir = self.cache_dir
+        parser = CxxFileParser(files=[self.header], extra_options=extra_options)
+        return parser.parse()
+
+    def test_cache_hit(self):
+        self._write_header("""
+        #define A 1
+        struct S{ int a; };
+        const int v = 1;
+        """)
+        first = self._parse()
+        self.assertEqual(1, len(os.listdir(self.cache_dir)))
+
+        second = self._parse()
+        self.assertIsNot(first, second)
+        self.assertEqual('1', second.macros['A'].definition)
+        self.assertEqual(1, second.g.variables['v'].value)
+        S = second.g.classes['S']
+        self.assertIn('a', S.variables)
+        self.assertIs(S, second.objects['S'])
+        self.assertIs(S, S.variables['a'].parent)
+
+    def test_cache_invalidated_by_content(self):
+        self._write_header("const int v = 1;")
+        self.assertEqual(1, self._parse().g.variables['v'].value)
+
+        self._write_header("const int v = 2;")
+        self.assertEqual(2, self._parse().g.variables['v'].value)
+
+    def test_digest_of_options(self):
+        def digest(**kwargs):
+            extra_options = CXXParserExtraOptions()
+            for k, v in kwargs.items():
+                setattr(extra_options, k, v)
+            return options_digest(CXXParserOptions(file_path=self.header,
+                                                   extra_options=extra_options))
+
+        base = digest()
+        # options affecting parse result
+        self.assertNotEqual(base, digest(prune_system_headers=True))
+        self.assertNotEqual(base, digest(lazy_template_classes=False))
+        # options not affecting parse result
+        self.assertEqual(base, digest(parse_cache_dir=self.cache_dir))
+        self.assertEqual(base, digest(translation_unit_cache_dir=self.cache_dir))
+        self.assertEqual(base, digest(parse_stats=True))
+
+
+if __name__ == '__main__':
+    main()
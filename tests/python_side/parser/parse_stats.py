@@ -0,0 +1,52 @@
+import json
+import os
+import tempfile
+from unittest import TestCase, main
+
+from c2py.core import CxxFileParser
+from c2py.core.cxxparser import CXXParserExtraOptions
+
+
+class ParseStatsTest(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.header = os.path.join(self.dir.name, "test.h")
+        with open(self.header, "wt") as f:
+            f.write("""
+            #define M 1
+            struct S{ int a; void f(int b); };
+            const int v = 1;
+            """)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _parse(self, parse_stats: bool):
+        extra_options = CXXParserExtraOptions()
+        extra_options.show_progress = False
+        extra_options.parse_stats = parse_stats
+        return CxxFileParser(files=[self.header], extra_options=extra_options).parse()
+
+    def test_disabled(self):
+        self.assertIsNone(self._parse(False).stats)
+
+    def test_stats(self):
+        stats = self._parse(True).stats
+        self.assertEqual(1, stats.kinds['namespace:STRUCT_DECL'].count)
+        self.assertEqual(1, stats.kinds['class:FIELD_DECL'].count)
+        self.assertEqual(1, stats.kinds['class:CXX_METHOD'].count)
+        self.assertEqual(1, stats.kinds['method:CXX_METHOD'].count)
+        self.assertEqual(1, stats.kinds['literal:VAR_DECL'].count)
+        self.assertEqual(1, stats.kinds['macro:MACRO_DEFINITION'].count)
+        self.assertIn(self.header, stats.files)
+
+        struct = stats.kinds['namespace:STRUCT_DECL']
+        self.assertLessEqual(struct.self_time, struct.total_time)
+
+        data = json.loads(stats.to_json())
+        self.assertIn('namespace:STRUCT_DECL', data['kinds'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import PropertyMock, patch
+
+from c2py.clang.cindex import Cursor, CursorKind
+from c2py.core import CxxFileParser
+from c2py.core.cxxparser import CXXParserExtraOptions
+
+
+class QualifiedName(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.header = os.path.join(self.dir.name, "test.h")
+        with open(self.header, "wt") as f:
+            f.write("""
+            namespace a{ namespace b{
+                class S{ public: class Inner{ public: int i; }; };
+                typedef S T;
+            } }
+            typedef a::b::S::Inner X;
+            typedef a::b::T Y;
+            """)
+        extra_options = CXXParserExtraOptions()
+        extra_options.show_progress = False
+        self.parser = CxxFileParser(files=[self.header], extra_options=extra_options)
+        self.result = self.parser.parse()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _cursor(self, *path: str) -> Cursor:
+        c = self.parser.tu.cursor
+        for name in path:
+            c = next(i for i in c.get_children() if i.spelling == name
+                     and i.kind != CursorKind.MACRO_DEFINITION)
+        return c
+
+    def test_names(self):
+        objects = self.result.objects
+        self.assertEqual('a::b::S::Inner', objects['X'].target)
+        self.assertEqual('a::b::S', objects['a::b::T'].target)
+        self.assertEqual('a::b::T', objects['Y'].target)
+
+    def test_memoized(self):
+        inner = self._cursor('a', 'b', 'S', 'Inner')
+        self.assertEqual('a::b::S::Inner', self.parser._qualified_cursor_name(inner))
+        # parents are memoized too
+        self.assertEqual('a::b::S',
+                         self.parser._qualified_names[self._cursor('a', 'b', 'S').hash][1])
+
+        with patch.object(Cursor, 'semantic_parent', new_callable=PropertyMock,
+                          side_effect=AssertionError("not memoized")):
+            self.assertEqual('a::b::S::Inner', self.parser._qualified_cursor_name(inner))
+
+    def test_hash_collision(self):
+        inner = self._cursor('a', 'b', 'S', 'Inner')
+        # another cursor with the same hash is not mistaken for this one
+        self.parser._qualified_names[inner.hash] = (self._cursor('a'), 'a')
+        self.assertEqual('a::b::S::Inner', self.parser._qualified_cursor_name(inner))
+
+    def test_cleared_on_reparse(self):
+        self.assertTrue(self.parser._qualified_names)
+        self.parser._reset()
+        self.assertEqual({}, self.parser._qualified_names)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+import os
+import tempfile
+from unittest import TestCase, main
+
+from c2py.core import CxxFileParser, ParserSession
+from c2py.core.cxxparser import CXXParserExtraOptions
+
+
+class ParserSessionTest(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        for name, src in (("a.h", "struct A{ int a; };"), ("b.h", "struct B{ int b; };")):
+            with open(os.path.join(self.dir.name, name), "wt") as f:
+                f.write(src)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _parser(self, name: str, session: ParserSession):
+        extra_options = CXXParserExtraOptions()
+        extra_options.show_progress = False
+        return CxxFileParser(files=[os.path.join(self.dir.name, name)],
+                             extra_options=extra_options,
+                             session=session)
+
+    def test_shared_session(self):
+        session = ParserSession(parse_cache_dir=os.path.join(self.dir.name, "cache"))
+        a = self._parser("a.h", session)
+        b = self._parser("b.h", session)
+
+        self.assertIn('A', a.parse().g.classes)
+        result = b.parse()
+        self.assertIn('B', result.g.classes)
+        self.assertNotIn('A', result.g.classes)
+
+        self.assertIs(a.tu.index, b.tu.index)
+        self.assertIs(session.input_files[b.options.file_classifier.key], b._input_files)
+        self.assertIs(a._input_files, b._input_files)
+        self.assertEqual(2, len(os.listdir(os.path.join(self.dir.name, "cache"))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import os
+import tempfile
+from unittest import TestCase, main
+
+from c2py.core import CxxFileParser
+from c2py.core.cxxparser import Arch, CXXParserExtraOptions, CxxTarget, class_layout_differences, \
+    parse_targets
+from c2py.generator.cxxgenerator.cxxgenerator import check_target_conditions, \
+    target_dispatch_config, target_layout_checks
+
+
+class TargetsTest(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.header = os.path.join(self.dir.name, "test.h")
+        with open(self.header, "wt") as f:
+            f.write("""
+            struct Same{ int a; };
+            struct WithPointer{ int a; void *p; };
+            struct Conditional{
+                int a;
+            #ifdef EXTRA
+                int extra;
+            #endif
+            };
+            namespace n{ struct Outer{ struct Inner{ void *p; } inner; }; }
+            """)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_from_spec(self):
+        t = CxxTarget.from_spec("win64:x64:x86_64-pc-windows-msvc:_WIN32,A=1")
+        self.assertEqual("win64", t.name)
+        self.assertEqual(Arch.X64, t.arch)
+        self.assertEqual(['--target=x86_64-pc-windows-msvc'], t.args)
+        self.assertEqual(['_WIN32', 'A=1'], t.definitions)
+
+        t = CxxTarget.from_spec("linux32:x86")
+        self.assertEqual(Arch.X86, t.arch)
+        self.assertEqual([], t.args)
+
+        with self.assertRaises(ValueError):
+            CxxTarget.from_spec("linux32")
+        with self.assertRaises(ValueError):
+            CxxTarget.from_spec("linux32:arm")
+
+    def test_dispatch_config(self):
+        targets = [
+            CxxTarget(name="x86", arch=Arch.X86),
+            CxxTarget(name="win64", arch=Arch.X64, triple="x86_64-pc-windows-msvc"),
+        ]
+        self.assertEqual(
+            '#pragma once\n'
+            '// layouts of these types differ among targets,\n'
+            '// their sizes are asserted by layout_checks.h of each target:\n'
+            '// A : x86, win64\n'
+            '#if (defined(_M_IX86) || defined(__i386__))\n'
+            '#include "x86/target_config.h"\n'
+            '#elif defined(_WIN32) && (defined(_M_X64) || defined(__x86_64__))\n'
+            '#include "win64/target_config.h"\n'
+            '#else\n'
+            '#error "none of targets(x86, win64) matches current platform"\n'
+            '#endif',
+            target_dispatch_config(targets, {'A': ['x86', 'win64']}).rstrip('\n'),
+        )
+        check_target_conditions(targets)
+
+        # without triples, only arch is tested: the second #elif can't be reached
+        with self.assertRaises(ValueError):
+            check_target_conditions([CxxTarget(name="a", arch=Arch.X64),
+                                     CxxTarget(name="b", arch=Arch.X64)])
+
+    def _parser(self, target: CxxTarget):
+        extra_options = CXXParserExtraOptions()
+        extra_options.show_progress = False
+        extra_options.arch = target.arch
+        return CxxFileParser(files=[self.header],
+                             args=target.args,
+                             definitions=target.definitions,
+                             extra_options=extra_options)
+
+    def test_layout_differences(self):
+        targets = [
+            CxxTarget(name="x86", arch=Arch.X86),
+            CxxTarget(name="x64", arch=Arch.X64, definitions=["EXTRA"]),
+        ]
+        results = parse_targets([self._parser(t) for t in targets], jobs=2)
+        x86, x64 = results
+        self.assertEqual(8, x86.g.classes['WithPointer'].size)
+        self.assertEqual(16, x64.g.classes['WithPointer'].size)
+
+        differences = class_layout_differences({'x86': x86, 'x64': x64})
+        self.assertNotIn('Same', differences)
+        self.assertIn('WithPointer', differences)
+        self.assertIn('Conditional', differences)
+        self.assertIn('n::Outer', differences)
+        self.assertIn('n::Outer::Inner', differences)
+
+        checks = target_layout_checks(targets[1], x64, differences.keys())
+        self.assertIn('static_assert(sizeof(::WithPointer) == 16, '
+                      '"layout of WithPointer differs from target x64");', checks)
+        self.assertIn('static_assert(sizeof(::Conditional) == 8, ', checks)
+        self.assertIn('static_assert(sizeof(::n::Outer) == 8, ', checks)
+        self.assertNotIn('Same', checks)
+        self.assertNotIn('Inner', checks)  # nested classes are not checked
+
+        checks = target_layout_checks(targets[0], x86, differences.keys())
+        self.assertIn('static_assert(sizeof(::WithPointer) == 8, ', checks)
+        self.assertIn('static_assert(sizeof(::Conditional) == 4, ', checks)
+
+
+if __name__ == '__main__':
+    main()
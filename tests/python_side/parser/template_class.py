@@ -0,0 +1,86 @@
+import os
+import tempfile
+from unittest import TestCase, main
+
+from c2py.core import CxxFileParser
+from c2py.core.core_types.parser_types import TemplateClass
+from c2py.core.cxxparser import CXXParserExtraOptions
+
+
+class LazyTemplateClass(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.header = os.path.join(self.dir.name, "test.h")
+        with open(self.header, "wt") as f:
+            f.write("""
+            namespace n{
+                template <class T> struct Unused{ T a; };
+                template <class T> struct ByTypedef{ T b; };
+                template <class T> struct ByField{ T c; };
+                template <class T> struct ByAlias{ T d; };
+                template <class T> struct ByArgument{ T e; };
+                typedef ByTypedef<int> IntTypedef;
+                template <class T> using Alias = ByAlias<T>;
+                // forward declared before its definition
+                template <class T> struct Declared;
+                template <class T> struct Declared{ T g; };
+                typedef Declared<int> IntDeclared;
+                // referenced before its definition
+                template <class T> struct UsedFirst;
+                typedef UsedFirst<int> IntUsedFirst;
+                template <class T> struct UsedFirst{ T h; };
+            }
+            namespace m{
+                // same name as n::ByField, but not referenced
+                template <class T> struct ByField{ T x; };
+            }
+            struct S{ n::ByField<n::ByArgument<int>> f; };
+            """)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _parse(self, lazy: bool):
+        extra_options = CXXParserExtraOptions()
+        extra_options.show_progress = False
+        extra_options.lazy_template_classes = lazy
+        return CxxFileParser(files=[self.header], extra_options=extra_options).parse()
+
+    def test_lazy(self):
+        result = self._parse(True)
+        n = result.g.namespaces['n']
+        for name in ('Unused', 'ByTypedef', 'ByField', 'ByAlias', 'ByArgument'):
+            self.assertIsInstance(n.template_classes[name], TemplateClass)
+            self.assertIs(n.template_classes[name], result.objects[f'n::{name}'])
+        self.assertEqual(0, len(n.template_classes['Unused'].variables))
+        self.assertIn('b', n.template_classes['ByTypedef'].variables)
+        self.assertIn('c', n.template_classes['ByField'].variables)
+        self.assertIn('d', n.template_classes['ByAlias'].variables)
+        self.assertIn('e', n.template_classes['ByArgument'].variables)
+        m = result.g.namespaces['m']
+        self.assertEqual(0, len(m.template_classes['ByField'].variables))
+
+    def test_lazy_forward_declared(self):
+        result = self._parse(True)
+        n = result.g.namespaces['n']
+        for name, variable in (('Declared', 'g'), ('UsedFirst', 'h')):
+            with self.subTest(name=name):
+                class_ = n.template_classes[name]
+                self.assertIs(class_, result.objects[f'n::{name}'])
+                self.assertEqual([variable], list(class_.variables))
+                # location of the definition
+                self.assertIn(f'{name}{{', self._line(class_.location.start_line))
+
+    def _line(self, line: int):
+        with open(self.header, "rt") as f:
+            return f.read().splitlines()[line - 1]
+
+    def test_not_lazy(self):
+        result = self._parse(False)
+        n = result.g.namespaces['n']
+        self.assertIn('a', n.template_classes['Unused'].variables)
+
+
+if __name__ == '__main__':
+    main()
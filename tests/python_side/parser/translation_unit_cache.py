@@ -0,0 +1,83 @@
+import os
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from c2py.core import CxxFileParser
+from c2py.core.cxxparser import CXXParserExtraOptions
+from c2py.core.parse_cache import TranslationUnitCache
+
+
+class TranslationUnitCacheReuse(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.dir.name, "cache")
+        self.header = os.path.join(self.dir.name, "test.h")
+        self.included = os.path.join(self.dir.name, "included.h")
+        self._write(self.header, '#include "included.h"\n#define A 1\nstruct S{ I i; };\n')
+        self._write(self.included, 'struct I{ int a; };\n')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    @staticmethod
+    def _write(path: str, content: str):
+        with open(path, "wt") as f:
+            f.write(content)
+
+    def _parse(self):
+        """
+        :return: parse result, and whether translation unit is loaded from cache
+        """
+        extra_options = CXXParserExtraOptions()
+        extra_options.show_progress = False
+        extra_options.translation_unit_cache_dir = self.cache_dir
+        parser = CxxFileParser(files=[self.header], extra_options=extra_options)
+        loaded = []
+        load = TranslationUnitCache.load
+
+        def spy(cache, options, index):
+            tu = load(cache, options, index)
+            loaded.append(tu is not None)
+            return tu
+
+        with patch.object(TranslationUnitCache, 'load', spy):
+            result = parser.parse()
+        self.assertEqual(1, len(loaded))
+        return result, loaded[0]
+
+    def test_reused(self):
+        result, loaded = self._parse()
+        self.assertFalse(loaded)
+        self.assertEqual(['.ast', '.json'],
+                         sorted(os.path.splitext(i)[1] for i in os.listdir(self.cache_dir)))
+
+        result, loaded = self._parse()
+        self.assertTrue(loaded)
+        self.assertIn('i', result.g.classes['S'].variables)
+        self.assertIn('a', result.g.classes['I'].variables)
+        self.assertEqual('1', result.macros['A'].definition)
+
+    def test_touched_without_changes(self):
+        self._parse()
+        mtime = os.stat(self.included).st_mtime_ns
+        os.utime(self.included, ns=(mtime + 10 ** 9, mtime + 10 ** 9))
+        # libclang can't load an AST file whose input files are touched
+        result, loaded = self._parse()
+        self.assertFalse(loaded)
+        self.assertIn('a', result.g.classes['I'].variables)
+        # and the entry is replaced
+        _, loaded = self._parse()
+        self.assertTrue(loaded)
+
+    def test_included_file_changed(self):
+        self._parse()
+        self._write(self.included, 'struct I{ int a; int b; };\n')
+        result, loaded = self._parse()
+        self.assertFalse(loaded)
+        self.assertIn('b', result.g.classes['I'].variables)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,7 @@ from unittest import TestCase, main
 
 from c2py.core import CXXParser
 from c2py.core.core_types.parser_types import AnonymousUnion
-from c2py.core.cxxparser import CXXParserExtraOptions, Arch
+from c2py.core.cxxparser import CXXParserExtraOptions, CXXParserOptions, Arch
 
 
 class ConstantType(TestCase):
@@ -143,5 +143,35 @@ class ConstantType(TestCase):
         self.assertEqual(a, result.objects['C::a'])
 
 
+class UnionBenchmark(TestCase):
+    count = 500
+
+    def test_many_unions(self):
+        fields = "\n".join(
+            f"union {{ int a{i}; float b{i}; }} s{i};\n"
+            f"union {{ int c{i}; }};"
+            for i in range(self.count)
+        )
+        src = f"struct C{{ {fields} }};"
+        extra_options = CXXParserExtraOptions()
+        extra_options.show_progress = False
+        parser = CXXParser(CXXParserOptions(
+            file_path="./test.cpp",
+            unsaved_files=[("./test.cpp", src)],
+            extra_options=extra_options,
+        ))
+
+        result = parser.parse()
+
+        C = result.g.classes['C']
+        self.assertEqual(self.count, len(C.classes))  # scoped anonymous unions
+        self.assertEqual(self.count * 2, len(C.variables))  # s{i} and c{i}
+        self.assertIn('a0', C.classes['decltype(s0)'].variables)
+        self.assertIn(f'c{self.count - 1}', C.variables)
+
+        # fields of C are scanned only once for all of its unions
+        self.assertEqual(1, len(parser._class_fields))
+
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
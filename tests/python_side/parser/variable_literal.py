@@ -0,0 +1,45 @@
+import os
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from c2py.core import CxxFileParser
+from c2py.core.cxxparser import CXXParserExtraOptions
+
+
+class VariableLiteral(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.header = os.path.join(self.dir.name, "test.h")
+        with open(self.header, "wt") as f:
+            f.write("""
+            const int c = 1;
+            constexpr double d = 2.0;
+            int g = 3;
+            struct S{ int field = 4; };
+            """)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_only_constants_tokenized(self):
+        extra_options = CXXParserExtraOptions()
+        extra_options.show_progress = False
+        parser = CxxFileParser(files=[self.header], extra_options=extra_options)
+        with patch.object(parser, '_parse_literal_cursor',
+                          wraps=parser._parse_literal_cursor) as parse_literal:
+            result = parser.parse()
+        tokenized = {call.args[0].spelling for call in parse_literal.call_args_list}
+        self.assertEqual({'c', 'd'}, tokenized)
+
+        g = result.g
+        self.assertEqual(1, g.variables['c'].value)
+        self.assertEqual(2.0, g.variables['d'].value)
+        self.assertIsNone(g.classes['S'].variables['field'].value)
+        self.assertIsNone(g.variables['g'].value)
+        self.assertIsNone(g.variables['g'].literal)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import os
+import tempfile
+from typing import Optional
+from unittest import TestCase, main
+
+from c2py.core import CxxFileParser
+from c2py.core.core_types.generator_types import CallingType, GeneratorMethod
+from c2py.core.cxxparser import Arch, CXXParserExtraOptions
+from c2py.core.preprocessor import CallbackCallingPolicy, PreProcessor, PreProcessorOptions
+
+
+class AsyncUpToArguments(CallbackCallingPolicy):
+    """
+    callbacks with at most one argument are async, others are sync.
+    """
+
+    def calling_type(self, m: GeneratorMethod, copy_bytes: Optional[int]) -> CallingType:
+        return CallingType.Async if len(m.args) <= 1 else CallingType.Sync
+
+
+class CallbackCallingTypes(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.header = os.path.join(self.dir.name, "test.h")
+        with open(self.header, "wt") as f:
+            f.write("""
+            struct Small{ int a; };
+            struct Big{ char data[1024]; };
+            struct Incomplete;
+            class Poly{ public: virtual ~Poly(); };
+            enum E{ e1 };
+            class Spi{
+            public:
+                virtual void OnSmall(Small *s, int n);
+                virtual void OnBig(Big *b);
+                virtual void OnIncomplete(Incomplete *p);
+                virtual void OnLongs(long *a, long *b);
+                virtual void OnString(const char *s, double d);
+                virtual void OnEnum(E e);
+                virtual void OnPoly(Poly *p);
+                void NotCallback(Big *b);
+            };
+            """)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _process(self, policy: CallbackCallingPolicy = None, arch: Arch = Arch.X64,
+                 args=None):
+        extra_options = CXXParserExtraOptions()
+        extra_options.show_progress = False
+        extra_options.arch = arch
+        parse_result = CxxFileParser(files=[self.header], extra_options=extra_options,
+                                     args=args).parse()
+        options = PreProcessorOptions(parse_result)
+        options.callback_calling_policy = policy
+        return PreProcessor(options).process()
+
+    @staticmethod
+    def _copy_bytes(result):
+        return {m.name: n for m, n in result.callback_copy_bytes}
+
+    @staticmethod
+    def _calling_types(result):
+        return {name: ms[0].calling_type for name, ms in result.objects['Spi'].functions.items()}
+
+    def test_copy_bytes(self):
+        result = self._process(CallbackCallingPolicy())
+        self.assertEqual({
+            'OnSmall': 8,
+            'OnBig': 1024,
+            'OnIncomplete': None,
+            'OnLongs': 16,
+            'OnString': 16,  # string is counted as a pointer
+            'OnEnum': 4,
+            'OnPoly': 8,
+        }, self._copy_bytes(result))
+        # no limit by default
+        self.assertEqual({CallingType.Default}, {
+            t for name, t in self._calling_types(result).items() if name != 'OnPoly'})
+
+    def test_sizes_of_target(self):
+        self.assertEqual(8, self._copy_bytes(self._process(
+            CallbackCallingPolicy(), arch=Arch.X86))['OnLongs'])
+        self.assertEqual(8, self._copy_bytes(self._process(
+            CallbackCallingPolicy(), args=['--target=x86_64-pc-windows-msvc']))['OnLongs'])
+        self.assertEqual(12, self._copy_bytes(self._process(
+            CallbackCallingPolicy(), arch=Arch.X86))['OnString'])
+
+    def test_max_async_copy_bytes(self):
+        policy = CallbackCallingPolicy(max_async_copy_bytes=10)
+        self.assertEqual({
+            'OnSmall': CallingType.Default,
+            'OnBig': CallingType.Sync,
+            'OnIncomplete': CallingType.Default,
+            'OnLongs': CallingType.Sync,
+            'OnString': CallingType.Sync,
+            'OnEnum': CallingType.Default,
+            'OnPoly': CallingType.Sync,  # polymorphic argument can't be copied
+            'NotCallback': CallingType.Default,
+        }, self._calling_types(self._process(policy)))
+
+        calling_types = self._calling_types(self._process(policy, arch=Arch.X86))
+        self.assertEqual(CallingType.Default, calling_types['OnLongs'])
+        self.assertEqual(CallingType.Sync, calling_types['OnString'])
+
+    def test_unknown_copy_bytes(self):
+        policy = CallbackCallingPolicy(unknown_copy_bytes=CallingType.Sync)
+        calling_types = self._calling_types(self._process(policy))
+        self.assertEqual(CallingType.Sync, calling_types['OnIncomplete'])
+        self.assertEqual(CallingType.Default, calling_types['OnBig'])
+
+    def test_custom_policy(self):
+        calling_types = self._calling_types(self._process(AsyncUpToArguments()))
+        self.assertEqual(CallingType.Async, calling_types['OnBig'])
+        self.assertEqual(CallingType.Sync, calling_types['OnSmall'])
+        # only callbacks using the default calling type are decided by policy
+        self.assertEqual(CallingType.Sync, calling_types['OnPoly'])
+        self.assertEqual(CallingType.Default, calling_types['NotCallback'])
+
+    def test_without_policy(self):
+        result = self._process()
+        self.assertEqual([], result.callback_copy_bytes)
+        self.assertEqual(CallingType.Default, self._calling_types(result)['OnBig'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+from unittest import TestCase, main
+
+from c2py.core.core_types.cxx_types import is_array_type, is_c_array_type, is_const_type, \
+    is_function_pointer_type, is_function_type, is_pointer_type, is_reference_type, \
+    is_std_vector, parse_type, remove_cvref
+from c2py.type_manager import is_integer_type, is_string_array_type, is_string_type
+
+SPELLINGS = [
+    'int', 'const int', 'const int &', 'volatile int', 'int *', 'const int *', 'int * const',
+    'const int * const', 'int **', 'char *', 'const char *', 'char [16]', 'const char []',
+    'int [4]', 'std::vector<int>', 'const std::vector<int> &', 'std::map<int, std::string>',
+    'int (*)(int, void *)', 'void (__cdecl*cb)(const char *, int)', 'int (int, double)',
+    'S', 'const S &', 'S *', 'std::string',
+]
+
+
+class ParseType(TestCase):
+
+    def test_interned(self):
+        for s in SPELLINGS:
+            self.assertIs(parse_type(s), parse_type(s))
+        # parts are interned too, so shared among types containing them
+        self.assertIs(parse_type('int'), parse_type('const int * const').pointee)
+        self.assertIs(parse_type('int'), parse_type('const int &').unqualified)
+        self.assertIs(parse_type('int'), parse_type('std::vector<int>').element)
+        self.assertIs(parse_type('int'), parse_type('int [4]').element)
+        self.assertIs(parse_type('void *'), parse_type('int (*)(int, void *)').arg_types[1])
+
+    def test_parts_parsed_once(self):
+        t = parse_type('const std::vector<int> &')
+        self.assertNotIn('template_args', t.__dict__)
+        args = t.template_args
+        self.assertIs(args, t.__dict__['template_args'])
+        self.assertIs(args, t.template_args)
+
+    def test_flags_same_as_string_functions(self):
+        for s in SPELLINGS:
+            with self.subTest(s):
+                t = parse_type(s)
+                self.assertEqual(s, t.spelling)
+                self.assertEqual(is_const_type(s), t.is_const)
+                self.assertEqual(is_reference_type(s), t.is_reference)
+                self.assertEqual(is_pointer_type(s), t.is_pointer)
+                self.assertEqual(is_array_type(s), t.is_array)
+                self.assertEqual(is_c_array_type(s), t.is_c_array)
+                self.assertEqual(is_std_vector(s), t.is_std_vector)
+                self.assertEqual(bool(is_function_pointer_type(s)), t.is_function_pointer)
+                self.assertEqual(bool(is_function_type(s)), t.is_function)
+
+    def test_parts(self):
+        # like remove_cvref(), leading const is removed even if it qualifies the pointee
+        cases = [
+            # spelling, unqualified, pointee, element, extent
+            ('const int &', 'int', None, None, 0),
+            ('volatile int', 'int', None, None, 0),
+            ('int * const', 'int *', 'int', None, 0),
+            ('const int * const', 'int *', 'int', None, 0),
+            ('const char *', 'char *', 'char', None, 0),
+            ('int **', 'int **', 'int *', None, 0),
+            ('int [4]', 'int [4]', None, 'int', 4),
+            ('const char []', 'char []', None, 'char', 0),
+            ('const std::vector<int> &', 'std::vector<int>', None, 'int', 0),
+        ]
+        for spelling, unqualified, pointee, element, extent in cases:
+            with self.subTest(spelling):
+                t = parse_type(spelling)
+                self.assertEqual(unqualified, t.unqualified.spelling)
+                self.assertEqual(remove_cvref(spelling), t.unqualified.spelling)
+                self.assertEqual(pointee, t.pointee and t.pointee.spelling)
+                self.assertEqual(element, t.element and t.element.spelling)
+                self.assertEqual(extent, t.extent)
+
+    def test_function(self):
+        t = parse_type('void (__cdecl*cb)(const char *, int)')
+        self.assertEqual('void', t.ret_type.spelling)
+        self.assertEqual(['const char *', 'int'], [a.spelling for a in t.arg_types])
+        self.assertEqual('__cdecl', t.function.calling_convention)
+        self.assertEqual(['int', 'double'],
+                         [a.spelling for a in parse_type('int (int, double)').arg_types])
+        self.assertIsNone(parse_type('int').ret_type)
+        self.assertEqual((), parse_type('int').arg_types)
+
+    def test_template(self):
+        t = parse_type('const std::map<std::string, std::vector<std::pair<int, int>>> &')
+        self.assertEqual('std::map', t.template_name)
+        self.assertEqual(['std::string', 'std::vector<std::pair<int, int>>'],
+                         [a.spelling for a in t.template_args])
+        self.assertEqual('std::pair', t.template_args[1].template_args[0].template_name)
+        self.assertEqual('', parse_type('int').template_name)
+        self.assertEqual((), parse_type('int').template_args)
+
+
+class QualifierHelpers(TestCase):
+
+    def test_is_integer_type(self):
+        for t in ('int', 'const int', 'const int &', 'volatile unsigned long long',
+                  'unsigned char'):
+            with self.subTest(t):
+                self.assertTrue(is_integer_type(t))
+        # char is converted into str
+        for t in ('char', 'int *', 'double', 'const double &', 'S', 'int [4]'):
+            with self.subTest(t):
+                self.assertFalse(is_integer_type(t))
+
+    def test_is_string_type(self):
+        for t in ('char *', 'const char *', 'const char * const', 'char [16]', 'const char []'):
+            with self.subTest(t):
+                self.assertTrue(is_string_type(t))
+        for t in ('char', 'int *', 'char **', 'const char **'):
+            with self.subTest(t):
+                self.assertFalse(is_string_type(t))
+
+    def test_is_string_array_type(self):
+        for t in ('char **', 'const char **', 'char *[4]', 'const char * const *'):
+            with self.subTest(t):
+                self.assertTrue(is_string_array_type(t))
+        for t in ('char *', 'int **', 'char [16]'):
+            with self.subTest(t):
+                self.assertFalse(is_string_array_type(t))
+
+
+if __name__ == '__main__':
+    main()
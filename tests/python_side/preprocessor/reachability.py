@@ -0,0 +1,98 @@
+import os
+import re
+import tempfile
+from unittest import TestCase, main
+
+from c2py.core import CxxFileParser
+from c2py.core.cxxparser import CXXParserExtraOptions
+from c2py.core.preprocessor import PreProcessor, PreProcessorOptions
+from c2py.core.reachability import ReachabilityPruner
+
+
+class Reachability(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.header = os.path.join(self.dir.name, "test.h")
+        with open(self.header, "wt") as f:
+            f.write("""
+            struct Base{ int b; };
+            struct FieldType{ int f; };
+            struct Derived : Base{ FieldType field; };
+            typedef Derived DerivedAlias;
+            struct Arg{ int a; };
+            struct Ret{ int r; };
+            Ret *api(const Arg &a, DerivedAlias *d);
+
+            struct Unused{ int u; };
+            void unused_f(Unused u);
+
+            namespace n{
+                struct Inner{ int i; };
+                struct Other{ int o; };
+                typedef Inner InnerAlias;
+                void api(InnerAlias *i);
+                struct Arg{ int na; };
+                void global_arg(::Arg *a);
+            }
+            """)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _process(self, roots: str):
+        extra_options = CXXParserExtraOptions()
+        extra_options.show_progress = False
+        parse_result = CxxFileParser(files=[self.header], extra_options=extra_options).parse()
+        options = PreProcessorOptions(parse_result)
+        options.roots = re.compile(roots)
+        return PreProcessor(options).process()
+
+    def _generated(self, result, names):
+        return {name for name in names if result.objects[name].generate}
+
+    def test_through_signatures_typedefs_bases_and_fields(self):
+        result = self._process(r'api$')
+        names = ['api', 'Ret', 'Arg', 'DerivedAlias', 'Derived', 'Base', 'FieldType',
+                 'Unused', 'unused_f', 'n', 'n::api', 'n::Inner', 'n::InnerAlias', 'n::Other']
+        self.assertEqual({'api', 'Ret', 'Arg', 'DerivedAlias', 'Derived', 'Base', 'FieldType'},
+                         self._generated(result, names))
+        pruned = {s.full_name for s in result.pruned_symbols}
+        self.assertIn('Unused', pruned)
+        self.assertIn('n::Other', pruned)
+        self.assertNotIn('Base', pruned)
+
+    def test_lookup_in_scope(self):
+        result = self._process(r'n::api$')
+        names = ['api', 'Derived', 'n', 'n::api', 'n::Inner', 'n::InnerAlias', 'n::Other']
+        # a namespace which isn't a root is kept as a scope, without its other members
+        self.assertEqual({'n', 'n::api', 'n::Inner', 'n::InnerAlias'},
+                         self._generated(result, names))
+
+    def test_namespace_root(self):
+        result = self._process(r'n$')
+        names = ['api', 'n', 'n::api', 'n::Inner', 'n::InnerAlias', 'n::Other']
+        self.assertEqual({'n', 'n::api', 'n::Inner', 'n::InnerAlias', 'n::Other'},
+                         self._generated(result, names))
+
+    def test_lookup_global(self):
+        result = self._process(r'n::global_arg$')
+        # ::Arg refers to the global one, not n::Arg
+        self.assertEqual({'n', 'n::global_arg', 'Arg'},
+                         self._generated(result, ['n', 'n::global_arg', 'Arg', 'n::Arg']))
+
+        # objects isn't always an ObjectManager, which strips the leading :: itself
+        objects = dict(result.objects)
+        reachable = ReachabilityPruner(result.g, objects).reachable([objects['n::global_arg']])
+        self.assertIn(id(objects['Arg']), reachable)
+        self.assertNotIn(id(objects['n::Arg']), reachable)
+
+    def test_class_members(self):
+        result = self._process(r'Derived::field$')
+        # parent class of a reachable member is generated with all its members
+        self.assertEqual({'Derived', 'FieldType', 'Base'},
+                         self._generated(result, ['Derived', 'FieldType', 'Base', 'Arg']))
+
+
+if __name__ == '__main__':
+    main()
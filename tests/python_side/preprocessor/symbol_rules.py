@@ -0,0 +1,194 @@
+import json
+import os
+import tempfile
+from unittest import TestCase, main
+
+from c2py.core import CxxFileParser
+from c2py.core.core_types.generator_types import CallingType
+from c2py.core.cxxparser import CXXParserExtraOptions
+from c2py.core.preprocessor import PreProcessor, PreProcessorOptions
+from c2py.core.symbol_rules import SymbolRule, SymbolRules
+
+
+class SymbolRulesPrecedence(TestCase):
+
+    def test_boolean_actions_apply_if_any_rule_matches(self):
+        rules = SymbolRules([
+            SymbolRule(pattern='a::.*', ignore=True),
+            SymbolRule(pattern='b::x', ignore=True),
+            SymbolRule(pattern='c::.*', no_caster=True),
+        ])
+        ignore = rules.pattern('ignore')
+        self.assertTrue(ignore.match('a::y'))
+        self.assertTrue(ignore.match('b::x'))
+        self.assertFalse(ignore.match('b::y'))
+        self.assertFalse(ignore.match('c::y'))
+        self.assertIsNone(rules.pattern('no_callback'))
+
+    def test_first_match_wins(self):
+        rules = SymbolRules([
+            SymbolRule(pattern='Api::OnSpecial', callback='async', gil='keep'),
+            SymbolRule(pattern='Api::On.*', callback='sync'),
+            SymbolRule(pattern='Api::.*', callback='default', gil='release'),
+        ])
+        callback = rules._compile()['callback']
+        self.assertEqual(CallingType.Async, callback.match('Api::OnSpecial'))
+        self.assertEqual(CallingType.Sync, callback.match('Api::OnOther'))
+        self.assertEqual(CallingType.Default, callback.match('Api::Query'))
+        self.assertIsNone(callback.match('Other::OnSpecial'))
+        gil = rules._compile()['gil']
+        self.assertIs(False, gil.match('Api::OnSpecial'))
+        self.assertIs(True, gil.match('Api::OnOther'))
+
+    def test_added_rules_recompiled(self):
+        rules = SymbolRules()
+        rules.add_pattern('', 'ignore')
+        self.assertEqual(0, len(rules))
+        self.assertIsNone(rules.pattern('ignore'))
+        rules.add_pattern('x', 'ignore')
+        self.assertTrue(rules.pattern('ignore').match('x'))
+
+    def test_invalid_values(self):
+        with self.assertRaises(ValueError):
+            SymbolRule(pattern='x', callback='never')
+        with self.assertRaises(ValueError):
+            SymbolRule(pattern='x', gil='maybe')
+        with self.assertRaisesRegex(ValueError, r'invalid pattern a\('):
+            SymbolRule(pattern='a(', ignore=True)
+
+    def test_patterns_not_combinable(self):
+        # each of these patterns works on its own, but not when joined into one regex
+        rules = SymbolRules([
+            SymbolRule(pattern='(?i)api::.*', ignore=True, callback='sync'),
+            SymbolRule(pattern='(?P<n>x)::(?P=n)', ignore=True, callback='async'),
+            SymbolRule(pattern='(?P<n>y)::(?P=n)', ignore=True),
+            SymbolRule(pattern=r'(a)(b)::\2\1', ignore=True, callback='default'),
+            SymbolRule(pattern=r'(c)::\1', ignore=True),
+        ])
+        ignore = rules.pattern('ignore')
+        self.assertIsNone(ignore.regex)
+        for name in ('Api::f', 'API::f', 'x::x', 'y::y', 'ab::ba', 'c::c'):
+            self.assertTrue(ignore.match(name), name)
+        for name in ('x::y', 'y::x', 'ab::ab', 'c::a', 'other'):
+            self.assertFalse(ignore.match(name), name)
+
+        callback = rules._compile()['callback']
+        self.assertIsNone(callback.regex)
+        self.assertEqual(CallingType.Sync, callback.match('API::f'))
+        self.assertEqual(CallingType.Async, callback.match('x::x'))
+        self.assertEqual(CallingType.Default, callback.match('ab::ba'))
+        self.assertIsNone(callback.match('c::c'))
+
+    def test_patterns_combined(self):
+        rules = SymbolRules([SymbolRule(pattern='a::.*', ignore=True),
+                             SymbolRule(pattern='b|c', ignore=True)])
+        ignore = rules.pattern('ignore')
+        self.assertIsNotNone(ignore.regex)
+        self.assertTrue(ignore.match('c'))
+        self.assertFalse(ignore.match('d'))
+
+
+class SymbolRulesFiles(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _write(self, name: str, content: str):
+        path = os.path.join(self.dir.name, name)
+        with open(path, "wt") as f:
+            f.write(content)
+        return path
+
+    def test_load(self):
+        rules = SymbolRules()
+        rules.load(self._write("rules.json", json.dumps({'rules': [
+            {'pattern': 'Api::.*Callback$', 'callback': 'sync'},
+        ]})))
+        rules.load(self._write("rules.toml", """
+        [[rules]]
+        pattern = "Api::internal_.*"
+        ignore = true
+        """))
+        self.assertEqual(2, len(rules))
+        self.assertTrue(rules.pattern('ignore').match('Api::internal_f'))
+        self.assertEqual(CallingType.Sync, rules._compile()['callback'].match('Api::OnCallback'))
+
+    def test_unknown_key(self):
+        path = self._write("rules.json", json.dumps({'rules': [{'pattern': 'x', 'ignored': True}]}))
+        with self.assertRaises(ValueError):
+            SymbolRules().load(path)
+
+    def test_unsupported_file(self):
+        with self.assertRaises(ValueError):
+            SymbolRules().load(self._write("rules.ini", ""))
+
+
+class SymbolRulesApply(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.header = os.path.join(self.dir.name, "test.h")
+        with open(self.header, "wt") as f:
+            f.write("""
+            struct Data{ int a; };
+            typedef Data DataAlias;
+            class Api{
+            public:
+                virtual void OnData(Data *d);
+                virtual void OnSpecial(Data *d);
+                virtual void OnIgnored(Data *d);
+                virtual void OnFinal(Data *d);
+                int Query(int &n);
+            };
+            void internal_f(int &n);
+            """)
+        extra_options = CXXParserExtraOptions()
+        extra_options.show_progress = False
+        parse_result = CxxFileParser(files=[self.header], extra_options=extra_options).parse()
+        self.result = PreProcessor(PreProcessorOptions(parse_result)).process()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_apply(self):
+        rules = SymbolRules([
+            SymbolRule(pattern='Api::OnSpecial', callback='async'),
+            SymbolRule(pattern='Api::On.*', callback='sync', gil='keep'),
+            # patterns match prefixes: arguments of a function match the pattern of it
+            SymbolRule(pattern='(?:Api::OnIgnored|internal_f)$', ignore=True),
+            SymbolRule(pattern='Api::OnFinal', no_callback=True),
+            SymbolRule(pattern='Api::Query', no_transform=True),
+            SymbolRule(pattern='Data', no_caster=True),
+            SymbolRule(pattern='DataAlias', no_caster=True),
+        ])
+        objects = self.result.objects
+        api = objects['Api']
+        query = api.functions['Query'][0]
+        self.assertTrue(query.wrappers)
+
+        ignored = rules.apply(objects)
+        self.assertEqual({'Api::OnIgnored', 'internal_f'}, {s.full_name for s in ignored})
+        self.assertFalse(api.functions['OnIgnored'][0].generate)
+        self.assertFalse(objects['internal_f'].generate)
+
+        self.assertEqual(CallingType.Sync, api.functions['OnData'][0].calling_type)
+        self.assertEqual(CallingType.Async, api.functions['OnSpecial'][0].calling_type)
+        self.assertFalse(api.functions['OnData'][0].release_gil)
+        # first rule setting gil is the one matched, even if it's not the first rule matched
+        self.assertFalse(api.functions['OnSpecial'][0].release_gil)
+        self.assertTrue(query.release_gil)
+        self.assertTrue(api.functions['OnFinal'][0].is_final)
+        self.assertFalse(api.functions['OnData'][0].is_final)
+        self.assertEqual([], query.wrappers)
+        self.assertEqual('int', query.resolve_wrappers().ret_type)
+
+        self.assertFalse(objects['Data'].generate_caster)
+        self.assertTrue(objects['Data'].generate)
+        self.assertFalse(objects['DataAlias'].generate)
+
+
+if __name__ == '__main__':
+    main()
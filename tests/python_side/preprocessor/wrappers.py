@@ -0,0 +1,159 @@
+import os
+import tempfile
+from typing import List
+from unittest import TestCase, main
+
+from c2py.core import CxxFileParser
+from c2py.core.cxxparser import CXXParserExtraOptions
+from c2py.core.preprocessor import PreProcessor, PreProcessorOptions
+from c2py.core.wrappers import ArgumentCategory, BaseFunctionWrapper, CFunctionCallbackWrapper, \
+    InoutArgumentWrapper, StringArrayWrapper, WrapperInfo
+
+C = ArgumentCategory
+
+# argument type -> expected categories
+CATEGORIES = {
+    'int': C.NONE,
+    'double': C.NONE,
+    'S': C.NONE,
+    'S *': C.NONE,
+    'S &': C.NON_CONST_REFERENCE,
+    'const S &': C.NONE,
+    'int &': C.NON_CONST_REFERENCE,
+    'const int &': C.NONE,
+    'int_t &': C.NON_CONST_REFERENCE,
+    'int *': C.POINTER_TO_INTEGER_OR_STRING,
+    'const int *': C.POINTER_TO_INTEGER_OR_STRING,
+    'int_t *': C.POINTER_TO_INTEGER_OR_STRING,
+    'unsigned long long *': C.POINTER_TO_INTEGER_OR_STRING,
+    'double *': C.NONE,
+    'char *': C.NONE,
+    'const char *': C.NONE,
+    'string_t': C.NONE,
+    'char **': C.STRING_ARRAY | C.POINTER_TO_INTEGER_OR_STRING,
+    'const char **': C.STRING_ARRAY | C.POINTER_TO_INTEGER_OR_STRING,
+    'string_t *': C.STRING_ARRAY | C.POINTER_TO_INTEGER_OR_STRING,
+    'callback_t': C.FUNCTION_POINTER,
+    'void (*)(int, void *)': C.FUNCTION_POINTER,
+    'void *': C.NONE,
+}
+
+SIGNATURES = """
+void callback(callback_t c, void *user);
+void callback_pointer(int (*c)(const char *, void *), void *user, int &n);
+void callback_without_user(callback_t c, int n);
+void strings(char **s, int n);
+void const_strings(const char *s[], int n, int *out);
+void strings_without_count(char **s);
+void inout(int &a, int *b, const int *c, char *d, char **e, int_t *f, double &g, const int &h);
+void mixed(char **s, int n, callback_t c, void *user, int &x, string_t *s2, int_t n2);
+void nothing(int a, double b, S s, const S &cs);
+void pairs(int a, char **s, int n, int b, char **s2, int n2);
+"""
+
+
+class PairWrapper(BaseFunctionWrapper):
+    """
+    matches an argument followed by one already wrapped into a string vector.
+    """
+    name = "pair_transform"
+
+    def match(self, f, i, a):
+        return i + 1 < len(f.args) and f.args[i + 1].type == "std::vector<std::string>"
+
+
+def apply_wrappers_by_rounds(of, wrappers: List[BaseFunctionWrapper]):
+    """
+    reference implementation: rescan every argument with every wrapper until nothing changes.
+    """
+    wrapped = True
+    while wrapped:
+        wrapped = False
+        wf = of.resolve_wrappers()
+        for w in wrappers:
+            res = True
+            while res:
+                res = next((WrapperInfo(wrapper=w, index=i) for i in range(len(wf.args))
+                            if w.can_wrap_arg(wf, i)), None)
+                if res:
+                    of.wrappers.append(res)
+                    wf = of.resolve_wrappers()
+                    wrapped = True
+
+
+class Wrappers(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.header = os.path.join(self.dir.name, "test.h")
+        with open(self.header, "wt") as f:
+            f.write("""
+            struct S{ int a; };
+            typedef void (*callback_t)(int, void *);
+            typedef char *string_t;
+            typedef int int_t;
+            """ + SIGNATURES)
+        extra_options = CXXParserExtraOptions()
+        extra_options.show_progress = False
+        parse_result = CxxFileParser(files=[self.header], extra_options=extra_options).parse()
+        self.pre_processor = PreProcessor(PreProcessorOptions(parse_result))
+        self.result = self.pre_processor.process()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _function(self, name: str):
+        f = self.result.g.functions[name][0]
+        f.wrappers = []
+        f.resolved = None
+        return f
+
+    @staticmethod
+    def _applied(f):
+        return [(wi.wrapper.__class__, wi.index) for wi in f.wrappers]
+
+    def test_argument_categories(self):
+        categories = self.pre_processor.argument_classifier.categories
+        for t, expected in CATEGORIES.items():
+            with self.subTest(t):
+                self.assertEqual(expected, categories(t))
+
+    def test_same_as_rounds(self):
+        wrappers = [w(self.pre_processor.type_manager)
+                    for w in (CFunctionCallbackWrapper, StringArrayWrapper, InoutArgumentWrapper)]
+        for line in SIGNATURES.strip().splitlines():
+            name = line.split('(', 1)[0].split()[-1]
+            with self.subTest(name):
+                f = self._function(name)
+                self.pre_processor._apply_wrappers(f, wrappers)
+                applied = self._applied(f)
+                f = self._function(name)
+                apply_wrappers_by_rounds(f, wrappers)
+                self.assertEqual(self._applied(f), applied)
+
+        # index of a wrapper is of the signature with previous wrappers applied
+        self.assertEqual([(CFunctionCallbackWrapper, 0), (InoutArgumentWrapper, 1)],
+                         self._applied(self.result.g.functions['callback_pointer'][0]))
+        self.assertEqual([(StringArrayWrapper, 0), (InoutArgumentWrapper, 1)],
+                         self._applied(self.result.g.functions['const_strings'][0]))
+        self.assertEqual([(InoutArgumentWrapper, i) for i in (0, 1, 4, 5, 6)],
+                         self._applied(self.result.g.functions['inout'][0]))
+
+    def test_rescan_argument_before_wrapped(self):
+        # StringArrayWrapper changes argument s, after which PairWrapper matches argument a
+        wrappers = [PairWrapper(self.pre_processor.type_manager),
+                    StringArrayWrapper(self.pre_processor.type_manager)]
+        expected = [(StringArrayWrapper, 1), (StringArrayWrapper, 3),
+                    (PairWrapper, 0), (PairWrapper, 2)]
+
+        f = self._function('pairs')
+        self.pre_processor._apply_wrappers(f, wrappers)
+        self.assertEqual(expected, self._applied(f))
+
+        f = self._function('pairs')
+        apply_wrappers_by_rounds(f, wrappers)
+        self.assertEqual(expected, self._applied(f))
+
+
+if __name__ == '__main__':
+    main()